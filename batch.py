@@ -0,0 +1,239 @@
+# Batch packing of many orders with a pool of worker processes
+# usage: python batch.py manifest.csv output_dir [--workers N] [--slips svg|png] [--cache DIR]
+import argparse
+import collections
+import csv
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import packing
+import parallel
+import random_stream
+import render
+import solution_cache
+
+box_columns = ['box_index', 'dimension_x', 'dimension_y']
+cache = None  # solution_cache.SolutionCache of the worker process, orders are always solved if None
+
+
+def read_manifest(filename):
+    """
+    read manifest of orders. Manifest is a CSV or Excel file of one of two formats:
+    - list of order files: column 'path' (relative to the manifest directory), optional column 'order_id',
+      order id is the file name without extension by default
+    - one file with all orders: columns 'order_id', box_number, x, y
+    order ids must be unique, results and packing slips are named by them (see write_results)
+    :param filename: name of the manifest file
+    :return: list of (order_id, source), source is name of the order file or Pandas DataFrame with boxes of the order
+    """
+    import pandas as pd
+    if filename.lower().endswith('.csv'):
+        manifest = pd.read_csv(filename)
+    else:
+        manifest = pd.read_excel(filename)
+    orders = []
+    if 'path' in manifest.columns:
+        manifest_dir = os.path.dirname(os.path.abspath(filename))
+        for index, row in manifest.iterrows():
+            path = os.path.join(manifest_dir, str(row['path']))
+            if 'order_id' in manifest.columns:
+                order_id = str(row['order_id'])
+            else:
+                order_id = os.path.splitext(os.path.basename(path))[0]
+            orders.append((order_id, path))
+    elif 'order_id' in manifest.columns:
+        table = manifest.rename(columns=dict(zip([c for c in manifest.columns if c != 'order_id'][:3], box_columns)))
+        for order_id, order_table in table.groupby('order_id', sort=False):
+            orders.append((str(order_id), order_table))
+    else:
+        raise ValueError("manifest %s has neither 'path' nor 'order_id' column" % filename)
+    counts = collections.Counter(order_id for order_id, source in orders)
+    duplicates = [order_id for order_id, count in counts.items() if count > 1]
+    if len(duplicates) > 0:
+        raise ValueError('order ids in manifest %s must be unique, repeated: %s' % (filename, ', '.join(duplicates)))
+    return orders
+
+
+def init_worker(settings, cache_directory=None):
+    """
+    initializer of worker processes: packing is imported once per worker, parameters of the parent are applied
+    :param settings: packing module parameters as returned by parallel.get_settings
+    :param cache_directory: directory of solutions shared by workers, see solution_cache.SolutionCache;
+    no cache if None
+    """
+    global cache
+    parallel.apply_settings(settings)
+    if cache_directory is not None:
+        cache = solution_cache.SolutionCache(cache_directory)
+
+
+def pack_order(order_id, source):
+    """
+    pack one order, any failure is reported in the result instead of being raised
+    :param order_id: id of the order
+    :param source: name of the order file or Pandas DataFrame with columns ['box_index', 'dimension_x', 'dimension_y']
+    :return: dictionary {'order_id':, 'status': 'ok' or 'error', 'error':, 'area':, 'n_packages':,
+    'optimality_gap':, 'time':, 'shipping':  shipping_dict or None}
+    """
+    start = time.time()
+    result = {'order_id': order_id, 'status': 'ok', 'error': '', 'area': None, 'n_packages': None,
+              'optimality_gap': None, 'time': None, 'shipping': None}
+    try:
+        # every order starts from the same seed, result doesn't depend on the worker that packed it
+        rng = random_stream.RandomStream(packing.seed)
+        if isinstance(source, str):
+            boxes_df = packing.get_boxes(source)
+        else:
+            boxes_df = packing.get_boxes_from_table(source)
+        shipping_dict = packing.solve_shipping(boxes_df, cache, rng)
+        result['area'] = shipping_dict['area']
+        result['n_packages'] = shipping_dict['n_packages']
+        result['optimality_gap'] = shipping_dict['optimality_gap']
+        result['shipping'] = shipping_dict
+    except Exception:
+        result['status'] = 'error'
+        result['error'] = traceback.format_exc(limit=3)
+    result['time'] = time.time() - start
+    return result
+
+
+def get_error_result(order_id, error):
+    """
+    return result of an order that failed outside of pack_order, in the format of pack_order
+    """
+    return {'order_id': order_id, 'status': 'error', 'error': error, 'area': None, 'n_packages': None,
+            'optimality_gap': None, 'time': None, 'shipping': None}
+
+
+def run_pool(orders, positions, results, max_workers=None, cache_directory=None):
+    """
+    pack orders at positions in a new pool of worker processes, results are stored at positions of results
+    :param orders: list of (order_id, source)
+    :param positions: positions of orders to pack
+    :param results: list of results, updated in place
+    :param max_workers: number of worker processes
+    :param cache_directory: directory of cached solutions, see pack_orders
+    :return: sorted positions of orders that were not packed because a worker process died and broke the pool
+    """
+    unfinished = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker,
+                             initargs=(parallel.get_settings(), cache_directory)) as executor:
+        futures = {executor.submit(pack_order, *orders[position]): position for position in positions}
+        for future in as_completed(futures):
+            position = futures[future]
+            try:
+                results[position] = future.result()
+            except BrokenProcessPool:
+                unfinished.append(position)
+            except Exception:
+                results[position] = get_error_result(orders[position][0], traceback.format_exc(limit=3))
+    return sorted(unfinished)
+
+
+def pack_orders(orders, max_workers=None, cache_directory=None):
+    """
+    pack orders in a pool of worker processes that stay alive for the whole batch.
+    if a worker process dies (e.g. killed by out of memory), the pool breaks and all unfinished orders fail with it:
+    orders that could have been running in the broken pool are packed again one by one in a single worker process
+    to find the order that killed it, only this order fails, the rest of orders are packed in a new pool
+    :param orders: list of (order_id, source) as returned by read_manifest, order ids may repeat
+    :param max_workers: number of worker processes, number of cpus by default
+    :param cache_directory: directory of cached solutions, orders with the same boxes as an already solved order
+    get its solution instead of being annealed; no cache if None
+    :return: list of results of pack_order in the order of orders
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    results = [None] * len(orders)
+    pending = list(range(len(orders)))
+    while len(pending) > 0:
+        unfinished = run_pool(orders, pending, results, max_workers, cache_directory)
+        # tasks are sent to workers in the order of submission, so only the first unfinished orders could be
+        # running or queued for a worker when the pool broke
+        n_suspects = max_workers + 1
+        suspects, pending = unfinished[:n_suspects], unfinished[n_suspects:]
+        while len(suspects) > 0:
+            suspects = run_pool(orders, suspects, results, 1, cache_directory)
+            if len(suspects) > 0:
+                # a single worker packs orders one after another, the first unfinished order killed it
+                results[suspects[0]] = get_error_result(orders[suspects[0]][0],
+                                                        'worker process died while packing the order')
+                suspects = suspects[1:]
+    return results
+
+
+def write_results(results, output_dir, slips=None):
+    """
+    write results of all orders at once:
+    summary.csv - one row per order: order_id, status, area, n_packages, optimality_gap, time, error
+    placements.csv - one row per box: order_id, box_index, package_id, package_type, dimension_x, dimension_y,
+    rotated, x_center, y_center
+    slips/<order_id>.<slips> - packing slip of every packed order with all its packages, if slips is given
+    :param results: list of results of pack_order
+    :param output_dir: directory for output files, created if doesn't exist
+    :param slips: format of packing slips: 'svg' (written directly, see render.write_shipping_svg) or 'png'
+    (see render.render_shipping), no slips if None
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='') as summary_file:
+        writer = csv.writer(summary_file)
+        writer.writerow(['order_id', 'status', 'area', 'n_packages', 'optimality_gap', 'time', 'error'])
+        writer.writerows([[result['order_id'], result['status'], result['area'], result['n_packages'],
+                           result['optimality_gap'], result['time'], result['error']] for result in results])
+    with open(os.path.join(output_dir, 'placements.csv'), 'w', newline='') as placements_file:
+        writer = csv.writer(placements_file)
+        writer.writerow(['order_id', 'box_index', 'package_id', 'package_type', 'dimension_x', 'dimension_y',
+                         'rotated', 'x_center', 'y_center'])
+        for result in results:
+            if result['shipping'] is None:
+                continue
+            package_types = {package['package_id']: package['package_type']
+                             for package in result['shipping']['packages']}
+            writer.writerows([[result['order_id'], box['box_index'], box['package_id'],
+                               package_types.get(box['package_id'], ''), box['dimension_x'], box['dimension_y'],
+                               box['rotated'], box['x_center'], box['y_center']]
+                              for box in result['shipping']['boxes']])
+    if slips is not None:
+        os.makedirs(os.path.join(output_dir, 'slips'), exist_ok=True)
+        for result in results:
+            if result['shipping'] is None:
+                continue
+            filename = os.path.join(output_dir, 'slips', '%s.%s' % (result['order_id'], slips))
+            if slips == 'svg':
+                render.write_shipping_svg(result['shipping'], filename)
+            else:
+                render.render_shipping(result['shipping'], filename)
+
+
+def run_batch(manifest_filename, output_dir, max_workers=None, slips=None, cache_directory=None):
+    """
+    read manifest, pack all orders and write results
+    :param manifest_filename: name of the manifest file, see read_manifest
+    :param output_dir: directory for output files, see write_results
+    :param max_workers: number of worker processes, number of cpus by default
+    :param slips: format of packing slips 'svg' or 'png', see write_results
+    :param cache_directory: directory of cached solutions, see pack_orders
+    :return: list of results of pack_order
+    """
+    results = pack_orders(read_manifest(manifest_filename), max_workers, cache_directory)
+    write_results(results, output_dir, slips)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='pack many orders with a pool of worker processes')
+    parser.add_argument('manifest', help='CSV or Excel file with order files (column path) '
+                                         'or with boxes of all orders (columns order_id, box_number, x, y)')
+    parser.add_argument('output_dir', help='directory for summary.csv and placements.csv')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--slips', choices=['svg', 'png'], default=None,
+                        help='write packing slip of every order to output_dir/slips in this format')
+    parser.add_argument('--cache', default=None, help='directory of solutions reused for orders with the same boxes')
+    args = parser.parse_args()
+    start = time.time()
+    results = run_batch(args.manifest, args.output_dir, args.workers, args.slips, args.cache)
+    n_failed = len([result for result in results if result['status'] != 'ok'])
+    print('packed %d orders, %d failed, time: %.1f sec' % (len(results), n_failed, time.time() - start))
@@ -0,0 +1,2 @@
+# Benchmarks of initial packing and Metropolis Monte Carlo simulated annealing on synthetic orders
+# usage (from the repository root): python -m benchmarks.run --output baseline.json
@@ -0,0 +1,114 @@
+# Seeded generators of synthetic orders (sets of boxes)
+# every generator returns dimensions of boxes [(dimension_x, dimension_y), ...] and the optimal area of packages
+# if it is known (None otherwise); all dimensions are integer and every box fits into a package type
+import heapq
+import math
+
+import numpy as np
+
+min_side = 10  # minimal side of a box
+
+
+def get_max_side(package_types):
+    """
+    return the largest side of a box that fits into every package type in any orientation
+    """
+    return int(min(min(dimensions) for dimensions in package_types.values()))
+
+
+def uniform(n_boxes, rng, package_types):
+    """
+    sides of boxes are uniform between min_side and half of the largest side that fits into every package type
+    :param n_boxes: number of boxes
+    :param rng: numpy.random.Generator
+    :param package_types: dictionary of available package types with dimensions
+    :return: list of (dimension_x, dimension_y), None
+    """
+    max_side = max(get_max_side(package_types) // 2, min_side)
+    sides = rng.integers(min_side, max_side + 1, size=(n_boxes, 2))
+    return [(float(x), float(y)) for x, y in sides], None
+
+
+def heavy_tailed(n_boxes, rng, package_types, shape=1.5):
+    """
+    sides of boxes are Pareto distributed: many small boxes and a few large ones
+    :param shape: shape parameter of Pareto distribution, smaller values give heavier tail
+    :return: list of (dimension_x, dimension_y), None
+    """
+    max_side = get_max_side(package_types)
+    sides = np.clip(np.rint(min_side * (1.0 + rng.pareto(shape, size=(n_boxes, 2)))), min_side, max_side)
+    return [(float(x), float(y)) for x, y in sides], None
+
+
+def sku(n_boxes, rng, package_types, n_skus=None):
+    """
+    a few stock keeping units (box types) with many copies of each
+    :param n_skus: number of box types, between 1 and 8 depending on n_boxes by default
+    :return: list of (dimension_x, dimension_y), None
+    """
+    if n_skus is None:
+        n_skus = min(8, n_boxes // 10 + 1)
+    types = uniform(n_skus, rng, package_types)[0]
+    return [types[sku_index] for sku_index in rng.integers(0, n_skus, size=n_boxes)], None
+
+
+def perfect_fit(n_boxes, rng, package_types, boxes_per_package=20):
+    """
+    packages of the largest type are cut into boxes by random guillotine cuts, so boxes fill the packages
+    exactly and the optimal area is the area of the packages
+    :param boxes_per_package: average number of boxes cut out of one package
+    :return: list of (dimension_x, dimension_y), optimal area
+    """
+    package_type = max(package_types, key=lambda name: package_types[name][0] * package_types[name][1])
+    package_x, package_y = package_types[package_type]
+    n_packages = max(1, int(math.ceil(n_boxes / float(boxes_per_package))))
+    n_packages = min(n_packages, n_boxes)
+    # heap of pieces ordered by decreasing area, counter keeps the order of pieces of equal area deterministic
+    pieces = [(-float(package_x * package_y), piece, float(package_x), float(package_y))
+              for piece in range(n_packages)]
+    n_pieces = n_packages
+    while len(pieces) < n_boxes:
+        # cut the largest piece across its longer side at random integer position
+        area, piece, x, y = pieces[0]
+        if max(x, y) < 2:
+            break
+        if x >= y:
+            cut = float(rng.integers(1, int(x)))
+            parts = [(cut, y), (x - cut, y)]
+        else:
+            cut = float(rng.integers(1, int(y)))
+            parts = [(x, cut), (x, y - cut)]
+        heapq.heapreplace(pieces, (-parts[0][0] * parts[0][1], n_pieces, parts[0][0], parts[0][1]))
+        heapq.heappush(pieces, (-parts[1][0] * parts[1][1], n_pieces + 1, parts[1][0], parts[1][1]))
+        n_pieces += 2
+    dimensions = [(x, y) for area, piece, x, y in sorted(pieces, key=lambda piece: piece[1])]
+    order = rng.permutation(len(dimensions))
+    return [dimensions[piece] for piece in order], float(n_packages * package_x * package_y)
+
+
+generators = {'uniform': uniform, 'heavy_tailed': heavy_tailed, 'sku': sku, 'perfect_fit': perfect_fit}
+
+
+def get_boxes(dimensions):
+    """
+    return list of box dictionaries in the format of packing.get_boxes
+    :param dimensions: list of (dimension_x, dimension_y)
+    """
+    return [{'box_index': box_index + 1, 'dimension_x': dimension_x, 'dimension_y': dimension_y, 'package_id': 0,
+             'rotated': 'Not rotated', 'x_center': 0.0, 'y_center': 0.0}
+            for box_index, (dimension_x, dimension_y) in enumerate(dimensions)]
+
+
+def generate(name, n_boxes, seed, package_types):
+    """
+    generate an order
+    :param name: one of generators
+    :param n_boxes: number of boxes
+    :param seed: seed of numpy.random.Generator
+    :param package_types: dictionary of available package types with dimensions
+    :return: list of box dictionaries (see get_boxes), optimal area of packages or None if it is unknown
+    """
+    if name not in generators:
+        raise ValueError('unknown generator %s, available: %s' % (name, list(generators)))
+    dimensions, optimum = generators[name](n_boxes, np.random.default_rng(seed), package_types)
+    return get_boxes(dimensions), optimum
@@ -0,0 +1,55 @@
+# Import time budget of modules loaded by CLI and worker processes
+# usage (from the repository root): python -m benchmarks.import_time [--repeat N]
+# exits with status 1 if a module exceeds its budget or imports a module that must be loaded lazily
+import argparse
+import subprocess
+import sys
+
+# maximal import time in seconds of a module in a fresh interpreter (numpy alone takes about 0.1 s)
+budgets = {'packing': 0.3, 'parallel': 0.3, 'batch': 0.3}
+lazy_modules = ['pandas', 'matplotlib', 'openpyxl']  # slow to import, loaded only when files are read or plotted
+
+
+def measure_import(module, repeat=5):
+    """
+    import module in fresh interpreters
+    :param module: name of the module
+    :param repeat: number of measurements, the fastest one is returned
+    :return: import time in seconds, list of lazy_modules imported together with the module
+    """
+    code = ('import sys, time\n'
+            'start = time.perf_counter()\n'
+            'import %s\n'
+            'print(time.perf_counter() - start)\n'
+            'print(" ".join(name for name in %r if name in sys.modules))\n' % (module, lazy_modules))
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                text=True).stdout.splitlines()
+        times.append(float(output[-2]))
+        loaded = output[-1].split()
+    return min(times), loaded
+
+
+def check_budgets(repeat=5):
+    """
+    measure import time of every module of budgets
+    :return: True if all modules are within their budgets and don't import lazy_modules
+    """
+    success = True
+    for module, budget in budgets.items():
+        seconds, loaded = measure_import(module, repeat)
+        within_budget = seconds <= budget and len(loaded) == 0
+        success = success and within_budget
+        print('%-10s %.3f sec (budget %.3f sec)%s%s' % (module, seconds, budget,
+                                                        '' if len(loaded) == 0 else ', imports ' + ', '.join(loaded),
+                                                        '' if within_budget else '  FAILED'))
+    return success
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='check import time of modules against budgets')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements per module')
+    args = parser.parse_args()
+    sys.exit(0 if check_budgets(args.repeat) else 1)
@@ -0,0 +1,173 @@
+# Benchmark of initial packing and Metropolis Monte Carlo simulated annealing on synthetic orders
+# usage (from the repository root):
+# python -m benchmarks.run [--generators uniform sku] [--sizes 10 100] [--output new.json] [--baseline old.json]
+import argparse
+import json
+import time
+import tracemalloc
+
+import packing
+import parallel
+import random_stream
+import telemetry
+from benchmarks import generators
+
+sizes = [10, 100, 1000, 10000]  # numbers of boxes of benchmark orders
+memory_steps = 100  # number of steps per control parameter level in the run measuring peak memory
+result_columns = ['generator', 'n_boxes', 'seed', 'initial_area', 'area', 'n_packages', 'lower_bound',
+                  'optimality_gap', 'optimum', 'gap_to_optimum', 'steps', 'steps_per_second', 'initialize_time',
+                  'anneal_time', 'peak_memory_mb']
+
+
+def run_case(generator, n_boxes, seed, memory=True):
+    """
+    generate an order, pack it with packing.initialize_shipping_from_boxes and packing.packing_with_monte_carlo
+    using current packing module parameters and measure it
+    :param generator: name of the generator, one of generators.generators
+    :param n_boxes: number of boxes
+    :param seed: seed of the order and of random numbers of packing
+    :param memory: if True, peak memory is measured in a separate run with tracemalloc
+    (with memory_steps steps per control parameter level), so it doesn't slow down measured steps
+    :return: dictionary with keys result_columns; gap_to_optimum is relative difference between area and
+    optimum, None if optimum of the order is unknown
+    """
+    boxes_df, optimum = generators.generate(generator, n_boxes, seed, packing.package_types)
+    rng = random_stream.RandomStream(seed)
+    start = time.perf_counter()
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes_df, rng=rng)
+    initialize_time = time.perf_counter() - start
+    initial_area = shipping_dict['area']
+    trace = telemetry.Telemetry()
+    start = time.perf_counter()
+    shipping_dict = packing.packing_with_monte_carlo(shipping_dict, rng=rng, telemetry=trace)
+    anneal_time = time.perf_counter() - start
+    steps = sum(level['proposals'] for level in trace.levels)
+    result = {'generator': generator,
+              'n_boxes': n_boxes,
+              'seed': seed,
+              'initial_area': initial_area,
+              'area': shipping_dict['area'],
+              'n_packages': shipping_dict['n_packages'],
+              'lower_bound': shipping_dict['lower_bound'],
+              'optimality_gap': shipping_dict['optimality_gap'],
+              'optimum': optimum,
+              'gap_to_optimum': None if optimum is None else (shipping_dict['area'] - optimum) / optimum,
+              'steps': steps,
+              'steps_per_second': steps / anneal_time if anneal_time > 0 else None,
+              'initialize_time': initialize_time,
+              'anneal_time': anneal_time,
+              'peak_memory_mb': None}
+    if memory:
+        result['peak_memory_mb'] = get_peak_memory(boxes_df, seed)
+    return result
+
+
+def get_peak_memory(boxes_df, seed):
+    """
+    return peak memory in MB allocated by initial packing and annealing with memory_steps steps per level
+    """
+    max_number_steps = packing.max_number_steps
+    packing.max_number_steps = memory_steps
+    tracemalloc.start()
+    try:
+        rng = random_stream.RandomStream(seed)
+        packing.packing_with_monte_carlo(packing.initialize_shipping_from_boxes(boxes_df, rng=rng), rng=rng)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        packing.max_number_steps = max_number_steps
+    return peak / 2.0 ** 20
+
+
+def run_benchmarks(generator_names=None, benchmark_sizes=None, seed=1, memory=True):
+    """
+    run all combinations of generators and sizes
+    :param generator_names: list of generators, all generators by default
+    :param benchmark_sizes: list of numbers of boxes, sizes by default
+    :param seed: seed of orders and of packing
+    :param memory: measure peak memory, see run_case
+    :return: list of results of run_case
+    """
+    if generator_names is None:
+        generator_names = list(generators.generators)
+    if benchmark_sizes is None:
+        benchmark_sizes = sizes
+    results = []
+    for generator in generator_names:
+        for n_boxes in benchmark_sizes:
+            result = run_case(generator, n_boxes, seed, memory)
+            print('%-12s %6d boxes: %8.0f steps/sec, area %.0f, gap %.3f, %.1f sec' % (
+                generator, n_boxes, result['steps_per_second'] or 0.0, result['area'], result['optimality_gap'],
+                result['initialize_time'] + result['anneal_time']))
+            results.append(result)
+    return results
+
+
+def write_baseline(results, filename):
+    """
+    write results with packing module parameters to JSON file
+    """
+    with open(filename, 'w') as baseline_file:
+        json.dump({'settings': parallel.get_settings(), 'results': results}, baseline_file, indent=1)
+
+
+def read_baseline(filename):
+    """
+    read results written by write_baseline
+    :return: list of results
+    """
+    with open(filename) as baseline_file:
+        return json.load(baseline_file)['results']
+
+
+def compare(results, baseline):
+    """
+    compare results with baseline case by case (same generator, number of boxes and seed)
+    :return: list of dictionaries {'generator':, 'n_boxes':, 'seed':, 'speedup': ratio of steps per second,
+    'area_ratio': ratio of final areas, 'memory_ratio': ratio of peak memory}, None where a value is missing
+    """
+    baseline_cases = {(result['generator'], result['n_boxes'], result['seed']): result for result in baseline}
+
+    def ratio(new, old):
+        if new is None or old is None or old == 0:
+            return None
+        return new / old
+    comparison = []
+    for result in results:
+        old = baseline_cases.get((result['generator'], result['n_boxes'], result['seed']))
+        if old is None:
+            continue
+        comparison.append({'generator': result['generator'], 'n_boxes': result['n_boxes'], 'seed': result['seed'],
+                           'speedup': ratio(result['steps_per_second'], old['steps_per_second']),
+                           'area_ratio': ratio(result['area'], old['area']),
+                           'memory_ratio': ratio(result['peak_memory_mb'], old['peak_memory_mb'])})
+    return comparison
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark packing on synthetic orders')
+    parser.add_argument('--generators', nargs='+', default=None, choices=list(generators.generators),
+                        help='generators of orders, all by default')
+    parser.add_argument('--sizes', nargs='+', type=int, default=None, help='numbers of boxes, %s by default' % sizes)
+    parser.add_argument('--seed', type=int, default=1, help='seed of orders and of packing')
+    parser.add_argument('--steps', type=int, default=None,
+                        help='steps per control parameter level, packing.max_number_steps by default')
+    parser.add_argument('--strategy', default=None, help='initial packing strategy, packing.initial_strategy '
+                                                          'by default')
+    parser.add_argument('--no-memory', action='store_true', help="don't measure peak memory")
+    parser.add_argument('--output', default=None, help='JSON file to write results to')
+    parser.add_argument('--baseline', default=None, help='JSON file with results to compare with')
+    args = parser.parse_args()
+    if args.steps is not None:
+        packing.max_number_steps = args.steps
+    if args.strategy is not None:
+        packing.initial_strategy = args.strategy
+    benchmark_results = run_benchmarks(args.generators, args.sizes, args.seed, not args.no_memory)
+    if args.output is not None:
+        write_baseline(benchmark_results, args.output)
+    if args.baseline is not None:
+        for case in compare(benchmark_results, read_baseline(args.baseline)):
+            print('%-12s %6d boxes: speedup %s, area ratio %s, memory ratio %s' % (
+                case['generator'], case['n_boxes'],
+                *['-' if case[key] is None else '%.3f' % case[key]
+                  for key in ['speedup', 'area_ratio', 'memory_ratio']]))
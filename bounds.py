@@ -0,0 +1,160 @@
+# Lower bounds of the area of packages needed to ship a set of boxes
+import math
+
+import numpy as np
+
+import shipping_state
+
+max_dp_steps = 1000000  # maximal number of steps of get_min_package_area_sum, weaker bound is used above it
+
+
+def get_package_area(package_types, package_type):
+    return float(package_types[package_type][0] * package_types[package_type][1])
+
+
+def get_fitting_types(dimension_x, dimension_y, package_types):
+    """
+    return list of package types into which an empty box fits, box can be rotated
+    """
+    return [package_type for package_type in package_types
+            if shipping_state.if_box_fits_to_empty_package(dimension_x, dimension_y, package_types[package_type])]
+
+
+def if_box_large(dimension_x, dimension_y, package_dimensions):
+    """
+    return True if two such boxes can't share a package: in every orientation that fits into package
+    box is longer than half of package length and higher than half of package height
+    """
+    for box_x, box_y in [(dimension_x, dimension_y), (dimension_y, dimension_x)]:
+        if box_x <= package_dimensions[0] and box_y <= package_dimensions[1]:
+            if box_x <= package_dimensions[0] / 2.0 or box_y <= package_dimensions[1] / 2.0:
+                return False
+    return True
+
+
+def get_min_package_area_sum(area, package_areas):
+    """
+    return the smallest sum of areas of packages (any number of packages of each type) that is not less than area
+    :param area: area to be covered
+    :param package_areas: list of areas of available package types
+    :return: smallest sum of package areas, area itself if it can't be calculated exactly
+    """
+    if area <= 0:
+        return 0.0
+    if any(package_area != int(package_area) for package_area in package_areas):
+        return float(area)
+    units = [int(package_area) for package_area in package_areas]
+    unit = 0
+    for package_area in units:
+        unit = math.gcd(unit, package_area)
+    units = [package_area // unit for package_area in units]
+    target = int(math.ceil(area / unit - 1e-9))
+    size = target + max(units) + 1
+    if min(units) == 1:
+        return float(target * unit)
+    if sum(size // package_units for package_units in units) > max_dp_steps:
+        return float(area)
+    # reachable[s] is True if s units can be made of package areas,
+    # array is updated in blocks of package_units, every block depends only on the previous one
+    reachable = np.zeros(size, dtype=bool)
+    reachable[0] = True
+    for package_units in units:
+        for start in range(package_units, size, package_units):
+            end = min(start + package_units, size)
+            reachable[start:end] |= reachable[start - package_units:end - package_units]
+    return float((target + int(np.argmax(reachable[target:]))) * unit)
+
+
+def continuous_lower_bound(dimensions_x, dimensions_y, package_types):
+    """
+    area of all boxes rounded up to the smallest achievable sum of package areas
+    """
+    area = float(np.sum(np.asarray(dimensions_x) * np.asarray(dimensions_y)))
+    package_areas = [get_package_area(package_types, package_type) for package_type in package_types]
+    return get_min_package_area_sum(area, package_areas)
+
+
+def large_boxes_lower_bound(dimensions_x, dimensions_y, package_types):
+    """
+    bound of L2 type extended to mixed package sizes: large boxes (see if_box_large) can't share a package,
+    each of them needs a package of its own, the rest of boxes must fit into free space of these packages
+    and into additional packages
+    """
+    package_areas = [get_package_area(package_types, package_type) for package_type in package_types]
+    large_area_sum = 0.0
+    free_area = 0.0
+    small_area = 0.0
+    for dimension_x, dimension_y in zip(dimensions_x, dimensions_y):
+        fitting_types = get_fitting_types(dimension_x, dimension_y, package_types)
+        if len(fitting_types) == 0:
+            continue
+        fitting_areas = [get_package_area(package_types, package_type) for package_type in fitting_types]
+        if all(if_box_large(dimension_x, dimension_y, package_types[package_type]) for package_type in fitting_types):
+            large_area_sum += min(fitting_areas)
+            free_area += max(fitting_areas) - dimension_x * dimension_y
+        else:
+            small_area += dimension_x * dimension_y
+    return large_area_sum + get_min_package_area_sum(small_area - free_area, package_areas)
+
+
+def single_type_lower_bound(dimensions_x, dimensions_y, package_types):
+    """
+    boxes that fit only into one package type need at least as many packages of this type as their area requires,
+    the rest of boxes must fit into free space of these packages and into additional packages
+    """
+    package_areas = [get_package_area(package_types, package_type) for package_type in package_types]
+    single_type_area = {package_type: 0.0 for package_type in package_types}
+    total_area = 0.0
+    for dimension_x, dimension_y in zip(dimensions_x, dimensions_y):
+        total_area += dimension_x * dimension_y
+        fitting_types = get_fitting_types(dimension_x, dimension_y, package_types)
+        if len(fitting_types) == 1:
+            single_type_area[fitting_types[0]] += dimension_x * dimension_y
+    forced_area = 0.0
+    for package_type, area in single_type_area.items():
+        package_area = get_package_area(package_types, package_type)
+        forced_area += math.ceil(area / package_area - 1e-9) * package_area
+    return forced_area + get_min_package_area_sum(total_area - forced_area, package_areas)
+
+
+def get_lower_bounds(dimensions_x, dimensions_y, package_types):
+    """
+    calculate lower bounds of the area of packages needed to ship boxes
+    :param dimensions_x: lengths of boxes
+    :param dimensions_y: heights of boxes
+    :param package_types: dictionary of available package types with dimensions
+    :return: dictionary {'continuous':, 'large_boxes':, 'single_type':, 'lower_bound': maximum of all bounds}
+    """
+    dimensions_x = [float(dimension) for dimension in dimensions_x]
+    dimensions_y = [float(dimension) for dimension in dimensions_y]
+    lower_bounds = {'continuous': continuous_lower_bound(dimensions_x, dimensions_y, package_types),
+                    'large_boxes': large_boxes_lower_bound(dimensions_x, dimensions_y, package_types),
+                    'single_type': single_type_lower_bound(dimensions_x, dimensions_y, package_types)}
+    lower_bounds['lower_bound'] = max(lower_bounds.values())
+    return lower_bounds
+
+
+def get_optimality_gap(area, lower_bound):
+    """
+    return relative gap between area of a solution and lower bound, 0 if solution is provably optimal
+    """
+    if lower_bound <= 0:
+        return 0.0
+    return float((area - lower_bound) / lower_bound)
+
+
+def add_optimality_gap(shipping_dict, lower_bound=None, package_types=None):
+    """
+    add 'lower_bound' and 'optimality_gap' to shipping_dict
+    :param shipping_dict: dictionary with a shipping info as returned by packing.initialize_shipping
+    :param lower_bound: lower bound of area, calculated from boxes of shipping_dict if None
+    :param package_types: dictionary of available package types, needed if lower_bound is None
+    :return: updated shipping_dict
+    """
+    if lower_bound is None:
+        boxes = shipping_dict['boxes']
+        lower_bound = get_lower_bounds([box['dimension_x'] for box in boxes], [box['dimension_y'] for box in boxes],
+                                       package_types)['lower_bound']
+    shipping_dict['lower_bound'] = lower_bound
+    shipping_dict['optimality_gap'] = get_optimality_gap(shipping_dict['area'], lower_bound)
+    return shipping_dict
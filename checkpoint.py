@@ -0,0 +1,59 @@
+# Checkpoints of annealing runs in compressed numpy .npz format
+import json
+import os
+
+import numpy as np
+
+import shipping_state
+
+
+def save_checkpoint(filename, run, current_state, best_state, rng, selector):
+    """
+    write everything needed to resume annealing exactly: current and the best shipping states as arrays,
+    variables of the run, state of random numbers and statistics of operators.
+    file is written to a temporary file first and then renamed, so a run interrupted while writing
+    leaves the previous checkpoint intact
+    :param filename: name of .npz file
+    :param run: dictionary of JSON serializable variables of the run (control parameter, step counters, settings)
+    :param current_state: shipping_state.ShippingState being annealed
+    :param best_state: shipping_state.ShippingState, the best state found so far
+    :param rng: random_stream.RandomStream of the run
+    :param selector: operators.OperatorSelector of the run
+    """
+    arrays = {}
+    for prefix, state in [('current_', current_state), ('best_', best_state)]:
+        for name, values in shipping_state.shipping_state_to_arrays(state).items():
+            arrays[prefix + name] = values
+    rng_state = rng.get_state()
+    arrays['rng_buffer'] = np.array(rng_state.pop('buffer'), dtype=np.float64)
+    metadata = {'run': run,
+                'package_types': current_state.package_types,
+                'precision': current_state.precision,
+                'rng': rng_state,
+                'selector': selector.get_state()}
+    arrays['metadata'] = np.frombuffer(json.dumps(metadata).encode('utf-8'), dtype=np.uint8)
+    temporary_filename = filename + '.tmp'
+    with open(temporary_filename, 'wb') as checkpoint_file:
+        np.savez_compressed(checkpoint_file, **arrays)
+    os.replace(temporary_filename, filename)
+
+
+def load_checkpoint(filename):
+    """
+    read checkpoint written by save_checkpoint
+    :param filename: name of .npz file
+    :return: dictionary {'run':, 'current': ShippingState, 'best': ShippingState, 'rng': state of RandomStream
+    (see RandomStream.set_state), 'selector': state of OperatorSelector (see OperatorSelector.set_state)}
+    """
+    with np.load(filename) as checkpoint_file:
+        arrays = {name: checkpoint_file[name] for name in checkpoint_file.files}
+    metadata = json.loads(arrays.pop('metadata').tobytes().decode('utf-8'))
+    rng_state = metadata['rng']
+    rng_state['buffer'] = arrays.pop('rng_buffer').tolist()
+    states = {}
+    for prefix in ['current_', 'best_']:
+        state_arrays = {name[len(prefix):]: values for name, values in arrays.items() if name.startswith(prefix)}
+        states[prefix[:-1]] = shipping_state.shipping_state_from_arrays(state_arrays, metadata['package_types'],
+                                                                        metadata['precision'])
+    return {'run': metadata['run'], 'current': states['current'], 'best': states['best'], 'rng': rng_state,
+            'selector': metadata['selector']}
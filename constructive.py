@@ -0,0 +1,243 @@
+# Deterministic constructive heuristics for initial shipping: Skyline, MaxRects, Guillotine
+import free_space
+import shipping_state
+
+strategies = ['skyline', 'maxrects', 'guillotine']
+sort_keys = ['area', 'longest_side']
+
+
+class SkylinePacker:
+    """
+    bottom-left skyline packing of one package: skyline is a list of segments [x, y, length] covering
+    the package length, every box is put at the lowest (then leftmost) position on top of the skyline
+    """
+
+    def __init__(self, length, height):
+        self.length = length
+        self.height = height
+        self.skyline = [[0.0, 0.0, float(length)]]
+
+    def get_y(self, segment, dimension_x):
+        """
+        return y coordinate of a box of length dimension_x put with left edge at segment, None if it doesn't fit
+        """
+        x = self.skyline[segment][0]
+        if x + dimension_x > self.length:
+            return None
+        y = 0.0
+        right = x + dimension_x
+        for segment_x, segment_y, segment_length in self.skyline[segment:]:
+            if segment_x >= right:
+                break
+            y = max(y, segment_y)
+        return y
+
+    def insert(self, dimension_x, dimension_y):
+        """
+        find position of a box, box can be rotated
+        :return: (x_center, y_center, rotated) or None if box doesn't fit
+        """
+        best = None
+        for rotated, (box_x, box_y) in enumerate([(dimension_x, dimension_y), (dimension_y, dimension_x)]):
+            for segment in range(len(self.skyline)):
+                y = self.get_y(segment, box_x)
+                if y is None or y + box_y > self.height:
+                    continue
+                candidate = (y + box_y, self.skyline[segment][0], segment, box_x, box_y, rotated)
+                if best is None or candidate[:2] < best[:2]:
+                    best = candidate
+        if best is None:
+            return None
+        top, x, segment, box_x, box_y, rotated = best
+        self.add_segment(segment, box_x, top)
+        return x + box_x / 2.0, top - box_y / 2.0, bool(rotated)
+
+    def add_segment(self, segment, length, y):
+        """
+        raise skyline to y from the beginning of segment over length
+        """
+        x = self.skyline[segment][0]
+        right = x + length
+        new_skyline = self.skyline[:segment] + [[x, y, length]]
+        for segment_x, segment_y, segment_length in self.skyline[segment:]:
+            segment_right = segment_x + segment_length
+            if segment_right <= right:
+                continue
+            if segment_x < right:
+                new_skyline.append([right, segment_y, segment_right - right])
+            else:
+                new_skyline.append([segment_x, segment_y, segment_length])
+        # merge neighbouring segments of the same height
+        merged = [new_skyline[0]]
+        for segment_x, segment_y, segment_length in new_skyline[1:]:
+            if segment_y == merged[-1][1]:
+                merged[-1][2] += segment_length
+            else:
+                merged.append([segment_x, segment_y, segment_length])
+        self.skyline = merged
+
+
+class MaxRectsPacker:
+    """
+    MaxRects packing of one package with best short side fit: list of maximal free rectangles [x, y, length, height]
+    is kept, every box is put into the bottom left corner of the free rectangle where the shorter leftover side is
+    the smallest
+    """
+
+    def __init__(self, length, height):
+        self.free_rectangles = [[0.0, 0.0, float(length), float(height)]]
+
+    def insert(self, dimension_x, dimension_y):
+        """
+        find position of a box, box can be rotated
+        :return: (x_center, y_center, rotated) or None if box doesn't fit
+        """
+        best = None
+        for rotated, (box_x, box_y) in enumerate([(dimension_x, dimension_y), (dimension_y, dimension_x)]):
+            for x, y, length, height in self.free_rectangles:
+                if box_x > length or box_y > height:
+                    continue
+                leftover_x = length - box_x
+                leftover_y = height - box_y
+                candidate = (min(leftover_x, leftover_y), max(leftover_x, leftover_y), y, x, box_x, box_y, rotated)
+                if best is None or candidate[:4] < best[:4]:
+                    best = candidate
+        if best is None:
+            return None
+        short_side, long_side, y, x, box_x, box_y, rotated = best
+        self.split(x, y, box_x, box_y)
+        return x + box_x / 2.0, y + box_y / 2.0, bool(rotated)
+
+    def split(self, box_left, box_bottom, box_x, box_y):
+        """
+        split all free rectangles intersecting placed box into maximal free rectangles around it,
+        remove free rectangles contained in other free rectangles
+        """
+        self.free_rectangles = free_space.split_rectangles(self.free_rectangles, box_left, box_bottom,
+                                                           box_left + box_x, box_bottom + box_y)
+
+
+class GuillotinePacker:
+    """
+    guillotine packing of one package: list of disjoint free rectangles [x, y, length, height] is kept,
+    every box is put into the bottom left corner of the free rectangle with the best area fit,
+    leftover of the rectangle is cut in two along the shorter leftover side
+    """
+
+    def __init__(self, length, height):
+        self.free_rectangles = [[0.0, 0.0, float(length), float(height)]]
+
+    def insert(self, dimension_x, dimension_y):
+        """
+        find position of a box, box can be rotated
+        :return: (x_center, y_center, rotated) or None if box doesn't fit
+        """
+        best = None
+        for rotated, (box_x, box_y) in enumerate([(dimension_x, dimension_y), (dimension_y, dimension_x)]):
+            for index, (x, y, length, height) in enumerate(self.free_rectangles):
+                if box_x > length or box_y > height:
+                    continue
+                candidate = (length * height - box_x * box_y, y, x, index, box_x, box_y, rotated)
+                if best is None or candidate[:3] < best[:3]:
+                    best = candidate
+        if best is None:
+            return None
+        area_fit, y, x, index, box_x, box_y, rotated = best
+        x, y, length, height = self.free_rectangles.pop(index)
+        leftover_x = length - box_x
+        leftover_y = height - box_y
+        if leftover_x < leftover_y:
+            # cut horizontally: rectangle right of the box has height of the box
+            right = [x + box_x, y, leftover_x, box_y]
+            top = [x, y + box_y, length, leftover_y]
+        else:
+            # cut vertically: rectangle above the box has length of the box
+            right = [x + box_x, y, leftover_x, height]
+            top = [x, y + box_y, box_x, leftover_y]
+        for rectangle in [right, top]:
+            if rectangle[2] > 0 and rectangle[3] > 0:
+                self.free_rectangles.append(rectangle)
+        return x + box_x / 2.0, y + box_y / 2.0, bool(rotated)
+
+
+packers = {'skyline': SkylinePacker, 'maxrects': MaxRectsPacker, 'guillotine': GuillotinePacker}
+
+
+def get_sorted_slots(state, sort_by):
+    """
+    return slots of boxes sorted in decreasing order of area or of longest side
+    :param state: ShippingState
+    :param sort_by: 'area' or 'longest_side'
+    :return: list of slots
+    """
+    if sort_by not in sort_keys:
+        raise ValueError('unknown sort key %s, available: %s' % (sort_by, sort_keys))
+    dimension_x = state.box_dimension_x.tolist()
+    dimension_y = state.box_dimension_y.tolist()
+    if sort_by == 'area':
+        key = [(x * y, max(x, y)) for x, y in zip(dimension_x, dimension_y)]
+    else:
+        key = [(max(x, y), min(x, y)) for x, y in zip(dimension_x, dimension_y)]
+    return sorted(range(state.n_boxes), key=lambda slot: key[slot], reverse=True)
+
+
+def pick_package_type_for_rest(state, slot, rest_area):
+    """
+    pick type of a new package for box in slot: the smallest package type where all remaining boxes could fit by
+    area, the largest package type if there is no such type; only types where box fits are considered
+    :param state: ShippingState
+    :param slot: slot of the box
+    :param rest_area: area of boxes not packed yet, including the box
+    :return: package type, False if box doesn't fit to any package type
+    """
+    fitting_types = [package_type for package_type in state.package_type_names
+                     if shipping_state.if_box_fits_to_empty_package(state.box_dimension_x[slot],
+                                                                    state.box_dimension_y[slot],
+                                                                    state.package_types[package_type])]
+    if len(fitting_types) == 0:
+        return False
+
+    def package_area(package_type):
+        return state.package_types[package_type][0] * state.package_types[package_type][1]
+    large_enough = [package_type for package_type in fitting_types if package_area(package_type) >= rest_area]
+    if len(large_enough) > 0:
+        return min(large_enough, key=package_area)
+    return max(fitting_types, key=package_area)
+
+
+def pack_boxes_constructive(state, strategy='skyline', sort_by='area'):
+    """
+    pack boxes deterministically: boxes sorted by sort_by are put one by one into the first open package where
+    packer of strategy finds a place, new package is opened if box doesn't fit into any open package
+    :param state: ShippingState with boxes not packed yet
+    :param strategy: one of strategies: 'skyline' (bottom-left skyline), 'maxrects' (MaxRects best short side fit),
+    'guillotine' (guillotine best area fit)
+    :param sort_by: one of sort_keys: 'area' or 'longest_side'
+    :return: updated state
+    """
+    if strategy not in packers:
+        raise ValueError('unknown strategy %s, available: %s' % (strategy, strategies))
+    slots = get_sorted_slots(state, sort_by)
+    rest_area = float((state.box_dimension_x * state.box_dimension_y).sum())
+    open_packages = []  # list of (package_id, packer)
+    for slot in slots:
+        dimension_x = float(state.box_dimension_x[slot])
+        dimension_y = float(state.box_dimension_y[slot])
+        position = None
+        for package_id, packer in open_packages:
+            position = packer.insert(dimension_x, dimension_y)
+            if position is not None:
+                break
+        if position is None:
+            package_type = pick_package_type_for_rest(state, slot, rest_area)
+            package_id = shipping_state.add_package(state, package_type)
+            package_slot = shipping_state.get_package(state, package_id)
+            packer = packers[strategy](state.package_dimension_x[package_slot], state.package_dimension_y[package_slot])
+            open_packages.append((package_id, packer))
+            position = packer.insert(dimension_x, dimension_y)
+        x_center, y_center, rotated = position
+        if rotated:
+            shipping_state.get_rotated_box(state, slot)
+        shipping_state.set_box(state, slot, package_id, x_center, y_center)
+        rest_area -= dimension_x * dimension_y
+    return state
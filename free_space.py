@@ -0,0 +1,126 @@
+# Free space of a package as a list of maximal free rectangles
+rebuild_removals = 8  # free space is rebuilt from boxes after this number of boxes were removed from package
+
+
+def split_rectangles(rectangles, box_left, box_bottom, box_right, box_top):
+    """
+    split all free rectangles (x, y, length, height) intersecting box into maximal free rectangles around it,
+    remove new rectangles contained in other rectangles.
+    rectangles of the list must not be contained in each other, order of rectangles is kept:
+    every split rectangle is replaced by its parts (left, right, bottom, top)
+    :param rectangles: list of rectangles, not modified
+    :return: list of free rectangles, rectangles itself if box doesn't intersect any of them
+    """
+    new_rectangles = []
+    new = []  # positions of parts of split rectangles in new_rectangles
+    for rectangle in rectangles:
+        x, y, length, height = rectangle
+        right = x + length
+        top = y + height
+        if box_left >= right or box_right <= x or box_bottom >= top or box_top <= y:
+            new_rectangles.append(rectangle)
+            continue
+        if box_left > x:
+            new.append(len(new_rectangles))
+            new_rectangles.append((x, y, box_left - x, height))
+        if box_right < right:
+            new.append(len(new_rectangles))
+            new_rectangles.append((box_right, y, right - box_right, height))
+        if box_bottom > y:
+            new.append(len(new_rectangles))
+            new_rectangles.append((x, y, length, box_bottom - y))
+        if box_top < top:
+            new.append(len(new_rectangles))
+            new_rectangles.append((x, box_top, length, top - box_top))
+    if len(new) == 0 and len(new_rectangles) == len(rectangles):
+        return rectangles
+    # a rectangle that was not split can't be contained in a part of a split one, only parts are checked
+    new_set = set(new)
+    removed = set()
+    for i in new:
+        x, y, length, height = new_rectangles[i]
+        right = x + length
+        top = y + height
+        for j, (x_2, y_2, length_2, height_2) in enumerate(new_rectangles):
+            if i == j or j in removed:
+                continue
+            if x >= x_2 and y >= y_2 and right <= x_2 + length_2 and top <= y_2 + height_2:
+                # of two equal rectangles only the first one or the one that was not split is kept
+                if (x, y, length, height) != (x_2, y_2, length_2, height_2) or j < i or j not in new_set:
+                    removed.add(i)
+                    break
+    return [rectangle for i, rectangle in enumerate(new_rectangles) if i not in removed]
+
+
+class FreeSpace:
+    """
+    free space of one package: list of free rectangles (x, y, length, height) that don't intersect any box.
+    adding a box splits rectangles incrementally (MaxRects), removing a box adds its free rectangles to the list,
+    so rectangles stay free but may be not maximal until the free space is rebuilt (see if_stale).
+    rectangles are never modified in place, copy() shares them
+    """
+
+    def __init__(self, length, height):
+        self.length = float(length)
+        self.height = float(height)
+        self.rectangles = [(0.0, 0.0, self.length, self.height)]
+        self.n_removed = 0  # number of boxes removed since the last rebuild
+
+    def copy(self):
+        new_free_space = FreeSpace.__new__(FreeSpace)
+        new_free_space.length = self.length
+        new_free_space.height = self.height
+        new_free_space.rectangles = list(self.rectangles)
+        new_free_space.n_removed = self.n_removed
+        return new_free_space
+
+    def insert(self, left, right, bottom, top):
+        """
+        mark box with given edges as occupied space
+        """
+        self.rectangles = split_rectangles(self.rectangles, float(left), float(bottom), float(right), float(top))
+
+    def remove(self, left, right, bottom, top, occupied=()):
+        """
+        mark space of removed box with given edges as free, except space of other boxes overlapping it
+        (boxes may overlap while a move is being made)
+        :param occupied: iterable of (left, right, bottom, top) of boxes still in package
+        """
+        left = max(float(left), 0.0)
+        bottom = max(float(bottom), 0.0)
+        right = min(float(right), self.length)
+        top = min(float(top), self.height)
+        if right > left and top > bottom:
+            freed = [(left, bottom, right - left, top - bottom)]
+            for box_left, box_right, box_bottom, box_top in occupied:
+                freed = split_rectangles(freed, float(box_left), float(box_bottom), float(box_right), float(box_top))
+            # freed space didn't intersect any free rectangle, no rectangles can contain each other
+            self.rectangles = self.rectangles + freed
+        self.n_removed += 1
+
+    def if_stale(self):
+        """
+        return True if so many boxes were removed that free space should be rebuilt
+        """
+        return self.n_removed >= rebuild_removals
+
+    def get_fitting_rectangles(self, dimension_x, dimension_y):
+        """
+        return list of free rectangles where box of given dimensions fits
+        """
+        return [rectangle for rectangle in self.rectangles
+                if rectangle[2] >= dimension_x and rectangle[3] >= dimension_y]
+
+
+def build_free_space(length, height, boxes):
+    """
+    build free space of a package from edges of its boxes
+    :param length: x dimension of the package
+    :param height: y dimension of the package
+    :param boxes: iterable of (left, right, bottom, top) of boxes in package
+    :return: FreeSpace
+    """
+    free_space = FreeSpace(length, height)
+    for left, right, bottom, top in boxes:
+        free_space.insert(left, right, bottom, top)
+    return free_space
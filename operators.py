@@ -0,0 +1,141 @@
+# Selection of modifications (operators) of shipping_state.change_shipping_randomly
+import numpy as np
+
+import shipping_state
+
+# outcomes of a proposal
+# unchanged - modification changed nothing (e.g. compaction of a compact package), invalid - rejected by validity,
+# rejected - rejected by Metropolis criterion, accepted, improved - accepted with smaller area
+outcomes = ['unchanged', 'invalid', 'rejected', 'accepted', 'improved']
+# reward of an operator for every outcome of its proposal
+rewards = {'unchanged': 0.0, 'invalid': 0.0, 'rejected': 0.0, 'accepted': 1.0, 'improved': 10.0}
+
+
+class OperatorSelector:
+    """
+    roulette-wheel selection of operators of shipping_state.change_shipping_randomly with optional online adaptation:
+    every update_period proposals the quality of every operator is moved towards its mean reward in the period
+    (with reaction rate), probabilities are proportional to quality with probability_min for every operator.
+    operators of zero weight are disabled: they are never selected, also in adaptive mode.
+    statistics of all operators are counted in any mode: proposals and outcomes of proposals
+    """
+
+    def __init__(self, weights=None, adaptive=True, reaction=0.3, probability_min=0.02, update_period=100):
+        """
+        :param weights: initial (or fixed if not adaptive) weights of operators,
+        shipping_state.default_operator_weights if None
+        :param adaptive: if True, probabilities are adapted to rewards of operators, fixed weights are used otherwise
+        :param reaction: rate of adaptation of quality of operators, 0..1
+        :param probability_min: minimal probability of every operator in adaptive mode
+        :param update_period: number of proposals between updates of probabilities
+        """
+        self.names = list(shipping_state.operators)
+        n = len(self.names)
+        if weights is None:
+            weights = shipping_state.default_operator_weights
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(weights) != n:
+            raise ValueError('%d weights of operators expected, got %d' % (n, len(weights)))
+        if not (weights > 0).any():
+            raise ValueError('at least one operator must have positive weight')
+        self.enabled = weights > 0
+        self.adaptive = adaptive
+        self.reaction = reaction
+        self.probability_min = probability_min
+        self.update_period = update_period
+        self.probabilities = weights / weights.sum()
+        self.quality = self.probabilities.copy()
+        self.cumulative = np.cumsum(self.probabilities)
+        self.proposals = np.zeros(n, dtype=np.int64)
+        self.counts = {outcome: np.zeros(n, dtype=np.int64) for outcome in outcomes}
+        self.period_proposals = np.zeros(n, dtype=np.int64)
+        self.period_rewards = np.zeros(n, dtype=np.float64)
+        self.n_since_update = 0
+
+    def select(self, rng):
+        """
+        return index of randomly selected operator
+        :param rng: random_stream.RandomStream
+        """
+        operator = int(np.searchsorted(self.cumulative, rng.random() * self.cumulative[-1], side='right'))
+        return min(operator, len(self.names) - 1)
+
+    def update(self, operator, outcome):
+        """
+        register outcome of a proposal of operator
+        :param operator: index of operator
+        :param outcome: one of outcomes
+        """
+        self.proposals[operator] += 1
+        self.counts[outcome][operator] += 1
+        if not self.adaptive:
+            return
+        self.period_proposals[operator] += 1
+        self.period_rewards[operator] += rewards[outcome]
+        self.n_since_update += 1
+        if self.n_since_update >= self.update_period:
+            self.update_probabilities()
+
+    def update_probabilities(self):
+        """
+        move quality of operators used in the last period towards their mean reward, recalculate probabilities
+        """
+        used = self.period_proposals > 0
+        mean_rewards = self.period_rewards[used] / self.period_proposals[used]
+        self.quality[used] = (1.0 - self.reaction) * self.quality[used] + self.reaction * mean_rewards
+        n = np.count_nonzero(self.enabled)
+        total_quality = self.quality[self.enabled].sum()
+        if total_quality > 0:
+            self.probabilities = np.where(self.enabled, self.probability_min + (1.0 - n * self.probability_min) *
+                                          self.quality / total_quality, 0.0)
+        self.cumulative = np.cumsum(self.probabilities)
+        self.period_proposals[:] = 0
+        self.period_rewards[:] = 0.0
+        self.n_since_update = 0
+
+    def get_state(self):
+        """
+        return state of the selector: probabilities, quality and all counters
+        :return: dictionary of lists and numbers
+        """
+        return {'names': self.names, 'enabled': self.enabled.tolist(), 'adaptive': self.adaptive,
+                'reaction': self.reaction,
+                'probability_min': self.probability_min, 'update_period': self.update_period,
+                'probabilities': self.probabilities.tolist(), 'quality': self.quality.tolist(),
+                'cumulative': self.cumulative.tolist(), 'proposals': self.proposals.tolist(),
+                'counts': {outcome: counts.tolist() for outcome, counts in self.counts.items()},
+                'period_proposals': self.period_proposals.tolist(), 'period_rewards': self.period_rewards.tolist(),
+                'n_since_update': self.n_since_update}
+
+    def set_state(self, state):
+        """
+        restore state returned by get_state
+        """
+        self.names = list(state['names'])
+        self.enabled = np.array(state['enabled'], dtype=bool)
+        self.adaptive = state['adaptive']
+        self.reaction = state['reaction']
+        self.probability_min = state['probability_min']
+        self.update_period = state['update_period']
+        self.probabilities = np.array(state['probabilities'], dtype=np.float64)
+        self.quality = np.array(state['quality'], dtype=np.float64)
+        self.cumulative = np.array(state['cumulative'], dtype=np.float64)
+        self.proposals = np.array(state['proposals'], dtype=np.int64)
+        self.counts = {outcome: np.array(counts, dtype=np.int64) for outcome, counts in state['counts'].items()}
+        self.period_proposals = np.array(state['period_proposals'], dtype=np.int64)
+        self.period_rewards = np.array(state['period_rewards'], dtype=np.float64)
+        self.n_since_update = state['n_since_update']
+
+    def get_statistics(self):
+        """
+        return statistics of operators
+        :return: dictionary {operator name: {'probability':, 'proposals':, 'unchanged':, 'invalid':, 'rejected':,
+        'accepted':, 'improved':}}
+        """
+        statistics = {}
+        for operator, name in enumerate(self.names):
+            statistics[name] = {'probability': float(self.probabilities[operator]),
+                                'proposals': int(self.proposals[operator])}
+            for outcome in outcomes:
+                statistics[name][outcome] = int(self.counts[outcome][operator])
+        return statistics
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def intersect_mask(left_edge_box_1, right_edge_box_1, left_edges, right_edges):
+    """
+    vectorized packing.if_intersect_x/if_intersect_y: return True for every box that intersects with box_1
+    in one direction, touching edges don't intersect
+    :param left_edge_box_1: left (bottom) edge of box_1, number or array broadcastable against left_edges
+    :param right_edge_box_1: right (top) edge of box_1
+    :param left_edges: array of left (bottom) edges of boxes
+    :param right_edges: array of right (top) edges of boxes
+    :return: boolean array
+    """
+    return ((right_edges > left_edge_box_1) & (left_edge_box_1 >= left_edges)) | \
+        ((left_edges < right_edge_box_1) & (right_edge_box_1 <= right_edges)) | \
+        ((left_edge_box_1 >= left_edges) & (right_edge_box_1 <= right_edges)) | \
+        ((left_edge_box_1 <= left_edges) & (right_edge_box_1 >= right_edges))
+
+
+def overlap_mask(edges_box_1, edges):
+    """
+    return True for every box that intersects with box_1 both in x and y direction
+    :param edges_box_1: (left, right, bottom, top) of box_1
+    :param edges: (left_edges, right_edges, bottom_edges, top_edges) arrays of boxes
+    :return: boolean array
+    """
+    left, right, bottom, top = edges_box_1
+    left_edges, right_edges, bottom_edges, top_edges = edges
+    return intersect_mask(left, right, left_edges, right_edges) & intersect_mask(bottom, top, bottom_edges, top_edges)
+
+
+def overlap_matrix(edges):
+    """
+    return matrix of pairwise intersections of boxes, element [i, j] is True if box i intersects box j
+    both in x and y direction, diagonal is False
+    :param edges: (left_edges, right_edges, bottom_edges, top_edges) arrays of boxes
+    :return: boolean array n x n
+    """
+    left_edges, right_edges, bottom_edges, top_edges = [np.asarray(e, dtype=np.float64) for e in edges]
+    matrix = intersect_mask(left_edges[:, None], right_edges[:, None], left_edges[None, :], right_edges[None, :]) & \
+        intersect_mask(bottom_edges[:, None], top_edges[:, None], bottom_edges[None, :], top_edges[None, :])
+    np.fill_diagonal(matrix, False)
+    return matrix
+
+
+def outside_mask(edges, package_dimension_x, package_dimension_y):
+    """
+    return True for every box that is not within package dimensions
+    :param edges: (left_edges, right_edges, bottom_edges, top_edges) arrays of boxes
+    :param package_dimension_x: length of package
+    :param package_dimension_y: height of package
+    :return: boolean array
+    """
+    left_edges, right_edges, bottom_edges, top_edges = edges
+    return (left_edges < 0.0) | (right_edges > package_dimension_x) | \
+        (bottom_edges < 0.0) | (top_edges > package_dimension_y)
+
+
+def if_boxes_valid(edges, package_dimension_x, package_dimension_y):
+    """
+    return True if all boxes are within package dimensions and don't intersect with each other
+    :param edges: (left_edges, right_edges, bottom_edges, top_edges) arrays of boxes in one package
+    :param package_dimension_x: length of package
+    :param package_dimension_y: height of package
+    :return: True or False
+    """
+    if outside_mask(edges, package_dimension_x, package_dimension_y).any():
+        return False
+    return not overlap_matrix(edges).any()
+
+
+def get_edges(x_centers, y_centers, dimensions_x, dimensions_y):
+    """
+    return edges of boxes from arrays of centers and dimensions
+    :return: (left_edges, right_edges, bottom_edges, top_edges)
+    """
+    x_centers = np.asarray(x_centers, dtype=np.float64)
+    y_centers = np.asarray(y_centers, dtype=np.float64)
+    half_x = np.asarray(dimensions_x, dtype=np.float64) / 2.0
+    half_y = np.asarray(dimensions_y, dtype=np.float64) / 2.0
+    return x_centers - half_x, x_centers + half_x, y_centers - half_y, y_centers + half_y
+
+
+def get_edges_of_boxes(boxes):
+    """
+    return edges of boxes in shipping_dict format
+    :param boxes: list of dictionaries [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,
+    'x_center': , 'y_center':}]
+    :return: (left_edges, right_edges, bottom_edges, top_edges)
+    """
+    return get_edges([box['x_center'] for box in boxes], [box['y_center'] for box in boxes],
+                     [box['dimension_x'] for box in boxes], [box['dimension_y'] for box in boxes])
@@ -1,18 +1,25 @@
-import pandas as pd
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-import copy
+import hashlib
+import os
+import time
+import shipping_state
+import constructive
+import bounds
+import schedule
+import operators
+import random_stream
+import checkpoint
+import render
 
 global packages_dimensions, input_file_boxes, precision
 package_types = {'package_type1': [800, 1200],
                  'package_type2': [800, 600]}  # dictionary of available package types with dimensions in cm
 precision: float = 1.0  # precision of coordinates
+# strategy of initial packing: 'random' or one of constructive.strategies ('skyline', 'maxrects', 'guillotine')
+initial_strategy = 'random'
+initial_sort_by = 'area'  # order of boxes in constructive strategies: 'area' or 'longest_side'
 
-seed = 1
-np.random.seed(seed)
-# np.random.seed(None)
-print('seed = ', np.random.get_state()[1][0])
+seed = 1  # seed of random numbers of initial packing and annealing, see random_stream
 
 # Metpolis Monte Carlo simulated annealing parameters.
 global c0
@@ -21,103 +28,48 @@ alpha = 0.5  # cooling parameter
 # alpha = 0.0002
 c_min = 2  # minimal value of control parameter
 max_number_steps = 1000  # maximum number of steps for every cooling parameter
-
-
-def get_box(box_index, boxes_df):
-    """
-    return box from boxes_df stored with box_index
-    :param box_index:
-    :param boxes_df: list of dictionaries with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,
-    'rotated':, 'x_center': , 'y_center':}
-    :return:
-    """
-    return [b for b in boxes_df if b['box_index'] == box_index][0]
-
-
-def get_package(package_id, packages_df):
-    """
-    return package of package_id from packages_df
-    :param package_id:
-    :param packages_df: list of dictionaries with keys {'package_id':,'package_type':,'dimension_x':,'dimension_y':}
-    :return:
-    """
-    return [p for p in packages_df if p['package_id'] == package_id][0]
-
-
-def get_boxes_in_package(package_id, shipping_info):
-    """
-    return boxes stored in package with package_id
-    :param package_id:
-    :param shipping_info: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: list of dictionaries  [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    """
-    boxes = shipping_info['boxes']
-    return [box for box in boxes if box['package_id'] == package_id]
-
-
-def get_rotated_box(box):
-    """
-    alternate box dimensions and return updated box
-    change 'rotated' index to the opposite
-    :param box: {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':, 'x_center': , 'y_center':}
-    :return:updated box
-    """
-    box_x = box['dimension_x']
-    box_y = box['dimension_y']
-    box['dimension_x'] = box_y
-    box['dimension_y'] = box_x
-    if box['rotated'] == 'Not rotated':
-        box['rotated'] = 'Rotated'
-    else:
-        box['rotated'] = 'Not rotated'
-    return box
-
-
-def if_box_fits_to_empty_package(box_dimension_x, box_dimension_y, package_type):
-    """
-    This function check if a box of certain dimensions fits to package of package_type,
-    box can be rotated
-    :param box_dimension_y: height of box
-    :param box_dimension_x: length of box
-    :param package_type: str 'package_type1', 'package_type2' etc corresponding to global variable package_types.keys()
-    :return: True or False
-    """
-    package_dimensions = package_types[package_type]
-
-    if (box_dimension_x > package_dimensions[0]) and (box_dimension_x > package_dimensions[1]):
-        return False
-    if (box_dimension_y > package_dimensions[1]) and (box_dimension_y > package_dimensions[0]):
-        return False
-    if (box_dimension_x > package_dimensions[0]) and (box_dimension_x < package_dimensions[1]):
-        if box_dimension_y > package_dimensions[0]:
-            return False
-    if (box_dimension_y > package_dimensions[0]) and (box_dimension_y < package_dimensions[1]):
-        if box_dimension_x > package_dimensions[0]:
-            return False
-    if (box_dimension_x > package_dimensions[1]) and (box_dimension_x < package_dimensions[0]):
-        if box_dimension_y > package_dimensions[1]:
-            return False
-    if (box_dimension_y > package_dimensions[1]) and (box_dimension_y < package_dimensions[0]):
-        if box_dimension_x > package_dimensions[1]:
-            return False
-    return True
-
-
-def if_package_empty(package_id, shipping_dict):
-    """
-    check if package is empty
-    :param package_id: id of package to be checked
-    :param shipping_dict:
-    :return: True if package is empty; False if there is at least one box in a package
-    """
-
-    boxes = get_boxes_in_package(package_id, shipping_dict)
-    if len(boxes) == 0:
-        return True
-    else:
-        return False
+# 'geometric' - control parameter is multiplied by alpha after every level,
+# 'adaptive' - initial control parameter is calibrated, cooling depends on acceptance rate,
+# annealing stops after schedule.stagnation_levels levels without improvement (see module schedule)
+cooling_schedule = 'geometric'
+# annealing after small changes of order (see reoptimize_shipping) starts from warm_start_c0
+# and does warm_start_steps steps for every control parameter instead of max_number_steps of a full run,
+# it is stopped after warm_start_time_limit seconds, time_budget if None
+warm_start_c0 = 100
+warm_start_steps = 200
+warm_start_time_limit = None
+time_budget = None  # maximal time of annealing in seconds, no limit if None
+# weights of modifications of change_shipping_randomly (see shipping_state.operators),
+# shipping_state.default_operator_weights (all but compaction) if None
+operator_weights = None
+adaptive_operators = True  # adapt probabilities of modifications to their success during annealing
+# 'grid' - boxes are moved to uniformly random coordinates, 'free_space' - only to free space where they fit
+proposal_mode = 'grid'
+# compact current shipping (see shipping_state.compact_package) after every control parameter level
+# and the best shipping at the end of annealing
+compaction = False
+checkpoint_steps = 100000  # number of steps between checkpoints of annealing
+# parameters of annealing saved to checkpoints and restored when annealing is resumed
+checkpoint_settings = ['c_min', 'alpha', 'max_number_steps', 'proposal_mode', 'compaction']
+# directory where parsed Excel files with boxes are cached, see read_excel_box_array; no cache if None,
+# e.g. os.path.join(os.path.expanduser('~'), '.cache', '2d-packing')
+box_cache_directory = None
+debug_validity = False  # check every move with full if_shipping_valid in addition to the local check
+
+
+def get_fitting_mask(dimensions_x, dimensions_y):
+    """
+    check for many boxes at once that they fit into at least one of available package_types, boxes can be rotated
+    :param dimensions_x: array of lengths of boxes
+    :param dimensions_y: array of heights of boxes
+    :return: boolean array, True for boxes that fit
+    """
+    dimensions_x = np.asarray(dimensions_x, dtype=np.float64)
+    dimensions_y = np.asarray(dimensions_y, dtype=np.float64)
+    fits = np.zeros(len(dimensions_x), dtype=bool)
+    for package_dimensions in package_types.values():
+        fits |= shipping_state.if_box_fits_to_empty_package(dimensions_x, dimensions_y, package_dimensions)
+    return fits
 
 
 def boxes_checked(boxes_df):
@@ -128,15 +80,10 @@ def boxes_checked(boxes_df):
                 'rotated', 'x_center' , 'y_center']
     :return: updated list of boxes
     """
+    fits = get_fitting_mask([box['dimension_x'] for box in boxes_df], [box['dimension_y'] for box in boxes_df])
     updated_boxes = []
-    for box in boxes_df:
-        # check that box fits into dimensions of available package_types
-        if_fits_to_packages = []  # array of boolean
-        for package_type in package_types.keys():
-            if_fits_to_packages.append(if_box_fits_to_empty_package(box['dimension_x'],
-                                                                    box['dimension_y'],
-                                                                    package_type))
-        if not any(if_fits_to_packages):
+    for box, box_fits in zip(boxes_df, fits):
+        if not box_fits:
             print('box %.0fx%.0f does not fit to any of package types. Removing from shipping...' % (
                 box['dimension_x'], box['dimension_y']))
             continue
@@ -147,199 +94,124 @@ def boxes_checked(boxes_df):
 def get_boxes(filename):
     """
     This function reads in file with dimensions of boxes to be shipped,
-    :param filename:
+    if global variable box_cache_directory is set, parsed Excel files are written there as .npy files
+    and reused when the same file is read again
+    :param filename: Excel, CSV (.csv), Parquet (.parquet) or NumPy (.npy) file, see read_box_array
     :return: list of dictionaries with following columns:
-    'box_index' - number of the box as read from the file
+    'box_index' - number of the box as read from the file, integer
     'dimensions_x', 'dimension_y' - dimensions of box as read from file
     'package_id' - id of a package where box located, initialized with 0
     'rotated' - flag indicates if rotation happened, initialized with 'Not rotated'
     'x_center' , 'y_center' - x and y coordinates of box center
     """
-    boxes_df = []
-    for index, box in pd.read_excel(filename, names=['box_index', 'dimension_x', 'dimension_y'], header=0).iterrows():
-        box = box.to_dict()
-        box['package_id'] = 0
-        box['rotated'] = 'Not rotated'
-        box['x_center'] = 0.0
-        box['y_center'] = 0.0
-        boxes_df.append(box)
-
-    boxes_df = boxes_checked(boxes_df)
-    return boxes_df
-
-
-def pick_package_type(box):
-    """
-    This function picks a random package type if there are more than one available
-    or returns the only available package type
-    :param box: {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}
-    :return: one of the keys from global dictionary package_types
-    """
-    if len(package_types) > 1:
-        found = False
-        available_types = list(package_types.keys())  # list of available package types
-        while not found:
-            ind = np.random.randint(0, len(available_types))  # random index of a package type
-            package_type_to_fill = list(available_types)[ind]
-            if if_box_fits_to_empty_package(box['dimension_x'],
-                                            box['dimension_y'],
-                                            package_type_to_fill):
-                found = True
-            else:
-                available_types.remove(package_type_to_fill)
-    else:
-        package_type_to_fill = list(package_types.keys())[0]
-        # sanity check:
-        if not if_box_fits_to_empty_package(box['dimension_x'][0],
-                                            box['dimension_y'][0],
-                                            package_type_to_fill):
-            print("DEBUG: Box doesn't fit into the only available package type. Exit ")
-            return False
-    return package_type_to_fill
-
-
-def pick_package(packages_df):
-    """
-    randomly pick a package form the dictionary
-    :param packages_df: list of dictionaries [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: package dictionary {'package_id':,'package_type':,'dimension_x':,'dimension_y':}
-    """
-    if len(packages_df) == 0:
-        print("No packages to pick from shipping_dict, exit")
-        return False
-    ind = np.random.randint(0, len(packages_df))
-    package = packages_df[ind]
-    return package
-
+    return get_boxes_from_array(read_box_array(filename))
 
-def update_shipping_with_box(box, shipping_dict):
+
+def read_box_array(filename):
+    """
+    read dimensions of boxes from file, format is given by extension:
+    .csv, .parquet and Excel files - table with header and columns box_number, x, y (the first three columns),
+    .npy - array (n, 3) of box_number, x, y or array (n, 2) of x, y with boxes numbered from 1.
+    parsed Excel files are cached in box_cache_directory, see read_excel_box_array
+    :param filename: name of the file
+    :return: array (n, 3) of box_index, dimension_x, dimension_y
     """
-    modifies shipping dictionary by adding box
-    :param box: {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}
-    :param shipping_dict: shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return:
-    """
-    boxes_df = copy.deepcopy(shipping_dict['boxes'])
-    # update shipping_dict with new box
-    updated_boxes = []
-    for index in range(len(boxes_df)):
-        row = boxes_df[index]
-        if row['box_index'] == box['box_index']:
-            updated_boxes.append(copy.deepcopy(box))
-        else:
-            updated_boxes.append(copy.deepcopy(row))
-    shipping_dict['boxes'] = updated_boxes
-    return shipping_dict
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.npy':
+        boxes = np.load(filename)
+        if boxes.ndim != 2 or boxes.shape[1] not in (2, 3):
+            raise ValueError('array of boxes in %s must have 2 or 3 columns, got shape %s' % (filename, boxes.shape))
+        if boxes.shape[1] == 2:
+            boxes = np.column_stack([np.arange(1, len(boxes) + 1), boxes])
+        return boxes.astype(np.float64)
+    import pandas as pd
+    if extension == '.csv':
+        return get_numeric_box_array(pd.read_csv(filename, usecols=[0, 1, 2]), filename)
+    if extension == '.parquet':
+        return get_numeric_box_array(pd.read_parquet(filename).iloc[:, :3], filename)
+    return read_excel_box_array(filename)
 
 
-def if_box_fits_to_package(box_index, package_id, shipping_dict):
+def read_excel_box_array(filename):
     """
-    return true if box fits to package from shipping_dict
-    :param box_index: index of box in shipping_dict
-    :param package_id: index of package in shipping_dict
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: True or False
+    read dimensions of boxes from Excel file, parsed array is saved to box_cache_directory under the hash of
+    the file content, so the same file is parsed only once
+    :param filename: name of Excel file
+    :return: array (n, 3) of box_index, dimension_x, dimension_y
     """
-    boxes_df = shipping_dict['boxes']
-    box_to_fit = get_box(box_index, boxes_df)
-    packages_df = shipping_dict['packages']
-    package = get_package(package_id, packages_df)
-    if box_to_fit['dimension_x'] > package['dimension_x']:
-        return False
-    # list boxes that are already in package_id
-    boxes_in_package = get_boxes_in_package(package_id, shipping_dict)
-    # list coordinates of tops of boxes and find maximum
-    max_top_y_of_boxes = max([box['y_center'] + box['dimension_y'] / 2.0 for box in boxes_in_package])
-    # check if highest box top + height of box to fit is less than package height
-    if max_top_y_of_boxes + box_to_fit['dimension_y'] <= package['dimension_y']:
-        return True
-    else:
-        return False
+    if box_cache_directory is None:
+        return parse_excel_box_array(filename)
+    file_hash = hashlib.sha256()
+    with open(filename, 'rb') as excel_file:
+        for block in iter(lambda: excel_file.read(2 ** 20), b''):
+            file_hash.update(block)
+    cache_filename = os.path.join(box_cache_directory, file_hash.hexdigest() + '.npy')
+    if os.path.exists(cache_filename):
+        return np.load(cache_filename)
+    boxes = parse_excel_box_array(filename)
+    try:
+        os.makedirs(box_cache_directory, exist_ok=True)
+        # written under temporary name and renamed, so concurrent readers never see a partial file
+        temporary_filename = '%s.%d.tmp' % (cache_filename, os.getpid())
+        with open(temporary_filename, 'wb') as cache_file:
+            np.save(cache_file, boxes)
+        os.replace(temporary_filename, cache_filename)
+    except OSError as error:
+        print('boxes of %s are not cached: %s' % (filename, error))
+    return boxes
 
 
-def pick_package_for_box(box, shipping_dict):
+def parse_excel_box_array(filename):
     """
-    This function picks a random package from one of the packages in shipping_dict that satisfy condition that box
-    fits to package dimension, returns id of a package
-    :param shipping_dict: dictionary with a shipping info in a
-    format: {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]]
-    :param box: dictionary with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,
-    'rotated':,'x_center': , 'y_center':}
-    :return: package_id - id of a package where to put box
+    parse Excel file with boxes (pandas and openpyxl are imported only here, they are slow to import)
+    :return: array (n, 3) of box_index, dimension_x, dimension_y
     """
-    picked = False
-    while not picked:
-        package = pick_package(shipping_dict['packages'])
-        if if_box_fits_to_package(box['box_index'], package['package_id'], shipping_dict):
-            picked = True
-    return package['package_id']
+    import pandas as pd
+    return get_numeric_box_array(pd.read_excel(filename, usecols=[0, 1, 2]), filename)
 
 
-def calculate_area_packages(packages_df):
+def get_numeric_box_array(table, source):
     """
-    calculate sum of packages area of packages
-    :param packages_df: list of package dictionaries in format:
-    [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}]
-    :return: area: sum of packages area
+    convert table of boxes to array, box numbers must be integer (see get_boxes_from_array):
+    files with other box numbers, e.g. text labels, are rejected
+    :param table: Pandas DataFrame with columns box_number, x, y
+    :param source: name of the file the table was read from, for error message
+    :return: array (n, 3) of box_index, dimension_x, dimension_y
     """
-    area = sum([package['dimension_x'] * package['dimension_y'] for package in packages_df])
-    return area
+    try:
+        boxes = table.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError('box numbers and dimensions in %s must be numeric' % source)
+    return boxes
 
 
-def add_package(shipping_dict, package_type):
+def get_boxes_from_table(table):
     """
-    add package of package_type to shipping_dict
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]}
-    :param package_type: one of the keys from global dictionary package_types
-    :return: updated shipping_dict
+    This function converts table with dimensions of boxes to be shipped to list of boxes
+    :param table: Pandas DataFrame with columns ['box_index', 'dimension_x', 'dimension_y']
+    :return: list of dictionaries in the same format as of get_boxes
     """
-    packages_df = shipping_dict['packages']
-    if len(packages_df) == 0:
-        package_id = 1
-    else:
-        package_id = max([package['package_id'] for package in packages_df]) + 1
-    new_package = {'package_id': package_id,
-                   'package_type': package_type,
-                   'dimension_x': package_types[package_type][0],
-                   'dimension_y': package_types[package_type][1]}
-    packages_df.append(new_package)
-    shipping_dict['packages'] = packages_df
-    shipping_dict['n_packages'] = shipping_dict['n_packages'] + 1
-    shipping_dict['area'] = calculate_area_packages(shipping_dict['packages'])
-    return shipping_dict
+    return get_boxes_from_array(get_numeric_box_array(table[['box_index', 'dimension_x', 'dimension_y']], 'table'))
 
 
-def remove_empty_package(package_id, shipping_dict):
+def get_boxes_from_array(boxes):
     """
-    checks that package is empty,
-    remove package of package_id from shipping_dict
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]}
-    :param package_id: id of package to be removed
-    :return: updated shipping_dict, False if package is not empty
+    This function converts array with dimensions of boxes to be shipped to list of boxes,
+    boxes that don't fit into any of package_types are removed
+    :param boxes: array (n, 3) of box_index, dimension_x, dimension_y; box_index must be integer, boxes are
+    identified by integer box_index in shipping_state
+    :return: list of dictionaries in the same format as of get_boxes
     """
-    packages_df = copy.deepcopy(shipping_dict['packages'])
-    boxes_df = shipping_dict['boxes']
-    if not if_package_empty(package_id, shipping_dict):
-        print("Error: empty package to be removed is not empty. Exit ")
-        return False
-
-    updated_packages = []
-    for index in range(len(packages_df)):
-        row = packages_df[index]
-        if row['package_id'] != package_id:
-            updated_packages.append(row)
-    shipping_dict['packages'] = updated_packages
-    return shipping_dict
+    boxes = np.asarray(boxes, dtype=np.float64)
+    if np.any(boxes[:, 0] != np.round(boxes[:, 0])):
+        raise ValueError('box numbers must be integer')
+    fits = get_fitting_mask(boxes[:, 1], boxes[:, 2])
+    for dimension_x, dimension_y in boxes[~fits, 1:3]:
+        print('box %.0fx%.0f does not fit to any of package types. Removing from shipping...' % (
+            dimension_x, dimension_y))
+    return [{'box_index': int(box_index), 'dimension_x': dimension_x, 'dimension_y': dimension_y, 'package_id': 0,
+             'rotated': 'Not rotated', 'x_center': 0.0, 'y_center': 0.0}
+            for box_index, dimension_x, dimension_y in boxes[fits].tolist()]
 
 
 def if_intersect_x(box_1, box_2):
@@ -390,285 +262,19 @@ def if_intersect_y(box_1, box_2):
         return False
 
 
-def put_box_in_package(shipping_dict, box_index, package_id):
-    """
-    assign random x coordinates to box inside package, no checks performed on wether box fits to package
-    put box on top of another box if there is another box in x coordinate
-    box is not rotated inside function
-    coordinates are assigned within precision stored in global variable precision
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]}
-    :param box_index: index of a box to be moved
-    :param package_id: id of a package where to put box
-    :return: updated shipping_dict
-    """
-    boxes_df = shipping_dict['boxes']
-    packages_df = shipping_dict['packages']
-    # list boxes from package with package_id
-    boxes_list = get_boxes_in_package(package_id, shipping_dict)
-    # find box with box_index
-    box_to_move = get_box(box_index, boxes_df)
-    # update box's package_id
-    box_to_move['package_id'] = package_id
-    # generate random x coordinate of box center
-    package_length = [package['dimension_x'] for package in packages_df if package['package_id'] == package_id][0]
-
-    available_x_center = np.arange(box_to_move['dimension_x'] / 2.0,
-                                   package_length - box_to_move['dimension_x'] / 2.0 + precision,
-                                   precision)
-    box_to_move['x_center'] = np.random.choice(available_x_center)
-    # boxes in package that intersect with box_to_move in x direction
-    intersect_boxes = []
-    for box in boxes_list:
-        if box['box_index'] == box_to_move["box_index"]:
-            continue
-        if if_intersect_x(box_to_move, box):
-            intersect_boxes.append(box)
-    if len(intersect_boxes) > 0:
-        # put on top of highest box
-        # print("intersected boxes:------")
-        # print(intersect_boxes)
-        y_top = max([(box['y_center'] + box['dimension_y'] / 2.0) for box in intersect_boxes])
-        box_to_move['y_center'] = y_top + box_to_move['dimension_y'] / 2.0
-        # print(box_to_move)
-        # print("------------------------")
-    else:
-        # put on bottom of the package
-        box_to_move['y_center'] = box_to_move['dimension_y'] / 2.0  # put on bottom of the package
-    updated_boxes = []
-    for index in range(len(boxes_df)):
-        row = boxes_df[index]
-        if row['box_index'] == box_to_move['box_index']:
-            updated_boxes.append(box_to_move)
-        else:
-            updated_boxes.append(row)
-    shipping_dict['boxes'] = updated_boxes
-    return shipping_dict
-
-
-def move_box_in_same_package(shipping_dict, box_index):
-    '''
-    assign random x and y coordinates within package borders
-    :param shipping: shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :param box_index: index of the box to be moved
-    :return:
-    '''
-    boxes_df = copy.deepcopy(shipping_dict['boxes'])
-    packages_df = shipping_dict['packages']
-    box_to_move = get_box(box_index, boxes_df)
-    package_id = box_to_move['package_id']
-    # generate random x coordinate within package borders
-    package_length = [package['dimension_x'] for package in packages_df if package['package_id'] == package_id][0]
-    available_x_center = np.arange(box_to_move['dimension_x'] / 2.0,
-                                   package_length - box_to_move['dimension_x'] / 2.0 + precision,
-                                   precision)
-    box_to_move['x_center'] = np.random.choice(available_x_center)
-    # generate random y coordinate within package borders
-    package_width = [package['dimension_y'] for package in packages_df if package['package_id'] == package_id][0]
-    available_y_center = np.arange(box_to_move['dimension_y'] / 2.0,
-                                   package_width - box_to_move['dimension_y'] / 2.0 + precision,
-                                   precision)
-    box_to_move['y_center'] = np.random.choice(available_y_center)
-    shipping_dict = update_shipping_with_box(box_to_move, shipping_dict)
-    return copy.deepcopy(shipping_dict)
-
-
-def move_box_to_random_package(shipping_dict, box_index):
-    '''
-    assign random x and y coordinates in random package
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :param box_index: index of the box to be moved
-    :return:
-    '''
-
-    boxes_df = copy.deepcopy(shipping_dict['boxes'])
-    packages_df = shipping_dict['packages']
-
-    box_to_move = get_box(box_index, boxes_df)
-    package_original = box_to_move['package_id']
-    random_package_id = package_original
-    while package_original == random_package_id:  # make sure that picked package is not the same where the box already is
-        random_package = pick_package(packages_df)
-        random_package_id = random_package['package_id']
-
-    # generate random x coordinate within package borders
-    package_length = [package['dimension_x'] for package in packages_df if package['package_id'] == random_package_id][
-        0]
-    available_x_center = np.arange(box_to_move['dimension_x'] / 2.0,
-                                   package_length + precision,
-                                   precision)
-    box_to_move['x_center'] = np.random.choice(available_x_center)
-    # generate random y coordinate within package borders
-    package_height = [package['dimension_y'] for package in packages_df if package['package_id'] == random_package_id][
-        0]
-    available_y_center = np.arange(box_to_move['dimension_y'] / 2.0,
-                                   package_height + precision,
-                                   precision)
-    box_to_move['package_id'] = random_package_id
-    box_to_move['y_center'] = np.random.choice(available_y_center)
-    shipping_dict = update_shipping_with_box(box_to_move, shipping_dict)
-
-    return copy.deepcopy(shipping_dict)
-
-
-def rotate_box(shipping_dict, box_index):
-    """
-    rotate
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :param box_index: index of the box to be moved
-    :return: updated shipping_dict
-    """
-    boxes_df = copy.deepcopy(shipping_dict['boxes'])
-    box_to_rotate = get_box(box_index, boxes_df)
-    rotated_box = get_rotated_box(box_to_rotate)
-
-    # update shipping_dict with new box
-    shipping_dict = update_shipping_with_box(rotated_box, shipping_dict)
-
-    return shipping_dict
-
-
-def swap_boxes_same_container(box_1_index, box_2_index, shipping_dict):
-    """
-    swap coordinates of two boxes in the same container
-    :param box_1_index:
-    :param box_2_index:
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: updated shipping_dict
-    """
-    box_1 = get_box(box_1_index, shipping_dict['boxes'])
-    box_2 = get_box(box_2_index, shipping_dict['boxes'])
-    if box_1['package_id'] != box_2['package_id']:
-        print(" in swap_boxes_same_container: package id is not the same. Exit")
-        return False
-    box_1_x_center = box_1['x_center']
-    box_2_x_center = box_2['x_center']
-    box_1_y_center = box_1['y_center']
-    box_2_y_center = box_2['y_center']
-    box_1['x_center'] = box_2_x_center
-    box_1['y_center'] = box_2_y_center
-    box_2['x_center'] = box_1_x_center
-    box_2['y_center'] = box_1_y_center
-    shipping_dict = update_shipping_with_box(box_1, shipping_dict)
-    shipping_dict = update_shipping_with_box(box_2, shipping_dict)
-
-    return shipping_dict
-
-
-def swap_boxes(box_1_index, box_2_index, shipping_dict):
-    """
-    swap coordinates of two boxes
-    :param box_1_index: index of box 1
-    :param box_2_index: index of box 2
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: updated shipping_dict
-    """
-    box_1 = get_box(box_1_index, shipping_dict['boxes'])
-    box_2 = get_box(box_2_index, shipping_dict['boxes'])
-    box_1_package = box_1['package_id']
-    box_2_package = box_2['package_id']
-
-    box_1_x_center = box_1['x_center']
-    box_2_x_center = box_2['x_center']
-    box_1_y_center = box_1['y_center']
-    box_2_y_center = box_2['y_center']
-    box_1['x_center'] = box_2_x_center
-    box_1['y_center'] = box_2_y_center
-    box_2['x_center'] = box_1_x_center
-    box_2['y_center'] = box_1_y_center
-    box_1['package_id'] = box_2_package
-    box_2['package_id'] = box_1_package
-    shipping_dict = update_shipping_with_box(box_1, shipping_dict)
-    shipping_dict = update_shipping_with_box(box_2, shipping_dict)
-    return shipping_dict
-
-
-def if_box_fits_to_shipping(box, shipping_dict):
-    """
-    return True if box fits to at least one package in shipping_dict
-    :param box: {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: True or False
-    """
-    packages = shipping_dict['packages']
-    for package in packages:
-        if if_box_fits_to_package(box['box_index'], package['package_id'], shipping_dict):
-            return True
-    return False
-
-    return True
-
-
-def pack_boxes_randomly(shipping_dict):
-    """
-    pack boxes in packages in random order,
-    if next box doesn't fit into a package anymore,
-    new packages of a random type is taken
-    :param shipping_dict: dictionary with a shipping info in a format:
-    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
-    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
-    :return: updated shipping_dic
-    """
-    boxes_df = shipping_dict['boxes']
-
-    random_box_index_list = np.random.permutation([b['box_index'] for b in boxes_df])
-    for box_index in random_box_index_list:
-        packages_df = shipping_dict['packages']
-        box = get_box(box_index, boxes_df)
-        # pick package where to put box
-        if len(packages_df) == 0:
-            # if shipping_dic doesn't have any packages yet, pick a type of a package randomly, but so box would fit
-            package_type_to_fill = pick_package_type(box)
-            # add new package to shipping
-            shipping_dict = add_package(shipping_dict, package_type_to_fill)
-            # put box to package into a lower left corner
-            package_id = 1
-        else:
-            if not if_box_fits_to_shipping(box, shipping_dict):  # check if there is space left in existing packages
-                # if no space, add new random package
-                package_type_to_fill = pick_package_type(box)
-                shipping_dict = add_package(shipping_dict, package_type_to_fill)
-                package_id = max([pack["package_id"] for pack in shipping_dict['packages']])
-            else:
-                # pick a random package out of existing, but so box would fit
-                package_id = pick_package_for_box(box, shipping_dict)
-        # put box of box_index
-        # check if box needs to be rotated before put to package_id
-        package = get_package(package_id, shipping_dict['packages'])
-        if box['dimension_x'] > package['dimension_x'] or box['dimension_y'] > package['dimension_y']:
-            rotated_box = get_rotated_box(box)
-            # update shipping_dict with new set of boxes
-            updated_boxes = []
-            for b in boxes_df:
-                if b['box_index'] == rotated_box['box_index']:
-                    updated_boxes.append(rotated_box)
-                else:
-                    updated_boxes.append(b)
-            shipping_dict['boxes'] = updated_boxes
-        shipping_dict = put_box_in_package(shipping_dict, box_index, package_id)
-
-    return shipping_dict
-
-
-def initialize_shipping(filename):
+def initialize_shipping(filename, strategy=None, sort_by=None, rng=None):
     """
     This function reads in file with dimensions of boxes to be shipped,
     randomly puts boxes in a number of packages,
     fills in a dataframe with shipping info
     :param filename: name of the file with boxes for shipping
+    :param strategy: strategy of initial packing, global variable initial_strategy by default:
+    'random' - boxes are put in random order to random packages at random x coordinates,
+    'skyline', 'maxrects', 'guillotine' - deterministic heuristics of module constructive
+    :param sort_by: order of boxes in constructive strategies, 'area' or 'longest_side',
+    global variable initial_sort_by by default
+    :param rng: random_stream.RandomStream or numpy.random.Generator of strategy 'random',
+    new stream seeded with global variable seed if None
     :return: dictionary with initial random guess of shipping arrangement
     shipping_dict format:
     {'area': overall area occupied by all packages,
@@ -677,21 +283,105 @@ def initialize_shipping(filename):
      'boxes': # list of dictionaries with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,'rotated':,
                 'x_center': , 'y_center':}
     """
+    # Add boxes for shipping:
+    boxes_df = get_boxes(filename)
+    return initialize_shipping_from_boxes(boxes_df, strategy, sort_by, rng)
+
+
+def initialize_shipping_from_boxes(boxes_df, strategy=None, sort_by=None, rng=None):
+    """
+    puts boxes in a number of packages according to strategy
+    :param boxes_df: list of dictionaries with keys {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,
+    'rotated':, 'x_center': , 'y_center':} as returned by get_boxes
+    :param strategy: strategy of initial packing, see initialize_shipping
+    :param sort_by: order of boxes in constructive strategies, see initialize_shipping
+    :param rng: random numbers of strategy 'random', see initialize_shipping
+    :return: dictionary with initial arrangement, same format as of initialize_shipping
+    """
+    if strategy is None:
+        strategy = initial_strategy
+    if sort_by is None:
+        sort_by = initial_sort_by
     shipping_dict = dict(columns=['area', 'n_packages', 'packages', 'boxes'],
                          dtype=[float, int, list, list])
     shipping_dict['area'] = 0
     shipping_dict['n_packages'] = 0
     shipping_dict['packages'] = []
-
-    # Add boxes for shipping:
-    boxes_df = get_boxes(filename)
     shipping_dict['boxes'] = boxes_df
-    # Pack boxes randomly
-    shipping_dict = pack_boxes_randomly(shipping_dict)
+    # Pack boxes, packing is done on array-backed shipping state
+    state = shipping_state.shipping_state_from_dict(shipping_dict, package_types, precision)
+    if strategy == 'random':
+        state = shipping_state.pack_boxes_randomly(state, random_stream.get_random_stream(rng, seed))
+    else:
+        state = constructive.pack_boxes_constructive(state, strategy, sort_by)
 
+    return shipping_state.shipping_state_to_dict(state)
+
+
+def solve_shipping(boxes_df, cache=None, rng=None):
+    """
+    initial packing of boxes followed by simulated annealing, solution is taken from cache if an order with the
+    same boxes (up to order, indexes and rotation) was already solved with the same package_types and precision
+    :param boxes_df: list of box dictionaries as returned by get_boxes
+    :param cache: solution_cache.SolutionCache, every order is solved if None
+    :param rng: random numbers of initial packing and annealing, see packing_with_monte_carlo
+    :return: shipping_dict as returned by packing_with_monte_carlo
+    """
+    if cache is not None:
+        shipping_dict = cache.get(boxes_df, package_types, precision)
+        if shipping_dict is not None:
+            return shipping_dict
+    rng = random_stream.get_random_stream(rng, seed)
+    shipping_dict = packing_with_monte_carlo(initialize_shipping_from_boxes(boxes_df, rng=rng), rng=rng)
+    if cache is not None:
+        cache.put(shipping_dict, package_types, precision)
     return shipping_dict
 
 
+def reoptimize_shipping(shipping_dict, added_boxes=(), removed_box_indexes=(), rng=None, telemetry=None):
+    """
+    update solution of an order after a few boxes were added or removed: removed boxes are dropped (with packages
+    that become empty), added boxes are put into free space of existing packages or into new packages
+    (see shipping_state.insert_box), then shipping is annealed only at low control parameters:
+    from warm_start_c0 with geometric cooling, with warm_start_steps steps for every control parameter
+    and time limit warm_start_time_limit
+    :param shipping_dict: previous solution, e.g. returned by packing_with_monte_carlo
+    :param added_boxes: list of box dictionaries as returned by get_boxes, box_index must be new
+    :param removed_box_indexes: indexes of boxes to be removed
+    :param rng: random numbers of annealing, see packing_with_monte_carlo
+    :param telemetry: telemetry.Telemetry, see packing_with_monte_carlo
+    :return: shipping_dict as returned by packing_with_monte_carlo
+    """
+    removed_box_indexes = set(removed_box_indexes)
+    boxes = [box for box in shipping_dict['boxes'] if box['box_index'] not in removed_box_indexes]
+    added_boxes = boxes_checked(added_boxes)
+    box_indexes = set(box['box_index'] for box in boxes)
+    for box in added_boxes:
+        if box['box_index'] in box_indexes:
+            raise ValueError('box %s is already in shipping' % box['box_index'])
+        box_indexes.add(box['box_index'])
+    added_boxes = [dict(box, package_id=0, rotated='Not rotated', x_center=0.0, y_center=0.0) for box in added_boxes]
+    state = shipping_state.shipping_state_from_dict({'packages': shipping_dict['packages'],
+                                                     'boxes': boxes + added_boxes}, package_types, precision)
+    shipping_state.remove_empty_packages(state)
+    for box in added_boxes:
+        shipping_state.insert_box(state, box['box_index'])
+    return packing_with_monte_carlo(shipping_state.shipping_state_to_dict(state), cooling='geometric',
+                                    time_limit=warm_start_time_limit, rng=rng, telemetry=telemetry,
+                                    c_start=warm_start_c0, steps_per_level=warm_start_steps)
+
+
+def compact_shipping(shipping_dict):
+    """
+    push boxes in every package of shipping_dict to the bottom-left corner, see shipping_state.compact_package
+    :param shipping_dict: dictionary with a shipping info, as returned by packing_with_monte_carlo
+    :return: compacted shipping_dict, keys other than 'area', 'n_packages', 'packages', 'boxes' are kept
+    """
+    state = shipping_state.shipping_state_from_dict(shipping_dict, package_types, precision)
+    shipping_state.compact_shipping(state)
+    return dict(shipping_dict, **shipping_state.shipping_state_to_dict(state))
+
+
 def if_shipping_valid(shipping_dict):
     """
     return True if boxes in packages don't intersect with each other and
@@ -702,82 +392,8 @@ def if_shipping_valid(shipping_dict):
                 'x_center': , 'y_center':}
     :return: True or False
     """
-    # check each package
-    packages = shipping_dict['packages']
-
-    for package in packages:
-        boxes_in_package = get_boxes_in_package(package['package_id'], shipping_dict)
-        for box in boxes_in_package:
-            if box['x_center'] - box['dimension_x'] / 2.0 < 0.0 or \
-                    box['x_center'] + box['dimension_x'] / 2.0 > package['dimension_x'] or \
-                    box['y_center'] - box['dimension_y'] / 2.0 < 0.0 or \
-                    box['y_center'] + box['dimension_y'] / 2.0 > package['dimension_y']:
-                return False
-            for box2 in boxes_in_package:
-                if box['box_index'] == box2['box_index']:
-                    continue
-                if if_intersect_x(box, box2):  # if boxes intersect in x direction
-                    if if_intersect_y(box, box2):  # check y direction
-                        return False
-    return True
-
-
-def change_shipping_randomly(shipping_dict):
-    """
-    1. randomly perform one of the modifications in shipping:
-    - move box to random x coordinate in the same package, put on top of highest box below
-    - move box to random x coordinate in random package, put on top of highest box below
-    - rotate random box
-    - swap x coordinates of two random boxes in the same container, y coordinates are recalculated
-    - swap x coordinates of two random boxes from different containers, y coordinates are recalculated
-    2. reject modification if any boxes in updated shipping are outside of container or intersect with each other
-    3. remove any empty packages
-    4. update shipping area
-    4. if modification accepted, modify shipping_dict
-    :param shipping_dict: dictionary with initial arrangement {'area': overall area occupied by all packages,
-    'n_packages': number of packages,
-     'packages': # list of dictionaries with keys {'package_id':,'package_type':,'dimension_x':,'dimension_y':}
-     'boxes': # list of dictionaries with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,'rotated':,
-                'x_center': , 'y_center':}
-    :return: shipping_dict , updated if  modification was accepted
-    """
-    # perform one of the modifications in shipping
-    n_permitted_moves = 5
-    rndn = np.random.randint(0, n_permitted_moves)
-    random_box_index = np.random.choice([b['box_index'] for b in shipping_dict['boxes']])
-    random_box = get_box(random_box_index, shipping_dict['boxes'])
-    random_box_package_id = random_box['package_id']
-    if rndn == 0:
-        # move random box to random x coordinate in the same package, put on top of highest box below
-        shipping_dict = move_box_in_same_package(shipping_dict, random_box_index)
-    elif rndn == 1:
-        # move random box to another random package, put on top of highest box below
-        shipping_dict = move_box_to_random_package(shipping_dict, random_box_index)
-    elif rndn == 2:
-        # rotate box
-        shipping_dict = rotate_box(shipping_dict, random_box_index)
-    elif rndn == 3:
-        # swap two boxes in the same package
-        # are there other boxes in package:
-        boxes_in_package = get_boxes_in_package(random_box_package_id, shipping_dict)
-        if len(boxes_in_package) > 1:
-            indexes = [b['box_index'] for b in boxes_in_package if b['box_index'] != random_box_index]
-            random_box_2_index = np.random.choice(indexes)
-            shipping_dict = swap_boxes_same_container(random_box_index, random_box_2_index, shipping_dict)
-
-    elif rndn == 4:
-
-        # swap two boxes from different packages
-        indexes = [b['box_index'] for b in shipping_dict['boxes'] if b['box_index'] != random_box_index]
-        random_box_2_index = np.random.choice(indexes)
-        shipping_dict = swap_boxes(random_box_index, random_box_2_index, shipping_dict)
-    '''
-    elif rndn == 5:
-        # add a new container of random type
-    '''
-    # 4. update shipping area
-    shipping_dict['area'] = calculate_area_packages(shipping_dict['packages'])
-    return shipping_dict
+    state = shipping_state.shipping_state_from_dict(shipping_dict, package_types, precision)
+    return shipping_state.if_shipping_valid(state)
 
 
 def maxwell_distribution(delta, c):
@@ -790,109 +406,249 @@ def maxwell_distribution(delta, c):
     return np.exp(-delta / c)
 
 
-def packing_with_monte_carlo(shipping_dict):
+def packing_with_monte_carlo(shipping_dict, cooling=None, time_limit=None, selector=None, rng=None, telemetry=None,
+                             checkpoint_file=None, c_start=None, steps_per_level=None):
     """
     optimize arrangement of boxes in packages with Metropolis Monte Carlo simulated annealing method
-    uses global variable:
+    uses global variables c0, alpha, c_min, max_number_steps
     :param shipping_dict: dictionary with initial arrangement {'area': overall area occupied by all packages,
     'n_packages': number of packages,
      'packages': # list of dictionaries with keys {'package_id':,'package_type':,'dimension_x':,'dimension_y':}
      'boxes': # list of dictionaries with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,'rotated':,
                 'x_center': , 'y_center':}
-    :return: updated shipping_dict
-    """
-    current_shipping = copy.deepcopy(shipping_dict)
-    c = c0
-    while c >= c_min:  # loop over control parameter
+    :param cooling: 'geometric' or 'adaptive', global variable cooling_schedule by default
+    :param time_limit: maximal time of annealing in seconds, global variable time_budget by default
+    :param selector: operators.OperatorSelector, created from global variables operator_weights and
+    adaptive_operators if None; pass own selector to read statistics of modifications after annealing
+    :param rng: random_stream.RandomStream or numpy.random.Generator, new stream seeded with global variable seed
+    if None; all random numbers of annealing are taken from it
+    :param telemetry: telemetry.Telemetry collecting statistics of every control parameter level and phase timers,
+    nothing is measured if None
+    :param checkpoint_file: name of .npz file the run is written to after every checkpoint_steps steps,
+    the run can be continued from it with resume_packing_with_monte_carlo; no checkpoints if None
+    :param c_start: initial control parameter, c0 (or calibrated one for adaptive cooling) if None
+    :param steps_per_level: number of steps for every control parameter, global variable max_number_steps if None
+    :return: the best shipping_dict found during annealing with additional keys 'lower_bound' - lower bound of
+    area of packages and 'optimality_gap' - relative difference between area and lower bound
+    """
+    if cooling is None:
+        cooling = cooling_schedule
+    if time_limit is None:
+        time_limit = time_budget
+    if proposal_mode not in shipping_state.proposal_modes:
+        raise ValueError('unknown proposal mode %s, available: %s' % (proposal_mode, shipping_state.proposal_modes))
+    if selector is None:
+        selector = operators.OperatorSelector(operator_weights, adaptive_operators)
+    rng = random_stream.get_random_stream(rng, seed)
+    # annealing is done in place on array-backed shipping state,
+    # every random modification is recorded as a move and undone if it is rejected
+    current_shipping = shipping_state.shipping_state_from_dict(shipping_dict, package_types, precision)
+    best_shipping = shipping_state.copy_shipping_state(current_shipping)
+    if c_start is not None:
+        c = c_start
+    elif cooling == 'adaptive':
+        c = schedule.calibrate_initial_temperature(current_shipping, c0, rng, proposal_mode=proposal_mode,
+                                                   enabled_operators=np.flatnonzero(selector.enabled).tolist())
+    else:
+        c = c0
+    # variables of the run, saved to checkpoints together with the states
+    run = {'c': c,
+           'step': 0,  # number of steps done at the current control parameter level
+           'n_steps': 0,  # number of steps done since the start of annealing
+           'n_accepted': 0,  # number of accepted modifications at the current level
+           'improved': False,  # if the best state was improved at the current level
+           'levels_without_improvement': 0,
+           # annealing stops as soon as area reaches lower bound, solution can't be improved anymore
+           'lower_bound': get_lower_bound(current_shipping),
+           'cooling': cooling,
+           'time_limit': time_limit,
+           'elapsed': 0.0,  # time of annealing in seconds
+           'settings': {name: globals()[name] for name in checkpoint_settings}}
+    if steps_per_level is not None:
+        run['settings']['max_number_steps'] = steps_per_level
+    return run_annealing(run, current_shipping, best_shipping, rng, selector, telemetry, checkpoint_file)
+
+
+def resume_packing_with_monte_carlo(checkpoint_file, telemetry=None):
+    """
+    continue annealing from checkpoint written by packing_with_monte_carlo with settings of the interrupted run
+    (global variables of checkpoint_settings are not changed), the run continues exactly as it would without
+    interruption and keeps writing checkpoints to the same file
+    :param checkpoint_file: name of .npz file
+    :param telemetry: telemetry.Telemetry collecting statistics of the remaining levels, nothing is measured if None
+    :return: the best shipping_dict, see packing_with_monte_carlo
+    """
+    saved = checkpoint.load_checkpoint(checkpoint_file)
+    run = saved['run']
+    rng = random_stream.RandomStream()
+    rng.set_state(saved['rng'])
+    selector = operators.OperatorSelector()
+    selector.set_state(saved['selector'])
+    return run_annealing(run, saved['current'], saved['best'], rng, selector, telemetry, checkpoint_file)
+
+
+def run_annealing(run, current_shipping, best_shipping, rng, selector, telemetry=None, checkpoint_file=None):
+    """
+    loop of Metropolis Monte Carlo simulated annealing over control parameter levels,
+    see packing_with_monte_carlo and resume_packing_with_monte_carlo
+    :param run: dictionary of variables of the run, updated in place; annealing uses values of checkpoint_settings
+    in run['settings'] instead of global variables
+    :param current_shipping: shipping_state.ShippingState, modified in place
+    :param best_shipping: shipping_state.ShippingState, the best state found so far
+    :param rng: random_stream.RandomStream
+    :param selector: operators.OperatorSelector
+    :param telemetry: telemetry.Telemetry or None
+    :param checkpoint_file: name of .npz file to write checkpoints to or None
+    :return: the best shipping_dict with keys 'lower_bound' and 'optimality_gap'
+    """
+    lower_bound = run['lower_bound']
+    settings = run['settings']
+    started = time.time() - run['elapsed']
+    deadline = None if run['time_limit'] is None else started + run['time_limit']
+    out_of_time = False
+    # loop over control parameter
+    while run['c'] >= settings['c_min'] and best_shipping.area > lower_bound and not out_of_time:
         # perform max_number_steps for each cooling parameter
-        for step_counter in range(max_number_steps):
-            area_before_change = current_shipping['area']
-            shipping_dict_modified = {}
-            shipping_dict_modified = copy.deepcopy(current_shipping)
-            shipping_dict_modified = change_shipping_randomly(shipping_dict_modified)  # randomly modify shipping
-            # 2. reject modification if any boxes in updated shipping are outside of container or intersect with each other
-
-            if not if_shipping_valid(shipping_dict_modified):
-                # if random move was not accepted because box was put into occupied space or outside the package
-                # continue to next step without accepting the modification
-                continue
+        if telemetry is not None and telemetry.level is None:
+            telemetry.start_level(run['c'])
+        while run['step'] < settings['max_number_steps']:
+            accepted = metropolis_step(current_shipping, run['c'], rng, selector, telemetry, settings['proposal_mode'])
+            run['step'] += 1
+            run['n_steps'] += 1
+            if accepted:
+                run['n_accepted'] += 1
+                if current_shipping.area < best_shipping.area:
+                    copy_start = time.perf_counter() if telemetry is not None else None
+                    best_shipping = shipping_state.copy_shipping_state(current_shipping)
+                    if telemetry is not None:
+                        telemetry.add_time('copy', copy_start)
+                    run['improved'] = True
+                    if best_shipping.area <= lower_bound:
+                        break
+            if deadline is not None and time.time() > deadline:
+                out_of_time = True
+                break
+            if checkpoint_file is not None and run['n_steps'] % checkpoint_steps == 0:
+                run['elapsed'] = time.time() - started
+                checkpoint.save_checkpoint(checkpoint_file, run, current_shipping, best_shipping, rng, selector)
+        if settings['compaction']:
+            shipping_state.compact_shipping(current_shipping)
+        if telemetry is not None:
+            telemetry.end_level(current_shipping.area, best_shipping.area)
+        if run['cooling'] == 'adaptive':
+            run['levels_without_improvement'] = 0 if run['improved'] else run['levels_without_improvement'] + 1
+            if run['levels_without_improvement'] >= schedule.stagnation_levels:
+                break
+            run['c'] = schedule.get_adaptive_alpha(run['n_accepted'] / float(settings['max_number_steps'])) * run['c']
+        else:
+            run['c'] = settings['alpha'] * run['c']
+        run['step'] = 0
+        run['n_accepted'] = 0
+        run['improved'] = False
+    if settings['compaction']:
+        shipping_state.compact_shipping(best_shipping)
+    shipping_dict = shipping_state.shipping_state_to_dict(best_shipping)
+    return bounds.add_optimality_gap(shipping_dict, lower_bound)
+
+
+def get_lower_bound(state):
+    """
+    return lower bound of area of packages needed for boxes of state, see module bounds
+    :param state: shipping_state.ShippingState
+    :return: lower bound of area
+    """
+    return bounds.get_lower_bounds(state.box_dimension_x, state.box_dimension_y,
+                                   state.package_types)['lower_bound']
+
+
+def metropolis_step(state, c, rng, selector=None, telemetry=None, mode=None):
+    """
+    perform one step of Metropolis Monte Carlo on state in place:
+    1. randomly modify shipping
+    2. reject modification if any boxes are outside of container or intersect with each other
+    3. remove any empty containers
+    4. accept or reject modification according to Maxwell distribution
+    rejected modifications are undone, so the step costs only as much as the number of boxes it touched
+    :param state: shipping_state.ShippingState, modified in place
+    :param c: control parameter (or temperature)
+    :param rng: random_stream.RandomStream
+    :param selector: operators.OperatorSelector that picks modification and collects its outcome,
+    modification is picked uniformly if None
+    :param telemetry: telemetry.Telemetry, outcome and time of phases of the step are added to its current level
+    :param mode: one of shipping_state.proposal_modes, global variable proposal_mode by default
+    :return: True if modification was accepted, False otherwise
+    """
+    if mode is None:
+        mode = proposal_mode
+    area_before_change = state.area
+    phase_start = time.perf_counter() if telemetry is not None else None
+    operator = None if selector is None else selector.select(rng)
+    move = shipping_state.begin_move(state)
+    shipping_state.change_shipping_randomly(state, rng, operator, mode)  # randomly modify shipping
+    if telemetry is not None:
+        phase_start = telemetry.add_time('propose', phase_start)
+    if shipping_state.if_move_empty(move):
+        # modification changed nothing (e.g. compaction of a compact package), nothing to validate or accept
+        shipping_state.commit_move(state)
+        if selector is not None:
+            selector.update(operator, 'unchanged')
+        if telemetry is not None:
+            telemetry.update('unchanged')
+        return False
+    # only boxes touched by the move are checked, the rest of shipping was valid before the move
+    valid = shipping_state.if_move_valid(state, move)
+    if debug_validity:
+        assert valid == shipping_state.if_shipping_valid(state), 'local and full validity checks disagree'
+    if telemetry is not None:
+        phase_start = telemetry.add_time('validate', phase_start)
+    if not valid:
+        # if random move was not accepted because box was put into occupied space or outside the package
+        # undo the modification
+        shipping_state.undo_move(state, move)
+        outcome = 'invalid'
+    else:
+        # only packages boxes were moved out of can become empty
+        shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+        if telemetry is not None:
+            telemetry.add_time('cleanup', phase_start)
+        area_after_change = state.area
+        if area_after_change <= area_before_change:
+            # if area of packages became smaller (package was removed) or stayed the same, keep modification
+            shipping_state.commit_move(state)
+            outcome = 'improved' if area_after_change < area_before_change else 'accepted'
+        else:
+            # if empty area in packages became larger,
+            # accept or reject the move with the probability, according to Maxwell distribution
+            u = rng.random()
+            f = maxwell_distribution(area_after_change - area_before_change, c)
+            if u < f:
+                # accepted
+                shipping_state.commit_move(state)
+                outcome = 'accepted'
             else:
-                # 2. remove any empty containers
-                for package in shipping_dict_modified['packages']:
-                    if if_package_empty(package['package_id'], shipping_dict_modified):
-                        shipping_dict_modified = remove_empty_package(package['package_id'], shipping_dict_modified)
-                area_after_change = shipping_dict_modified['area']
-                if area_after_change <= area_before_change:
-                    # if area of packages became smaller (package was removed) or stayed the same, update shipping_dic
-                    current_shipping = {}
-                    current_shipping = copy.deepcopy(shipping_dict_modified)
-                else:
-                    # if empty area in packages became larger,
-                    # accept or reject the move with the probability, according to Maxwell distribution
-
-                    #calculate_empty_area
-
-
-                    u = np.random.random_sample()
-                    f = maxwell_distribution(area_after_change - area_before_change, c)
-                    if u < f:
-                        # accepted
-                        current_shipping = {}
-                        current_shipping = copy.deepcopy(shipping_dict_modified)
-
-        c = alpha * c
-    shipping_dict = []
-    shipping_dict = copy.deepcopy(current_shipping)
-    return current_shipping
+                shipping_state.undo_move(state, move)
+                outcome = 'rejected'
+    if selector is not None:
+        selector.update(operator, outcome)
+    if telemetry is not None:
+        telemetry.update(outcome)
+    return outcome == 'accepted' or outcome == 'improved'
 
 
 def visualise_shipping(shipping_dict):
     """
-    plot packages and boxes from shipping_dict
+    plot packages and boxes from shipping_dict, boxes of all packages are drawn as one collection;
+    use render.render_shipping or render.write_shipping_svg to write images without display
     :param shipping_dict: {'area': overall area occupied by all packages,
     'n_packages': number of packages,
      'packages': # list of dictionaries with keys {'package_id':,'package_type':,'dimension_x':,'dimension_y':}
      'boxes': # list of dictionaries with keys  {'box_index':, 'dimension_x':, 'dimension_y':,'package_id':,'rotated':,
                 'x_center': , 'y_center':}
     """
+    import matplotlib.pyplot as plt
 
     fig = plt.figure()
     ax = fig.add_subplot(111)
-
-    gap: float = 50.0
-    # plt.axis("off")
-    x_start = 0.0
-    y_start = 0.0
-
-    for package in shipping_dict['packages']:
-        # plot package one after another with a gap
-        package_width = package['dimension_x']
-        package_height = package['dimension_y']
-        rect = matplotlib.patches.Rectangle((x_start, y_start), package_width, package_height,
-                                            fc='royalblue', edgecolor='k', linewidth=1)
-        ax.add_patch(rect)
-        boxes = get_boxes_in_package(package['package_id'], shipping_dict)
-        for box in boxes:
-            # plot boxes inside package one after another
-            box_width = box['dimension_x']
-            box_height = box['dimension_y']
-            x_center = box['x_center']
-            y_center = box['y_center']
-            box_x_start = x_start + x_center - box_width / 2.0
-            box_y_start = y_start + y_center - box_height / 2.0
-            if box['rotated'] == 'Rotated':
-                color = 'firebrick'
-            else:
-                color = 'gold'
-            rect = matplotlib.patches.Rectangle((box_x_start, box_y_start), box_width, box_height,
-                                                fc=color, edgecolor='k', linewidth=0.5, label=box['box_index'])
-            plt.text(box_x_start + box_width / 2.0, box_y_start + box_height / 2.0, box['box_index'], fontsize=5)
-            ax.add_patch(rect)
-
-        x_start += package_width + gap
-    figure_width = x_start + package_width + gap
-    figure_height = max([package['dimension_y'] for package in shipping_dict['packages']]) + gap
-    plt.xlim([-gap, figure_width])
-    plt.ylim([-gap, figure_height])
-
+    for page in render.get_pages(shipping_dict):
+        render.draw_page(ax, page)
     plt.show()
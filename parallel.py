@@ -0,0 +1,260 @@
+# Parallel drivers for Metropolis Monte Carlo simulated annealing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bounds
+import packing
+import random_stream
+import shipping_state
+
+# module level parameters of packing that are passed to worker processes
+settings_names = ['package_types', 'precision', 'initial_strategy', 'initial_sort_by', 'c0', 'alpha', 'c_min',
+                  'max_number_steps', 'cooling_schedule', 'time_budget', 'operator_weights', 'adaptive_operators',
+                  'proposal_mode', 'compaction']
+
+
+def get_settings():
+    """
+    return current values of packing module parameters, so worker processes use the same parameters
+    :return: dictionary {name: value}
+    """
+    return {name: getattr(packing, name) for name in settings_names}
+
+
+def apply_settings(settings):
+    """
+    set packing module parameters in a worker process
+    :param settings: dictionary {name: value} as returned by get_settings
+    """
+    for name, value in settings.items():
+        setattr(packing, name, value)
+
+
+def run_chain(boxes_df, seed, settings):
+    """
+    run one chain: random initial packing followed by simulated annealing
+    :param boxes_df: list of box dictionaries as returned by packing.get_boxes
+    :param seed: seed of random numbers of the chain, int or numpy.random.SeedSequence
+    :param settings: packing module parameters as returned by get_settings
+    :return: shipping_dict, dictionary with statistics of the chain
+    {'seed':, 'initial_area':, 'area':, 'n_packages':, 'optimality_gap':, 'time':}
+    """
+    apply_settings(settings)
+    rng = random_stream.RandomStream(seed)
+    start = time.time()
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes_df, rng=rng)
+    initial_area = shipping_dict['area']
+    shipping_dict = packing.packing_with_monte_carlo(shipping_dict, rng=rng)
+    statistics = {'seed': seed,
+                  'initial_area': initial_area,
+                  'area': shipping_dict['area'],
+                  'n_packages': shipping_dict['n_packages'],
+                  'optimality_gap': shipping_dict['optimality_gap'],
+                  'time': time.time() - start}
+    return shipping_dict, statistics
+
+
+def packing_with_multi_start(boxes_df, n_chains=None, seeds=None, max_workers=None):
+    """
+    run independent chains of initial packing + simulated annealing with distinct seeds in a pool of processes
+    and return the solution with the smallest area
+    :param boxes_df: list of box dictionaries as returned by packing.get_boxes, or name of the file with boxes
+    :param n_chains: number of chains, number of cpus by default
+    :param seeds: list of seeds (int or numpy.random.SeedSequence), one per chain;
+    independent seeds spawned from packing.seed by default
+    :param max_workers: number of worker processes, number of chains by default
+    :return: best shipping_dict, list of statistics of all chains (see run_chain) with additional key 'best'
+    """
+    if isinstance(boxes_df, str):
+        boxes_df = packing.get_boxes(boxes_df)
+    if seeds is None:
+        if n_chains is None:
+            n_chains = os.cpu_count() or 1
+        seeds = random_stream.spawn_seeds(packing.seed, n_chains)
+    if max_workers is None:
+        max_workers = min(len(seeds), os.cpu_count() or 1)
+    settings = get_settings()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_chain, boxes_df, seed, settings) for seed in seeds]
+        results = [future.result() for future in futures]
+
+    best_chain = min(range(len(results)), key=lambda chain: (results[chain][0]['area'], results[chain][1]['time']))
+    statistics = []
+    for chain, (shipping_dict, chain_statistics) in enumerate(results):
+        chain_statistics['best'] = chain == best_chain
+        statistics.append(chain_statistics)
+    return results[best_chain][0], statistics
+
+
+# replicas of parallel tempering kept by a worker process {replica: [state, rng]}, see init_replicas
+worker_replicas = {}
+
+
+def init_replicas(replicas, settings):
+    """
+    initializer of a worker process of parallel tempering, replicas stay in the process for all rounds,
+    so their states are sent to the process only once
+    :param replicas: dictionary {replica: (shipping_state.ShippingState, random_stream.RandomStream)}
+    :param settings: packing module parameters as returned by get_settings
+    """
+    apply_settings(settings)
+    worker_replicas.clear()
+    for replica, (state, rng) in replicas.items():
+        worker_replicas[replica] = [state, rng]
+
+
+def run_replicas(temperatures, n_steps):
+    """
+    perform n_steps of Metropolis Monte Carlo at fixed control parameter on every replica of the worker process
+    :param temperatures: dictionary {replica: control parameter (or temperature) of the replica in this round}
+    :param n_steps: number of steps
+    :return: dictionary {replica: (area, number of accepted modifications, smallest area seen,
+    state with smallest area or None if area didn't decrease)}, only states that improved are sent back
+    """
+    results = {}
+    for replica, c in temperatures.items():
+        state, rng = worker_replicas[replica]
+        n_accepted = 0
+        best_area = state.area
+        best_state = None
+        for step_counter in range(n_steps):
+            if packing.metropolis_step(state, c, rng):
+                n_accepted += 1
+                if state.area < best_area:
+                    best_area = state.area
+                    best_state = shipping_state.copy_shipping_state(state)
+        results[replica] = (state.area, n_accepted, best_area, best_state)
+    return results
+
+
+def get_temperatures(n_replicas, c_max, c_min):
+    """
+    return geometric ladder of control parameters from c_max to c_min
+    :param n_replicas: number of replicas
+    :param c_max: highest control parameter
+    :param c_min: lowest control parameter
+    :return: list of control parameters, decreasing
+    """
+    if n_replicas == 1:
+        return [float(c_min)]
+    return [float(c_max * (c_min / c_max) ** (replica / (n_replicas - 1))) for replica in range(n_replicas)]
+
+
+def if_swap_accepted(area_1, area_2, c_1, c_2, rng):
+    """
+    Metropolis criterion of exchange of states between replicas at control parameters c_1 and c_2
+    :param area_1: area of state at c_1
+    :param area_2: area of state at c_2
+    :param rng: random_stream.RandomStream
+    :return: True if states are to be exchanged
+    """
+    delta = (1.0 / c_1 - 1.0 / c_2) * (area_2 - area_1)
+    if delta <= 0:
+        return True
+    return rng.random() < packing.maxwell_distribution(delta, 1.0)
+
+
+def packing_with_parallel_tempering(shipping_dict, n_replicas=None, temperatures=None, n_rounds=100,
+                                    steps_per_round=None, max_workers=None, seed=None):
+    """
+    optimize arrangement of boxes with parallel tempering (replica exchange): replicas of shipping are annealed
+    at fixed control parameters in worker processes, after every round states of neighbouring control parameters
+    are exchanged according to Metropolis criterion on area. replicas stay in their worker processes for all rounds,
+    an exchange swaps control parameters of two replicas instead of sending their states, only improved states
+    are sent back.
+    alternative to geometric cooling of packing.packing_with_monte_carlo.
+    modifications of shipping_state.change_shipping_randomly never increase area (see schedule.sample_uphill_deltas),
+    so every replica accepts the same modifications at any control parameter: the ladder doesn't change the search,
+    replicas work as independent chains that exchange states by area
+    :param shipping_dict: dictionary with initial arrangement as returned by packing.initialize_shipping,
+    all replicas start from it
+    :param n_replicas: number of replicas, number of cpus by default; ignored if temperatures are given
+    :param temperatures: list of control parameters of replicas, geometric ladder from packing.c0 to packing.c_min
+    by default
+    :param n_rounds: number of rounds of annealing followed by exchange
+    :param steps_per_round: number of Metropolis steps of every replica in a round, packing.max_number_steps by default
+    :param max_workers: number of worker processes, number of replicas by default, replicas are distributed over
+    processes evenly
+    :param seed: seed of random numbers, packing.seed by default; independent streams of exchanges and of every
+    replica are spawned from it
+    :return: shipping_dict with the smallest area found (with 'lower_bound' and 'optimality_gap' as of
+    packing.packing_with_monte_carlo), dictionary with statistics
+    {'temperatures':, 'acceptance_rate': per control parameter, 'swap_attempts': per pair of neighbours,
+     'swap_accepted': per pair of neighbours, 'best_area':, 'n_rounds': number of rounds done, 'time':}
+    """
+    start = time.time()
+    if temperatures is None:
+        if n_replicas is None:
+            n_replicas = os.cpu_count() or 1
+        temperatures = get_temperatures(n_replicas, packing.c0, packing.c_min)
+    n_replicas = len(temperatures)
+    if steps_per_round is None:
+        steps_per_round = packing.max_number_steps
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, n_replicas)
+    # random numbers of exchanges and of replicas are independent streams, stream of a replica stays with its state
+    seeds = random_stream.spawn_seeds(packing.seed if seed is None else seed, n_replicas + 1)
+    rng = random_stream.RandomStream(seeds[0])
+    replica_rngs = [random_stream.RandomStream(replica_seed) for replica_seed in seeds[1:]]
+    settings = get_settings()
+
+    state = shipping_state.shipping_state_from_dict(shipping_dict, packing.package_types, packing.precision)
+    best_state = state
+    # replica_position[replica] is the position of the replica in ladder of temperatures, ladder[position] is
+    # the replica at the position
+    ladder = list(range(n_replicas))
+    replica_position = list(range(n_replicas))
+    areas = [state.area] * n_replicas
+    # rounds stop as soon as area reaches lower bound, solution can't be improved anymore
+    lower_bound = packing.get_lower_bound(state)
+    n_rounds_done = 0
+    n_accepted = [0] * n_replicas
+    swap_attempts = [0] * (n_replicas - 1)
+    swap_accepted = [0] * (n_replicas - 1)
+
+    workers = [list(range(worker, n_replicas, max_workers)) for worker in range(max_workers)]
+    executors = [ProcessPoolExecutor(max_workers=1, initializer=init_replicas,
+                                     initargs=({replica: (state, replica_rngs[replica]) for replica in replicas},
+                                               settings))
+                 for replicas in workers]
+    try:
+        for round_counter in range(n_rounds):
+            if best_state.area <= lower_bound:
+                break
+            n_rounds_done += 1
+            futures = [executor.submit(run_replicas, {replica: temperatures[replica_position[replica]]
+                                                      for replica in replicas}, steps_per_round)
+                       for executor, replicas in zip(executors, workers)]
+            for future in futures:
+                for replica, (area, accepted, replica_best_area, replica_best_state) in future.result().items():
+                    areas[replica] = area
+                    n_accepted[replica_position[replica]] += accepted
+                    if replica_best_state is not None and replica_best_area < best_state.area:
+                        best_state = replica_best_state
+            # exchange states of neighbouring control parameters, even and odd pairs alternate between rounds
+            for position in range(round_counter % 2, n_replicas - 1, 2):
+                swap_attempts[position] += 1
+                replica_1 = ladder[position]
+                replica_2 = ladder[position + 1]
+                if if_swap_accepted(areas[replica_1], areas[replica_2],
+                                    temperatures[position], temperatures[position + 1], rng):
+                    swap_accepted[position] += 1
+                    ladder[position], ladder[position + 1] = replica_2, replica_1
+                    replica_position[replica_1], replica_position[replica_2] = position + 1, position
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+    statistics = {'temperatures': list(temperatures),
+                  'acceptance_rate': [accepted / float(max(n_rounds_done, 1) * steps_per_round)
+                                      for accepted in n_accepted],
+                  'swap_attempts': swap_attempts,
+                  'swap_accepted': swap_accepted,
+                  'best_area': float(best_state.area),
+                  'n_rounds': n_rounds_done,
+                  'time': time.time() - start}
+    shipping_dict = bounds.add_optimality_gap(shipping_state.shipping_state_to_dict(best_state), lower_bound)
+    return shipping_dict, statistics
@@ -0,0 +1,108 @@
+# Stream of random numbers of one annealing chain
+import numpy as np
+
+block_size = 4096  # number of uniform numbers drawn from generator at once
+
+
+class RandomStream:
+    """
+    random numbers of one chain: uniform numbers are drawn from its own numpy.random.Generator in blocks of
+    block_size and served one by one, random integers are derived from them without allocating arrays.
+    streams of different chains are independent if they are created from spawned numpy.random.SeedSequence
+    """
+
+    def __init__(self, seed=None, size=None):
+        """
+        :param seed: numpy.random.Generator, numpy.random.SeedSequence or int seed of a new generator,
+        new generator is seeded from OS entropy if None
+        :param size: number of uniform numbers drawn at once, block_size by default
+        """
+        if isinstance(seed, np.random.Generator):
+            self.generator = seed
+        else:
+            self.generator = np.random.default_rng(seed)
+        self.size = block_size if size is None else size
+        self.buffer = []
+        self.position = 0
+
+    def random(self):
+        """
+        return uniform random number in [0, 1)
+        """
+        if self.position >= len(self.buffer):
+            self.buffer = self.generator.random(self.size).tolist()
+            self.position = 0
+        value = self.buffer[self.position]
+        self.position += 1
+        return value
+
+    def integer(self, n):
+        """
+        return random integer in [0, n)
+        """
+        return min(int(self.random() * n), n - 1)
+
+    def choice(self, sequence):
+        """
+        return random element of a non-empty sequence
+        """
+        return sequence[self.integer(len(sequence))]
+
+    def permutation(self, values):
+        """
+        return randomly permuted copy of array
+        """
+        return self.generator.permutation(values)
+
+    def get_state(self):
+        """
+        return state of the stream: state of the bit generator and pre-drawn numbers that are not used yet,
+        arrays of the state of the bit generator (e.g. key of MT19937) are converted to lists, so the state
+        can be written to JSON for any bit generator of numpy
+        :return: dictionary {'bit_generator':, 'size':, 'buffer':, 'position':}
+        """
+        return {'bit_generator': get_serializable(self.generator.bit_generator.state), 'size': self.size,
+                'buffer': self.buffer[self.position:], 'position': 0}
+
+    def set_state(self, state):
+        """
+        restore state returned by get_state, following random numbers are the same as after get_state
+        """
+        bit_generator = getattr(np.random, state['bit_generator']['bit_generator'])()
+        bit_generator.state = state['bit_generator']
+        self.generator = np.random.Generator(bit_generator)
+        self.size = state['size']
+        self.buffer = list(state['buffer'])
+        self.position = state['position']
+
+
+def get_serializable(value):
+    """
+    return copy of value with numpy arrays and numbers in nested dictionaries converted to python lists and numbers
+    """
+    if isinstance(value, dict):
+        return {key: get_serializable(item) for key, item in value.items()}
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return value
+
+
+def get_random_stream(rng=None, seed=None):
+    """
+    return rng as RandomStream
+    :param rng: RandomStream (returned as is), numpy.random.Generator (wrapped) or None
+    :param seed: seed of a new stream if rng is None
+    :return: RandomStream
+    """
+    if isinstance(rng, RandomStream):
+        return rng
+    if rng is None:
+        return RandomStream(seed)
+    return RandomStream(rng)
+
+
+def spawn_seeds(seed, n):
+    """
+    return n independent seeds (numpy.random.SeedSequence) derived from seed
+    """
+    return np.random.SeedSequence(seed).spawn(n)
@@ -0,0 +1,179 @@
+# Headless rendering of shipping to image files
+# all boxes of a page are drawn as one collection with matplotlib, or written directly to SVG without matplotlib
+import os
+
+import numpy as np
+
+gap = 50.0  # gap between packages on a page, in cm
+max_labels = 300  # boxes are labelled with box_index only on pages with at most this number of boxes
+package_color = 'royalblue'
+box_color = 'gold'
+rotated_box_color = 'firebrick'
+page_width_inches = 12.0  # width of matplotlib images
+svg_width_pixels = 1200  # width of SVG images written by write_shipping_svg
+
+
+def get_pages(shipping_dict, packages_per_page=None):
+    """
+    split packages of shipping into pages, packages of a page are placed one after another with gap
+    :param shipping_dict: dictionary with keys 'packages' and 'boxes', see packing.packing_with_monte_carlo
+    :param packages_per_page: maximal number of packages on one page, all packages on one page if None
+    :return: list of pages, page is dictionary {'width':, 'height':,
+    'packages': array (n, 4) of left, bottom, length, height of packages on page, 'package_ids': list,
+    'boxes': array (m, 4) of left, bottom, length, height of boxes on page, 'rotated': boolean array (m),
+    'box_index': list}
+    """
+    packages = shipping_dict['packages']
+    if packages_per_page is None or packages_per_page < 1:
+        packages_per_page = max(len(packages), 1)
+    boxes_in_package = {}
+    for box in shipping_dict['boxes']:
+        boxes_in_package.setdefault(box['package_id'], []).append(box)
+    pages = []
+    for first in range(0, len(packages), packages_per_page):
+        x_start = 0.0
+        package_rectangles = []
+        box_rectangles = []
+        rotated = []
+        box_index = []
+        for package in packages[first:first + packages_per_page]:
+            package_rectangles.append((x_start, 0.0, package['dimension_x'], package['dimension_y']))
+            for box in boxes_in_package.get(package['package_id'], []):
+                box_rectangles.append((x_start + box['x_center'] - box['dimension_x'] / 2.0,
+                                       box['y_center'] - box['dimension_y'] / 2.0,
+                                       box['dimension_x'], box['dimension_y']))
+                rotated.append(box['rotated'] == 'Rotated')
+                box_index.append(box['box_index'])
+            x_start += package['dimension_x'] + gap
+        package_rectangles = np.array(package_rectangles, dtype=np.float64).reshape(-1, 4)
+        pages.append({'width': x_start - gap,
+                      'height': float(package_rectangles[:, 3].max()),
+                      'packages': package_rectangles,
+                      'package_ids': [package['package_id'] for package in packages[first:first + packages_per_page]],
+                      'boxes': np.array(box_rectangles, dtype=np.float64).reshape(-1, 4),
+                      'rotated': np.array(rotated, dtype=bool),
+                      'box_index': box_index})
+    return pages
+
+
+def get_page_filenames(filename, n_pages):
+    """
+    return names of files of pages: filename itself for one page, name_1.ext, name_2.ext, ... otherwise
+    """
+    if n_pages == 1:
+        return [filename]
+    name, extension = os.path.splitext(filename)
+    return ['%s_%d%s' % (name, page + 1, extension) for page in range(n_pages)]
+
+
+def get_vertices(rectangles):
+    """
+    return array (n, 4, 2) of corners of rectangles given by array (n, 4) of left, bottom, length, height
+    """
+    left, bottom, length, height = rectangles.T
+    right = left + length
+    top = bottom + height
+    return np.stack([np.column_stack([left, bottom]), np.column_stack([right, bottom]),
+                     np.column_stack([right, top]), np.column_stack([left, top])], axis=1)
+
+
+def if_labelled(page, labels=None):
+    """
+    return True if boxes of page are labelled: labels if it is given, otherwise if page has at most max_labels boxes
+    """
+    if labels is None:
+        return len(page['box_index']) <= max_labels
+    return labels
+
+
+def draw_page(ax, page, labels=None):
+    """
+    draw packages and boxes of page on matplotlib axes, packages and boxes are two collections of polygons
+    :param ax: matplotlib Axes
+    :param page: one of pages returned by get_pages
+    :param labels: label boxes with box_index, see if_labelled
+    """
+    from matplotlib.collections import PolyCollection
+    ax.add_collection(PolyCollection(get_vertices(page['packages']), facecolors=package_color, edgecolors='k',
+                                     linewidths=1))
+    box_colors = np.where(page['rotated'], rotated_box_color, box_color)
+    ax.add_collection(PolyCollection(get_vertices(page['boxes']), facecolors=box_colors, edgecolors='k',
+                                     linewidths=0.5))
+    if if_labelled(page, labels):
+        for (left, bottom, length, height), box_index in zip(page['boxes'], page['box_index']):
+            ax.text(left + length / 2.0, bottom + height / 2.0, box_index, fontsize=5)
+    ax.set_xlim([-gap, page['width'] + gap])
+    ax.set_ylim([-gap, page['height'] + gap])
+    ax.set_aspect('equal')
+
+
+def render_shipping(shipping_dict, filename, packages_per_page=None, dpi=100, labels=None):
+    """
+    render shipping with matplotlib without display (Agg canvas) and write image files,
+    format is given by extension of filename (.png, .svg, .pdf)
+    :param shipping_dict: dictionary with keys 'packages' and 'boxes'
+    :param filename: name of the image file, pages are written to name_1.ext, name_2.ext, ... if there are several
+    :param packages_per_page: maximal number of packages on one image, 1 - image per package, all on one if None
+    :param dpi: resolution of raster images
+    :param labels: label boxes with box_index, see if_labelled
+    :return: list of names of written files
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    pages = get_pages(shipping_dict, packages_per_page)
+    filenames = get_page_filenames(filename, len(pages))
+    for page, page_filename in zip(pages, filenames):
+        width = page['width'] + 2.0 * gap
+        height = page['height'] + 2.0 * gap
+        figure = Figure(figsize=(page_width_inches, page_width_inches * height / width))
+        FigureCanvasAgg(figure)
+        ax = figure.add_axes([0.0, 0.0, 1.0, 1.0])
+        ax.axis('off')
+        draw_page(ax, page, labels)
+        figure.savefig(page_filename, dpi=dpi)
+    return filenames
+
+
+def get_svg(page, labels=None):
+    """
+    return SVG document of page, coordinates are in cm of packages with y axis pointing up as in matplotlib
+    :param page: one of pages returned by get_pages
+    :param labels: label boxes with box_index, see if_labelled
+    :return: str
+    """
+    width = page['width'] + 2.0 * gap
+    height = page['height'] + 2.0 * gap
+    top = page['height'] + gap  # y of SVG points down
+
+    def rectangles(values, colors, stroke_width):
+        return ['<rect x="%g" y="%g" width="%g" height="%g" fill="%s" stroke="black" stroke-width="%g"/>' % (
+            left, top - bottom - rectangle_height, length, rectangle_height, color, stroke_width)
+            for (left, bottom, length, rectangle_height), color in zip(values.tolist(), colors)]
+    lines = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="%g %g %g %g">' % (
+        svg_width_pixels, int(round(svg_width_pixels * height / width)), -gap, -gap, width, height)]
+    lines += rectangles(page['packages'], [package_color] * len(page['packages']), 2)
+    lines += rectangles(page['boxes'], np.where(page['rotated'], rotated_box_color, box_color), 1)
+    if if_labelled(page, labels):
+        lines.append('<g font-size="%g" text-anchor="middle" dominant-baseline="central">' % (gap / 2.0))
+        lines += ['<text x="%g" y="%g">%s</text>' % (left + length / 2.0, top - bottom - box_height / 2.0, box_index)
+                  for (left, bottom, length, box_height), box_index in zip(page['boxes'].tolist(), page['box_index'])]
+        lines.append('</g>')
+    lines.append('</svg>')
+    return '\n'.join(lines) + '\n'
+
+
+def write_shipping_svg(shipping_dict, filename, packages_per_page=None, labels=None):
+    """
+    write shipping to SVG files directly, without matplotlib
+    :param shipping_dict: dictionary with keys 'packages' and 'boxes'
+    :param filename: name of .svg file, pages are written to name_1.svg, name_2.svg, ... if there are several
+    :param packages_per_page: maximal number of packages on one image, 1 - image per package, all on one if None
+    :param labels: label boxes with box_index, see if_labelled
+    :return: list of names of written files
+    """
+    pages = get_pages(shipping_dict, packages_per_page)
+    filenames = get_page_filenames(filename, len(pages))
+    for page, page_filename in zip(pages, filenames):
+        with open(page_filename, 'w') as svg_file:
+            svg_file.write(get_svg(page, labels))
+    return filenames
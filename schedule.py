@@ -0,0 +1,91 @@
+# Adaptive cooling schedule of Metropolis Monte Carlo simulated annealing
+import math
+
+import numpy as np
+
+import shipping_state
+
+target_initial_acceptance = 0.8  # acceptance probability of an average uphill move at initial control parameter
+n_calibration_samples = 200  # number of random modifications sampled to calibrate initial control parameter
+alpha_min = 0.5  # cooling parameter when all proposals are accepted (fast cooling)
+alpha_max = 0.95  # cooling parameter when no proposals are accepted (slow cooling)
+stagnation_levels = 10  # annealing stops after this number of control parameter levels without improvement
+
+
+def if_area_can_increase(enabled_operators):
+    """
+    return True if any of enabled operators is in shipping_state.area_increasing_operators
+    """
+    return any(shipping_state.operators[operator] in shipping_state.area_increasing_operators
+               for operator in enabled_operators)
+
+
+def sample_uphill_deltas(state, n_samples, rng, proposal_mode='grid', enabled_operators=None):
+    """
+    sample random valid modifications of state and return increases of area they cause,
+    state is not changed: every modification is undone.
+    modifications of shipping_state.change_shipping_randomly never add a package, area can only decrease
+    (a package becomes empty), so the list is empty unless an operator that increases area is added
+    :param state: shipping_state.ShippingState
+    :param n_samples: number of random modifications
+    :param rng: random_stream.RandomStream
+    :param proposal_mode: one of shipping_state.proposal_modes, the mode of the annealing run
+    :param enabled_operators: indexes of operators picked uniformly for modifications,
+    operators of positive shipping_state.default_operator_weights if None
+    :return: list of positive changes of area
+    """
+    if enabled_operators is None:
+        enabled_operators = shipping_state.get_enabled_operators()
+    deltas = []
+    for sample in range(n_samples):
+        area_before_change = state.area
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, enabled_operators[rng.integer(len(enabled_operators))],
+                                                proposal_mode)
+        if shipping_state.if_move_valid(state, move):
+            shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+            if state.area > area_before_change:
+                deltas.append(state.area - area_before_change)
+        shipping_state.undo_move(state, move)
+    return deltas
+
+
+def calibrate_initial_temperature(state, c_default, rng, n_samples=None, acceptance=None, proposal_mode='grid',
+                                  enabled_operators=None):
+    """
+    return initial control parameter at which an average uphill move is accepted with probability acceptance:
+    c0 = -mean(delta) / ln(acceptance).
+    if none of enabled operators is in shipping_state.area_increasing_operators (none of the current ones is),
+    nothing is sampled and no random numbers are drawn: c_default is returned
+    and adaptive cooling differs from geometric one only by cooling rate and stopping on stagnation
+    :param state: shipping_state.ShippingState
+    :param c_default: control parameter returned if no uphill moves were sampled
+    :param rng: random_stream.RandomStream
+    :param n_samples: number of random modifications, n_calibration_samples by default
+    :param acceptance: target acceptance probability, target_initial_acceptance by default
+    :param proposal_mode: one of shipping_state.proposal_modes, the mode of the annealing run
+    :param enabled_operators: indexes of operators of the annealing run, see sample_uphill_deltas
+    :return: initial control parameter
+    """
+    if enabled_operators is None:
+        enabled_operators = shipping_state.get_enabled_operators()
+    if not if_area_can_increase(enabled_operators):
+        return c_default
+    if n_samples is None:
+        n_samples = n_calibration_samples
+    if acceptance is None:
+        acceptance = target_initial_acceptance
+    deltas = sample_uphill_deltas(state, n_samples, rng, proposal_mode, enabled_operators)
+    if len(deltas) == 0:
+        return c_default
+    return -float(np.mean(deltas)) / math.log(acceptance)
+
+
+def get_adaptive_alpha(acceptance_rate):
+    """
+    return cooling parameter for measured acceptance rate of the last control parameter level:
+    high acceptance rate - fast cooling (alpha_min), low acceptance rate - slow cooling (alpha_max)
+    :param acceptance_rate: fraction of accepted proposals
+    :return: cooling parameter
+    """
+    return alpha_min + (alpha_max - alpha_min) * (1.0 - acceptance_rate)
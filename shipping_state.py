@@ -0,0 +1,1363 @@
+import math
+
+import numpy as np
+
+import free_space
+import overlap
+import spatial_index
+
+n_index_columns = 64  # number of columns in spatial index of every package
+# modifications performed by change_shipping_randomly, operator argument is an index in this list
+operators = ['move_in_same_package', 'move_to_random_package', 'rotate', 'swap_in_same_package', 'swap_any',
+             'compact_package']
+# weights of operators used by operators.OperatorSelector by default, operators of zero weight are never proposed:
+# compaction is disabled, it rarely changes area and is better run as the periodic pass (packing.compaction)
+default_operator_weights = [1.0, 1.0, 1.0, 1.0, 1.0, 0.0]
+# operators that can increase area of shipping: none, no operator adds a package (schedule skips calibration)
+area_increasing_operators = []
+# how moves of boxes pick new coordinates: 'grid' - uniformly on the grid of the whole package,
+# 'free_space' - only positions inside free rectangles of the package, where box fits
+proposal_modes = ['grid', 'free_space']
+compaction_passes = 10  # maximal number of passes of compact_package over boxes of a package
+# a move that modified at least this number of boxes of a package, and at least half of its boxes, is checked
+# with if_package_valid (all pairs of boxes at once) instead of box by box with the spatial index
+package_check_boxes = 4
+static_array_names = ['box_type', 'box_type_sides', 'box_type_start', 'non_square_slots']
+
+
+class ShippingState:
+    """
+    array-backed shipping arrangement, a compact alternative to the list-of-dicts shipping_dict
+    boxes are stored in slots 0..n_boxes-1 (same order as shipping_dict['boxes']) as struct-of-arrays:
+    box_index, box_dimension_x, box_dimension_y, box_x_center, box_y_center, box_rotated, box_package_id
+    packages are stored in slots of a package table that grows when packages are added,
+    removed packages are marked inactive in package_active:
+    package_ids, package_type_codes, package_dimension_x, package_dimension_y, package_active
+    all modifications are done in place; while a move is open (see begin_move) every modification is recorded
+    in journal, so the move can be undone without copying the state
+    every active package has a spatial_index.PackageIndex in package_index, kept in sync with box modifications
+    lookups are done with maps kept in sync with all modifications:
+    box_slot {box_index: slot}, package_slot {package_id: slot}, package_members {package_id: set of box slots}
+    free space of packages (free_space.FreeSpace) is built on demand by get_free_space and then kept in sync
+    boxes with the same dimensions up to rotation form a box type (see group_box_types), box types don't change,
+    orientation of boxes of every type and statistics per type are kept in sync with box modifications
+    """
+
+    def __init__(self, package_types, precision=1.0, n_boxes=0):
+        """
+        :param package_types: dictionary of available package types with dimensions {'package_type1': [800, 1200]}
+        :param precision: precision of coordinates
+        :param n_boxes: number of box slots to allocate
+        """
+        self.package_types = dict(package_types)
+        self.package_type_names = list(self.package_types.keys())
+        self.precision = precision
+        # box table
+        self.box_index = np.zeros(n_boxes, dtype=np.int64)
+        self.box_dimension_x = np.zeros(n_boxes, dtype=np.float64)
+        self.box_dimension_y = np.zeros(n_boxes, dtype=np.float64)
+        self.box_x_center = np.zeros(n_boxes, dtype=np.float64)
+        self.box_y_center = np.zeros(n_boxes, dtype=np.float64)
+        self.box_rotated = np.zeros(n_boxes, dtype=bool)
+        self.box_package_id = np.zeros(n_boxes, dtype=np.int64)
+        # package table
+        self.package_ids = np.zeros(0, dtype=np.int64)
+        self.package_type_codes = np.zeros(0, dtype=np.int16)
+        self.package_dimension_x = np.zeros(0, dtype=np.float64)
+        self.package_dimension_y = np.zeros(0, dtype=np.float64)
+        self.package_active = np.zeros(0, dtype=bool)
+        self.n_package_slots = 0  # number of used slots in package table, active or not
+        self.n_packages = 0  # number of active packages
+        self.area = 0.0  # sum of areas of active packages
+        self.journal = None  # list of delta records of the open move, None if no move is open
+        self.package_index = {}  # package_id: spatial_index.PackageIndex
+        self.box_slot = {}  # box_index: slot in box table
+        self.package_slot = {}  # package_id: slot in package table, active packages only
+        self.package_members = {}  # package_id: set of slots of boxes in package, active packages only
+        self.free_space = {}  # package_id: free_space.FreeSpace, only packages free space was requested for
+        # box types, arrays of static_array_names are never modified and shared by copies of state
+        self.box_type = np.zeros(n_boxes, dtype=np.int64)  # type of box in slot
+        self.box_type_sides = np.zeros((0, 2), dtype=np.float64)  # (shorter, longer) side of every type
+        self.box_type_start = np.zeros(1, dtype=np.int64)  # slots of type t are type_slots[start[t]:start[t + 1]]
+        self.non_square_slots = np.zeros(0, dtype=np.int64)  # slots of boxes that change when rotated
+        # slots of boxes sorted by type, boxes of a type placed with the longer side along x (flipped) are
+        # the last type_n_flipped[t] slots of its range
+        self.type_slots = np.zeros(n_boxes, dtype=np.int64)
+        self.type_position = np.zeros(n_boxes, dtype=np.int64)  # position of slot in type_slots
+        self.type_n_flipped = np.zeros(0, dtype=np.int64)  # number of flipped boxes of every type
+        self.type_n_rotated = np.zeros(0, dtype=np.int64)  # number of boxes of every type with rotated flag
+        self.type_n_packages = np.zeros(0, dtype=np.int64)  # number of packages with boxes of every type
+        self.type_package_boxes = {}  # (box type, package_id): number of boxes of the type in package
+
+    @property
+    def n_boxes(self):
+        return len(self.box_index)
+
+
+def _grow_package_table(state, capacity):
+    """
+    make sure package table of state has at least capacity slots
+    :param state: ShippingState
+    :param capacity: required number of slots
+    """
+    old_capacity = len(state.package_ids)
+    if capacity <= old_capacity:
+        return
+    new_capacity = max(capacity, 2 * old_capacity, 8)
+    for name in ['package_ids', 'package_type_codes', 'package_dimension_x', 'package_dimension_y',
+                 'package_active']:
+        old = getattr(state, name)
+        new = np.zeros(new_capacity, dtype=old.dtype)
+        new[:old_capacity] = old
+        setattr(state, name, new)
+
+
+def shipping_state_from_dict(shipping_dict, package_types, precision=1.0):
+    """
+    convert shipping_dict to ShippingState
+    :param shipping_dict: dictionary with a shipping info in a format:
+    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
+    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
+    :param package_types: dictionary of available package types with dimensions
+    :param precision: precision of coordinates
+    :return: ShippingState
+    """
+    boxes = shipping_dict['boxes']
+    state = ShippingState(package_types, precision, len(boxes))
+    for slot, box in enumerate(boxes):
+        state.box_index[slot] = box['box_index']
+        state.box_dimension_x[slot] = box['dimension_x']
+        state.box_dimension_y[slot] = box['dimension_y']
+        state.box_x_center[slot] = box['x_center']
+        state.box_y_center[slot] = box['y_center']
+        state.box_rotated[slot] = box['rotated'] == 'Rotated'
+        state.box_package_id[slot] = box['package_id']
+        state.box_slot[box['box_index']] = slot
+
+    packages = shipping_dict['packages']
+    _grow_package_table(state, len(packages))
+    for slot, package in enumerate(packages):
+        if package['package_type'] not in state.package_types:
+            state.package_types[package['package_type']] = [package['dimension_x'], package['dimension_y']]
+            state.package_type_names.append(package['package_type'])
+        state.package_ids[slot] = package['package_id']
+        state.package_type_codes[slot] = state.package_type_names.index(package['package_type'])
+        state.package_dimension_x[slot] = package['dimension_x']
+        state.package_dimension_y[slot] = package['dimension_y']
+        state.package_active[slot] = True
+    state.n_package_slots = len(packages)
+    state.n_packages = len(packages)
+    state.area = calculate_area_packages(state)
+    for slot in range(len(packages)):
+        _add_package_index(state, slot)
+    for slot in range(state.n_boxes):
+        _index_box(state, slot)
+    group_box_types(state)
+    return state
+
+
+def group_box_types(state):
+    """
+    group boxes with the same dimensions up to rotation into box types, used to skip moves that don't change
+    shipping (swaps of identical boxes, rotations of square boxes) and for statistics per type.
+    orientation and statistics of types are counted here once and then updated by set_box and get_rotated_box
+    :param state: ShippingState
+    :return: updated state
+    """
+    sides = np.sort(np.column_stack([state.box_dimension_x, state.box_dimension_y]), axis=1)
+    state.box_type_sides, state.box_type = np.unique(sides.reshape(-1, 2), axis=0, return_inverse=True)
+    state.box_type = state.box_type.reshape(-1).astype(np.int64)
+    n_types = len(state.box_type_sides)
+    flipped = state.box_dimension_x > state.box_dimension_y
+    set_type_slots(state, np.lexsort((flipped, state.box_type)))
+    state.box_type_start = np.concatenate([[0], np.cumsum(np.bincount(state.box_type, minlength=n_types))])
+    state.non_square_slots = np.flatnonzero(sides[:, 0] != sides[:, 1]).astype(np.int64)
+    state.type_n_flipped = np.bincount(state.box_type[flipped], minlength=n_types).astype(np.int64)
+    state.type_n_rotated = np.bincount(state.box_type[state.box_rotated], minlength=n_types).astype(np.int64)
+    state.type_n_packages = np.zeros(n_types, dtype=np.int64)
+    state.type_package_boxes = {}
+    for box_type, package_id in zip(state.box_type.tolist(), state.box_package_id.tolist()):
+        _count_type_package(state, box_type, package_id, 1)
+    return state
+
+
+def set_type_slots(state, type_slots):
+    """
+    set order of slots in type ranges, e.g. order saved by shipping_state_to_arrays
+    :param state: ShippingState
+    :param type_slots: slots of boxes sorted by type, flipped boxes last in range of every type
+    """
+    state.type_slots = np.array(type_slots, dtype=np.int64)
+    state.type_position = np.empty(len(state.type_slots), dtype=np.int64)
+    state.type_position[state.type_slots] = np.arange(len(state.type_slots))
+
+
+def _count_type_package(state, box_type, package_id, change):
+    """
+    add change to number of boxes of box_type in package, update number of packages with boxes of the type
+    """
+    if package_id <= 0:
+        return
+    key = (box_type, package_id)
+    n_boxes = state.type_package_boxes.get(key, 0) + change
+    if n_boxes > 0:
+        if n_boxes == change:
+            state.type_n_packages[box_type] += 1
+        state.type_package_boxes[key] = n_boxes
+    else:
+        state.type_n_packages[box_type] -= 1
+        del state.type_package_boxes[key]
+
+
+def _update_type_orientation(state, slot):
+    """
+    keep box in slot in the part of its type range matching its orientation after rotation:
+    it is swapped with the boundary slot of the other part, so the update doesn't depend on the size of the type
+    """
+    box_type = state.box_type[slot]
+    boundary = state.box_type_start[box_type + 1] - state.type_n_flipped[box_type]  # position of the first flipped
+    position = state.type_position[slot]
+    if state.box_dimension_x[slot] > state.box_dimension_y[slot]:
+        if position >= boundary:
+            return
+        other_position = boundary - 1
+        state.type_n_flipped[box_type] += 1
+    else:
+        if position < boundary:
+            return
+        other_position = boundary
+        state.type_n_flipped[box_type] -= 1
+    _swap_type_positions(state, position, other_position)
+
+
+def _swap_type_positions(state, position_1, position_2):
+    """
+    swap slots at two positions of type_slots
+    """
+    slot_1 = state.type_slots[position_1]
+    slot_2 = state.type_slots[position_2]
+    state.type_slots[position_1] = slot_2
+    state.type_slots[position_2] = slot_1
+    state.type_position[slot_2] = position_1
+    state.type_position[slot_1] = position_2
+
+
+def get_box_type_statistics(state):
+    """
+    return placement statistics of every box type
+    :param state: ShippingState
+    :return: list of dictionaries {'dimension_x': shorter side, 'dimension_y': longer side, 'n_boxes':,
+    'n_rotated': number of boxes placed rotated, 'n_packages': number of packages with boxes of the type,
+    'area': area of boxes of the type}
+    """
+    statistics = []
+    for box_type, (shorter, longer) in enumerate(state.box_type_sides.tolist()):
+        n_boxes = int(state.box_type_start[box_type + 1] - state.box_type_start[box_type])
+        statistics.append({'dimension_x': shorter,
+                           'dimension_y': longer,
+                           'n_boxes': n_boxes,
+                           'n_rotated': int(state.type_n_rotated[box_type]),
+                           'n_packages': int(state.type_n_packages[box_type]),
+                           'area': shorter * longer * n_boxes})
+    return statistics
+
+
+def shipping_state_to_dict(state):
+    """
+    convert ShippingState to shipping_dict
+    :param state: ShippingState
+    :return: dictionary with a shipping info in a format:
+    {'area':a, 'n_packages':n,'packages': [{'package_id':,'package_type':,'dimension_x':,'dimension_y':}],
+    'boxes': [{'box_index':, 'dimension_x':, 'dimension_y':,'package_id':, 'rotated':,'x_center': , 'y_center':}]
+    """
+    packages = []
+    for slot in np.flatnonzero(state.package_active[:state.n_package_slots]):
+        packages.append({'package_id': int(state.package_ids[slot]),
+                         'package_type': state.package_type_names[state.package_type_codes[slot]],
+                         'dimension_x': state.package_dimension_x[slot].item(),
+                         'dimension_y': state.package_dimension_y[slot].item()})
+    boxes = []
+    for slot in range(state.n_boxes):
+        boxes.append({'box_index': int(state.box_index[slot]),
+                      'dimension_x': state.box_dimension_x[slot].item(),
+                      'dimension_y': state.box_dimension_y[slot].item(),
+                      'package_id': int(state.box_package_id[slot]),
+                      'rotated': 'Rotated' if state.box_rotated[slot] else 'Not rotated',
+                      'x_center': state.box_x_center[slot].item(),
+                      'y_center': state.box_y_center[slot].item()})
+    return {'area': calculate_area_packages(state),
+            'n_packages': len(packages),
+            'packages': packages,
+            'boxes': boxes}
+
+
+box_array_names = ['box_index', 'box_dimension_x', 'box_dimension_y', 'box_x_center', 'box_y_center', 'box_rotated',
+                   'box_package_id']
+package_array_names = ['package_ids', 'package_type_codes', 'package_dimension_x', 'package_dimension_y',
+                       'package_active']
+
+
+def shipping_state_to_arrays(state):
+    """
+    convert ShippingState to arrays, together with state.package_types and state.precision they are enough to
+    rebuild the state exactly with shipping_state_from_arrays, including free space of packages
+    :param state: ShippingState
+    :return: dictionary {name: numpy array}
+    """
+    arrays = {name: getattr(state, name) for name in box_array_names}
+    arrays.update({name: getattr(state, name)[:state.n_package_slots] for name in package_array_names})
+    arrays['area'] = np.array([state.area])
+    arrays['type_slots'] = state.type_slots
+    free_space_ids = list(state.free_space)
+    arrays['free_space_package_ids'] = np.array(free_space_ids, dtype=np.int64)
+    arrays['free_space_n_removed'] = np.array([state.free_space[package_id].n_removed
+                                               for package_id in free_space_ids], dtype=np.int64)
+    arrays['free_space_n_rectangles'] = np.array([len(state.free_space[package_id].rectangles)
+                                                  for package_id in free_space_ids], dtype=np.int64)
+    arrays['free_space_rectangles'] = np.array([rectangle for package_id in free_space_ids
+                                                for rectangle in state.free_space[package_id].rectangles],
+                                               dtype=np.float64).reshape(-1, 4)
+    return arrays
+
+
+def shipping_state_from_arrays(arrays, package_types, precision=1.0):
+    """
+    convert arrays returned by shipping_state_to_arrays to ShippingState
+    :param arrays: dictionary {name: numpy array}
+    :param package_types: package_types of the converted state, with package types in the same order
+    :param precision: precision of coordinates
+    :return: ShippingState
+    """
+    state = ShippingState(package_types, precision, len(arrays['box_index']))
+    for name in box_array_names:
+        setattr(state, name, np.array(arrays[name], dtype=getattr(state, name).dtype))
+    n_package_slots = len(arrays['package_ids'])
+    _grow_package_table(state, n_package_slots)
+    for name in package_array_names:
+        getattr(state, name)[:n_package_slots] = arrays[name]
+    state.n_package_slots = n_package_slots
+    state.n_packages = int(np.count_nonzero(state.package_active))
+    state.area = float(arrays['area'][0])
+    state.box_slot = {int(box_index): slot for slot, box_index in enumerate(state.box_index)}
+    for slot in np.flatnonzero(state.package_active):
+        _add_package_index(state, int(slot))
+    for slot in range(state.n_boxes):
+        _index_box(state, slot)
+    rectangles = [tuple(rectangle) for rectangle in arrays['free_space_rectangles'].tolist()]
+    first = 0
+    for package_id, n_removed, n_rectangles in zip(arrays['free_space_package_ids'].tolist(),
+                                                   arrays['free_space_n_removed'].tolist(),
+                                                   arrays['free_space_n_rectangles'].tolist()):
+        package_slot = get_package(state, package_id)
+        package_free_space = free_space.FreeSpace(state.package_dimension_x[package_slot],
+                                                  state.package_dimension_y[package_slot])
+        package_free_space.rectangles = rectangles[first:first + n_rectangles]
+        package_free_space.n_removed = n_removed
+        state.free_space[package_id] = package_free_space
+        first += n_rectangles
+    group_box_types(state)
+    if 'type_slots' in arrays:
+        # order of slots of a type depends on the history of rotations, random picks of boxes depend on it
+        set_type_slots(state, arrays['type_slots'])
+    return state
+
+
+def copy_shipping_state(state):
+    """
+    return a copy of state, arrays are copied, no python objects per box are created
+    :param state: ShippingState
+    :return: ShippingState
+    """
+    new_state = ShippingState.__new__(ShippingState)
+    new_state.__dict__.update(state.__dict__)
+    new_state.package_types = dict(state.package_types)
+    new_state.package_type_names = list(state.package_type_names)
+    new_state.journal = None
+    new_state.package_index = {package_id: index.copy() for package_id, index in state.package_index.items()}
+    new_state.box_slot = dict(state.box_slot)
+    new_state.package_slot = dict(state.package_slot)
+    new_state.package_members = {package_id: set(members) for package_id, members in state.package_members.items()}
+    new_state.type_package_boxes = dict(state.type_package_boxes)
+    new_state.free_space = {package_id: package_free_space.copy()
+                            for package_id, package_free_space in state.free_space.items()}
+    for name, value in state.__dict__.items():
+        if isinstance(value, np.ndarray) and name not in static_array_names:
+            setattr(new_state, name, value.copy())
+    return new_state
+
+
+def _add_package_index(state, package_slot):
+    """
+    add package in package_slot to lookup maps, create empty spatial index for it
+    """
+    package_id = int(state.package_ids[package_slot])
+    state.package_slot[package_id] = package_slot
+    state.package_members[package_id] = set()
+    state.package_index[package_id] = spatial_index.PackageIndex(state.package_dimension_x[package_slot],
+                                                                 n_index_columns)
+
+
+def _remove_package_index(state, package_slot):
+    """
+    remove package in package_slot from lookup maps and drop its spatial index
+    """
+    package_id = int(state.package_ids[package_slot])
+    del state.package_slot[package_id]
+    del state.package_members[package_id]
+    del state.package_index[package_id]
+    if package_id in state.free_space:
+        _save_free_space(state, package_id)
+        del state.free_space[package_id]
+
+
+def _index_box(state, slot):
+    """
+    add box in slot to member set and spatial index of its package, if box is in an active package
+    """
+    package_id = int(state.box_package_id[slot])
+    if package_id in state.package_index:
+        state.package_members[package_id].add(slot)
+        edges = get_box_edges(state, slot)
+        state.package_index[package_id].insert(slot, *edges)
+        if package_id in state.free_space:
+            _save_free_space(state, package_id).insert(*edges)
+
+
+def _unindex_box(state, slot):
+    """
+    remove box in slot from member set and spatial index of its package
+    """
+    package_id = int(state.box_package_id[slot])
+    if package_id in state.package_index and slot in state.package_members[package_id]:
+        state.package_members[package_id].discard(slot)
+        index = state.package_index[package_id]
+        left, right, bottom, top = index.boxes[slot]
+        index.remove(slot)
+        if package_id in state.free_space:
+            # boxes overlapping the removed one while a move is being made keep their space occupied,
+            # slots are sorted, so the order of free rectangles doesn't depend on the history of the index
+            occupied = [index.boxes[other] for other in sorted(index.get_candidates(left, right))
+                        if spatial_index.if_segments_intersect(left, right, index.boxes[other][0],
+                                                               index.boxes[other][1]) and
+                        spatial_index.if_segments_intersect(bottom, top, index.boxes[other][2],
+                                                            index.boxes[other][3])]
+            _save_free_space(state, package_id).remove(left, right, bottom, top, occupied)
+
+
+def _save_free_space(state, package_id):
+    """
+    if a move is open, record free space of package in the move before its first modification and replace it
+    with a copy, so undo_move restores it without recalculation
+    :return: free space of package that can be modified
+    """
+    package_free_space = state.free_space.get(package_id)
+    if state.journal is None:
+        return package_free_space
+    for record in state.journal:
+        if record[0] == 'free_space' and record[1] == package_id:
+            return package_free_space
+    state.journal.append(('free_space', package_id, package_free_space))
+    if package_free_space is not None:
+        package_free_space = package_free_space.copy()
+        state.free_space[package_id] = package_free_space
+    return package_free_space
+
+
+def get_package_box_edges(state, package_id):
+    """
+    return edges (left, right, bottom, top) of boxes in package in the order of their slots
+    """
+    boxes = state.package_index[package_id].boxes
+    return [boxes[slot] for slot in sorted(boxes)]
+
+
+def get_free_space(state, package_id):
+    """
+    return free space of package, it is built from boxes in package if it wasn't requested before or
+    if it is stale (too many boxes were removed from package since it was built)
+    :param state: ShippingState
+    :param package_id: id of an active package
+    :return: free_space.FreeSpace
+    """
+    package_id = int(package_id)
+    package_free_space = state.free_space.get(package_id)
+    if package_free_space is None or package_free_space.if_stale():
+        _save_free_space(state, package_id)
+        package_slot = get_package(state, package_id)
+        package_free_space = free_space.build_free_space(state.package_dimension_x[package_slot],
+                                                         state.package_dimension_y[package_slot],
+                                                         get_package_box_edges(state, package_id))
+        state.free_space[package_id] = package_free_space
+    return package_free_space
+
+
+def begin_move(state):
+    """
+    open a move: all following modifications of state are recorded until commit_move or undo_move
+    :param state: ShippingState
+    :return: move record, list of delta records
+    """
+    state.journal = []
+    return state.journal
+
+
+def commit_move(state):
+    """
+    close the open move keeping all modifications
+    :param state: ShippingState
+    :return: move record of the closed move
+    """
+    move = state.journal
+    state.journal = None
+    return move
+
+
+def undo_move(state, move):
+    """
+    revert all modifications recorded in move, in reverse order, and close the move
+    :param state: ShippingState
+    :param move: move record returned by begin_move
+    """
+    state.journal = None
+    # free space of packages is restored from the move, it is not updated while boxes are put back
+    free_space_map = state.free_space
+    state.free_space = {}
+    for record in reversed(move):
+        if record[0] == 'box':
+            _, slot, package_id, x_center, y_center = record
+            set_box(state, slot, package_id, x_center, y_center)
+        elif record[0] == 'rotate':
+            _, slot, type_position = record
+            get_rotated_box(state, slot)
+            # rotating back leaves box at the boundary of orientations of its type, it returns to its position
+            _swap_type_positions(state, int(state.type_position[slot]), type_position)
+        elif record[0] == 'package':
+            _, slot, active = record
+            _set_package_active(state, slot, active)
+        elif record[0] == 'add_package':
+            _set_package_active(state, record[1], False)
+            state.n_package_slots -= 1
+    for record in move:
+        if record[0] == 'free_space':
+            _, package_id, package_free_space = record
+            if package_free_space is None:
+                free_space_map.pop(package_id, None)
+            else:
+                free_space_map[package_id] = package_free_space
+    state.free_space = free_space_map
+    del move[:]
+
+
+def get_move_boxes(move):
+    """
+    return slots of boxes modified by move
+    :param move: move record
+    :return: set of box slots
+    """
+    return set(record[1] for record in move if record[0] in ('box', 'rotate'))
+
+
+def if_move_empty(move):
+    """
+    return True if move didn't modify any box or package (it may only have built free space of packages)
+    :param move: move record
+    """
+    return all(record[0] == 'free_space' for record in move)
+
+
+def get_move_source_packages(move):
+    """
+    return ids of packages boxes were moved out of by move
+    :param move: move record
+    :return: set of package ids
+    """
+    return set(record[2] for record in move if record[0] == 'box')
+
+
+def set_box(state, slot, package_id, x_center, y_center):
+    """
+    put box in slot to package_id at (x_center, y_center), record the change in the open move
+    :param state: ShippingState
+    :param slot: slot of the box
+    :param package_id: id of the package
+    :param x_center: x coordinate of box center
+    :param y_center: y coordinate of box center
+    """
+    if state.journal is not None:
+        state.journal.append(('box', slot, state.box_package_id[slot], state.box_x_center[slot],
+                              state.box_y_center[slot]))
+    _unindex_box(state, slot)
+    if package_id != state.box_package_id[slot]:
+        box_type = int(state.box_type[slot])
+        _count_type_package(state, box_type, int(state.box_package_id[slot]), -1)
+        _count_type_package(state, box_type, int(package_id), 1)
+    state.box_package_id[slot] = package_id
+    state.box_x_center[slot] = x_center
+    state.box_y_center[slot] = y_center
+    _index_box(state, slot)
+
+
+def _set_package_active(state, slot, active):
+    """
+    mark package in slot active or removed, update number of packages and area
+    :param state: ShippingState
+    :param slot: slot of the package
+    :param active: True or False
+    """
+    if state.package_active[slot] == active:
+        return
+    if state.journal is not None:
+        state.journal.append(('package', slot, bool(state.package_active[slot])))
+    state.package_active[slot] = active
+    area = float(state.package_dimension_x[slot] * state.package_dimension_y[slot])
+    if active:
+        state.n_packages += 1
+        state.area += area
+        _add_package_index(state, slot)
+    else:
+        state.n_packages -= 1
+        state.area -= area
+        _remove_package_index(state, slot)
+
+
+def get_box(state, box_index):
+    """
+    return slot of a box stored with box_index
+    :param state: ShippingState
+    :param box_index:
+    :return: slot of the box in box table
+    """
+    return state.box_slot[box_index]
+
+
+def get_package(state, package_id):
+    """
+    return slot of an active package with package_id
+    :param state: ShippingState
+    :param package_id:
+    :return: slot of the package in package table
+    """
+    return state.package_slot[package_id]
+
+
+def get_boxes_in_package(state, package_id):
+    """
+    return slots of boxes stored in package with package_id
+    :param state: ShippingState
+    :param package_id:
+    :return: set of box slots, must not be modified by caller
+    """
+    return state.package_members.get(int(package_id), set())
+
+
+def get_active_package_ids(state):
+    """
+    return ids of active packages in the order of package table
+    :param state: ShippingState
+    :return: array of package ids
+    """
+    n = state.n_package_slots
+    return state.package_ids[:n][state.package_active[:n]]
+
+
+def calculate_area_packages(state):
+    """
+    calculate sum of packages area of active packages
+    :param state: ShippingState
+    :return: area: sum of packages area
+    """
+    n = state.n_package_slots
+    active = state.package_active[:n]
+    return float(np.sum(state.package_dimension_x[:n][active] * state.package_dimension_y[:n][active]))
+
+
+def if_box_fits_to_empty_package(box_dimension_x, box_dimension_y, package_dimensions):
+    """
+    check if a box of certain dimensions fits to an empty package, box can be rotated
+    :param box_dimension_x: length of box or numpy array of lengths of many boxes
+    :param box_dimension_y: height of box or numpy array of heights of many boxes
+    :param package_dimensions: [length, height] of package
+    :return: True or False, boolean array for arrays of boxes
+    """
+    package_x, package_y = package_dimensions
+    return ((box_dimension_x <= package_x) & (box_dimension_y <= package_y)) | \
+        ((box_dimension_y <= package_x) & (box_dimension_x <= package_y))
+
+
+def if_package_empty(state, package_id):
+    """
+    check if package is empty
+    :param state: ShippingState
+    :param package_id: id of package to be checked
+    :return: True if package is empty; False if there is at least one box in a package
+    """
+    return len(get_boxes_in_package(state, package_id)) == 0
+
+
+def add_package(state, package_type):
+    """
+    add package of package_type to state
+    :param state: ShippingState
+    :param package_type: one of the keys of state.package_types
+    :return: id of the new package
+    """
+    slot = state.n_package_slots
+    _grow_package_table(state, slot + 1)
+    active_ids = get_active_package_ids(state)
+    package_id = 1 if len(active_ids) == 0 else int(active_ids.max()) + 1
+    state.package_ids[slot] = package_id
+    state.package_type_codes[slot] = state.package_type_names.index(package_type)
+    state.package_dimension_x[slot] = state.package_types[package_type][0]
+    state.package_dimension_y[slot] = state.package_types[package_type][1]
+    state.n_package_slots += 1
+    if state.journal is not None:
+        state.journal.append(('add_package', slot))
+    journal = state.journal
+    state.journal = None  # adding the package is undone by the 'add_package' record
+    _set_package_active(state, slot, True)
+    state.journal = journal
+    return package_id
+
+
+def remove_empty_package(state, package_id):
+    """
+    checks that package is empty, marks package of package_id as removed
+    :param state: ShippingState
+    :param package_id: id of package to be removed
+    :return: updated state, False if package is not empty
+    """
+    if not if_package_empty(state, package_id):
+        print("Error: empty package to be removed is not empty. Exit ")
+        return False
+    _set_package_active(state, get_package(state, package_id), False)
+    return state
+
+
+def remove_empty_packages(state, package_ids=None):
+    """
+    remove empty packages from state
+    :param state: ShippingState
+    :param package_ids: ids of packages to check, e.g. get_move_source_packages(move); all packages if None
+    :return: updated state
+    """
+    if package_ids is None:
+        package_ids = get_active_package_ids(state)
+    for package_id in package_ids:
+        if if_package_empty(state, package_id):
+            remove_empty_package(state, package_id)
+    return state
+
+
+def get_box_edges(state, slot):
+    """
+    return edges of a box
+    :param state: ShippingState
+    :param slot: slot of the box
+    :return: left, right, bottom, top
+    """
+    half_x = state.box_dimension_x[slot] / 2.0
+    half_y = state.box_dimension_y[slot] / 2.0
+    x_center = state.box_x_center[slot]
+    y_center = state.box_y_center[slot]
+    return x_center - half_x, x_center + half_x, y_center - half_y, y_center + half_y
+
+
+def if_intersect_x(state, slot_1, slot_2):
+    """
+    return True if box in slot_1 intersect with box in slot_2 in x direction
+    :param state: ShippingState
+    :return: True of False
+    """
+    left_1, right_1, _, _ = get_box_edges(state, slot_1)
+    left_2, right_2, _, _ = get_box_edges(state, slot_2)
+    return spatial_index.if_segments_intersect(left_1, right_1, left_2, right_2)
+
+
+def if_intersect_y(state, slot_1, slot_2):
+    """
+    return True if box in slot_1 intersect with box in slot_2 in y direction
+    :param state: ShippingState
+    :return: True of False
+    """
+    _, _, bottom_1, top_1 = get_box_edges(state, slot_1)
+    _, _, bottom_2, top_2 = get_box_edges(state, slot_2)
+    return spatial_index.if_segments_intersect(bottom_1, top_1, bottom_2, top_2)
+
+
+def get_rotated_box(state, slot):
+    """
+    alternate box dimensions, change rotated flag to the opposite
+    :param state: ShippingState
+    :param slot: slot of the box
+    """
+    if state.journal is not None:
+        state.journal.append(('rotate', slot, int(state.type_position[slot])))
+    _unindex_box(state, slot)
+    box_x = state.box_dimension_x[slot]
+    state.box_dimension_x[slot] = state.box_dimension_y[slot]
+    state.box_dimension_y[slot] = box_x
+    state.box_rotated[slot] = not state.box_rotated[slot]
+    state.type_n_rotated[state.box_type[slot]] += 1 if state.box_rotated[slot] else -1
+    _update_type_orientation(state, slot)
+    _index_box(state, slot)
+
+
+def if_box_fits_to_package(state, box_index, package_id):
+    """
+    return true if box fits to package on top of the highest box in it
+    :param state: ShippingState
+    :param box_index: index of box
+    :param package_id: id of package
+    :return: True or False
+    """
+    box_slot = get_box(state, box_index)
+    package_slot = get_package(state, package_id)
+    if state.box_dimension_x[box_slot] > state.package_dimension_x[package_slot]:
+        return False
+    # the highest box top in package is kept in package spatial index
+    max_top_y_of_boxes = state.package_index[int(package_id)].get_max_top()
+    # check if highest box top + height of box to fit is less than package height
+    return max_top_y_of_boxes + state.box_dimension_y[box_slot] <= state.package_dimension_y[package_slot]
+
+
+def if_box_fits_to_shipping(state, box_index):
+    """
+    return True if box fits to at least one package in state
+    :param state: ShippingState
+    :param box_index: index of box
+    :return: True or False
+    """
+    for package_id in get_active_package_ids(state):
+        if if_box_fits_to_package(state, box_index, package_id):
+            return True
+    return False
+
+
+def pick_package_type(state, box_index, rng):
+    """
+    picks a random package type where box fits
+    :param state: ShippingState
+    :param box_index: index of box
+    :param rng: random_stream.RandomStream
+    :return: one of the keys from state.package_types
+    """
+    slot = get_box(state, box_index)
+    available_types = [package_type for package_type in state.package_type_names
+                       if if_box_fits_to_empty_package(state.box_dimension_x[slot], state.box_dimension_y[slot],
+                                                       state.package_types[package_type])]
+    if len(available_types) == 0:
+        print("DEBUG: Box doesn't fit into any available package type. Exit ")
+        return False
+    return rng.choice(available_types)
+
+
+def pick_package(state, rng):
+    """
+    randomly pick an active package
+    :param state: ShippingState
+    :param rng: random_stream.RandomStream
+    :return: package_id, False if there are no packages
+    """
+    package_ids = get_active_package_ids(state)
+    if len(package_ids) == 0:
+        print("No packages to pick from shipping state, exit")
+        return False
+    return int(rng.choice(package_ids))
+
+
+def pick_package_for_box(state, box_index, rng):
+    """
+    picks a random package where box fits on top of the highest box
+    :param state: ShippingState
+    :param box_index: index of box
+    :param rng: random_stream.RandomStream
+    :return: package_id - id of a package where to put box
+    """
+    while True:
+        package_id = pick_package(state, rng)
+        if if_box_fits_to_package(state, box_index, package_id):
+            return package_id
+
+
+def get_random_coordinate(rng, start, stop, precision):
+    """
+    return random coordinate out of start, start + precision, ... below stop (values of np.arange(start, stop,
+    precision)) without creating the array, start if there are no such values
+    :param rng: random_stream.RandomStream
+    """
+    n_positions = int(math.ceil((stop - start) / precision))
+    if n_positions <= 1:
+        return start
+    return start + rng.integer(n_positions) * precision
+
+
+def put_box_in_package(state, box_index, package_id, rng):
+    """
+    assign random x coordinates to box inside package, no checks performed on wether box fits to package
+    put box on top of the highest box intersecting with it in x direction
+    box is not rotated inside function
+    :param state: ShippingState
+    :param box_index: index of a box to be moved
+    :param package_id: id of a package where to put box
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    slot = get_box(state, box_index)
+    package_slot = get_package(state, package_id)
+    box_x = state.box_dimension_x[slot]
+    box_y = state.box_dimension_y[slot]
+    x_center = get_random_coordinate(rng, box_x / 2.0,
+                                     state.package_dimension_x[package_slot] - box_x / 2.0 + state.precision,
+                                     state.precision)
+    # highest top of boxes intersecting with box in x direction, 0 (bottom of the package) if there are none
+    y_top = state.package_index[int(package_id)].get_highest_top(x_center - box_x / 2.0, x_center + box_x / 2.0,
+                                                                 exclude=slot)
+    set_box(state, slot, package_id, x_center, y_top + box_y / 2.0)
+    return state
+
+
+def move_box_in_same_package(state, box_index, rng):
+    """
+    assign random x and y coordinates within package borders
+    :param state: ShippingState
+    :param box_index: index of the box to be moved
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    slot = get_box(state, box_index)
+    package_slot = get_package(state, state.box_package_id[slot])
+    box_x = state.box_dimension_x[slot]
+    box_y = state.box_dimension_y[slot]
+    x_center = get_random_coordinate(rng, box_x / 2.0,
+                                     state.package_dimension_x[package_slot] - box_x / 2.0 + state.precision,
+                                     state.precision)
+    y_center = get_random_coordinate(rng, box_y / 2.0,
+                                     state.package_dimension_y[package_slot] - box_y / 2.0 + state.precision,
+                                     state.precision)
+    set_box(state, slot, state.box_package_id[slot], x_center, y_center)
+    return state
+
+
+def move_box_to_random_package(state, box_index, rng):
+    """
+    assign random x and y coordinates in random package different from the current one
+    :param state: ShippingState
+    :param box_index: index of the box to be moved
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    slot = get_box(state, box_index)
+    package_original = state.box_package_id[slot]
+    if state.n_packages < 2:
+        # no other package to move box to
+        return state
+    random_package_id = package_original
+    while package_original == random_package_id:  # make sure that picked package is not the same where the box already is
+        random_package_id = pick_package(state, rng)
+    package_slot = get_package(state, random_package_id)
+    x_center = get_random_coordinate(rng, state.box_dimension_x[slot] / 2.0,
+                                     state.package_dimension_x[package_slot] + state.precision, state.precision)
+    y_center = get_random_coordinate(rng, state.box_dimension_y[slot] / 2.0,
+                                     state.package_dimension_y[package_slot] + state.precision, state.precision)
+    set_box(state, slot, random_package_id, x_center, y_center)
+    return state
+
+
+def put_box_in_free_space(state, box_index, package_id, rng):
+    """
+    put box to random position inside a random free rectangle of package where box fits, box is rotated
+    if it fits only rotated or if rotated orientation was picked. Nothing is changed if box doesn't fit anywhere
+    :param state: ShippingState
+    :param box_index: index of the box to be moved
+    :param package_id: id of the package
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    slot = get_box(state, box_index)
+    package_free_space = get_free_space(state, package_id)
+    box_x = state.box_dimension_x[slot]
+    box_y = state.box_dimension_y[slot]
+    candidates = [(rectangle, False) for rectangle in package_free_space.get_fitting_rectangles(box_x, box_y)]
+    if box_x != box_y:
+        candidates += [(rectangle, True) for rectangle in package_free_space.get_fitting_rectangles(box_y, box_x)]
+    if len(candidates) == 0:
+        return state
+    (x, y, length, height), rotated = rng.choice(candidates)
+    if rotated:
+        get_rotated_box(state, slot)
+        box_x, box_y = box_y, box_x
+    # random position on the grid of precision inside free rectangle
+    x_center = x + box_x / 2.0 + rng.integer(int((length - box_x) / state.precision + 1e-9) + 1) * state.precision
+    y_center = y + box_y / 2.0 + rng.integer(int((height - box_y) / state.precision + 1e-9) + 1) * state.precision
+    set_box(state, slot, package_id, x_center, y_center)
+    return state
+
+
+def move_box_to_free_space_in_same_package(state, box_index, rng):
+    """
+    move box to random position in free space of its package
+    :param state: ShippingState
+    :param box_index: index of the box to be moved
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    return put_box_in_free_space(state, box_index, int(state.box_package_id[get_box(state, box_index)]), rng)
+
+
+def move_box_to_free_space_in_random_package(state, box_index, rng):
+    """
+    move box to random position in free space of random package different from the current one
+    :param state: ShippingState
+    :param box_index: index of the box to be moved
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    package_original = state.box_package_id[get_box(state, box_index)]
+    if state.n_packages < 2:
+        # no other package to move box to
+        return state
+    random_package_id = package_original
+    while package_original == random_package_id:
+        random_package_id = pick_package(state, rng)
+    return put_box_in_free_space(state, box_index, random_package_id, rng)
+
+
+def rotate_box(state, box_index):
+    """
+    rotate box around its center
+    :param state: ShippingState
+    :param box_index: index of the box to be rotated
+    :return: updated state
+    """
+    get_rotated_box(state, get_box(state, box_index))
+    return state
+
+
+def swap_boxes_same_container(box_1_index, box_2_index, state):
+    """
+    swap coordinates of two boxes in the same container
+    :param box_1_index:
+    :param box_2_index:
+    :param state: ShippingState
+    :return: updated state, False if boxes are in different packages
+    """
+    slot_1 = get_box(state, box_1_index)
+    slot_2 = get_box(state, box_2_index)
+    if state.box_package_id[slot_1] != state.box_package_id[slot_2]:
+        print(" in swap_boxes_same_container: package id is not the same. Exit")
+        return False
+    return swap_boxes(box_1_index, box_2_index, state)
+
+
+def swap_boxes(box_1_index, box_2_index, state):
+    """
+    swap coordinates and packages of two boxes
+    :param box_1_index: index of box 1
+    :param box_2_index: index of box 2
+    :param state: ShippingState
+    :return: updated state
+    """
+    slot_1 = get_box(state, box_1_index)
+    slot_2 = get_box(state, box_2_index)
+    box_1 = (state.box_package_id[slot_1], state.box_x_center[slot_1], state.box_y_center[slot_1])
+    set_box(state, slot_1, state.box_package_id[slot_2], state.box_x_center[slot_2], state.box_y_center[slot_2])
+    set_box(state, slot_2, *box_1)
+    return state
+
+
+def insert_box(state, box_index):
+    """
+    put box into free space of existing packages, bottom-left corner of the smallest free rectangle where it fits
+    (in any orientation), or into a new package of the smallest type where it fits if there is no such rectangle
+    :param state: ShippingState
+    :param box_index: index of the box, box must not be in an active package
+    :return: id of the package where box was put
+    """
+    slot = get_box(state, box_index)
+    box_x = state.box_dimension_x[slot]
+    box_y = state.box_dimension_y[slot]
+    best = None  # (area of free rectangle, package_id, x, y, rotated)
+    for package_id in get_active_package_ids(state):
+        package_free_space = get_free_space(state, package_id)
+        for rotated, (dimension_x, dimension_y) in enumerate([(box_x, box_y), (box_y, box_x)]):
+            if rotated and box_x == box_y:
+                continue
+            for x, y, length, height in package_free_space.get_fitting_rectangles(dimension_x, dimension_y):
+                if best is None or length * height < best[0]:
+                    best = (length * height, int(package_id), x, y, bool(rotated))
+    if best is None:
+        fitting_types = [name for name in state.package_type_names
+                         if if_box_fits_to_empty_package(box_x, box_y, state.package_types[name])]
+        package_type = min(fitting_types, key=lambda name: state.package_types[name][0] * state.package_types[name][1])
+        package_id = add_package(state, package_type)
+        package_slot = get_package(state, package_id)
+        rotated = box_x > state.package_dimension_x[package_slot] or box_y > state.package_dimension_y[package_slot]
+        best = (None, package_id, 0.0, 0.0, rotated)
+    area, package_id, x, y, rotated = best
+    if rotated:
+        get_rotated_box(state, slot)
+    set_box(state, slot, package_id, x + state.box_dimension_x[slot] / 2.0, y + state.box_dimension_y[slot] / 2.0)
+    return package_id
+
+
+def compact_package(state, package_id):
+    """
+    push boxes of package to the bottom-left corner (gravity): every box slides down until it touches a box below
+    or the package bottom, then left until it touches a box or the package wall, in the order of bottom and left
+    edges; passes are repeated until no box moves (at most compaction_passes).
+    obstacles are found with if_intersect_x/if_intersect_y semantics (spatial_index.if_segments_intersect): a box below
+    intersects in x, a box on the left intersects in y, touching boxes don't intersect. boxes are only moved into
+    free space, so valid package stays valid
+    :param state: ShippingState
+    :param package_id: id of an active package
+    :return: number of moved boxes
+    """
+    package_id = int(package_id)
+    slots = sorted(state.package_members[package_id])
+    # packages hold a few dozens of boxes, plain lists are faster than arrays here
+    edges = [list(get_box_edges(state, slot)) for slot in slots]  # [left, right, bottom, top]
+    moved = [False] * len(slots)
+    for _ in range(compaction_passes):
+        any_moved = False
+        for i in sorted(range(len(slots)), key=lambda i: (edges[i][2], edges[i][0])):
+            box = edges[i]
+            new_bottom = 0.0
+            for j, other in enumerate(edges):
+                if new_bottom < other[3] <= box[2] and j != i and \
+                        spatial_index.if_segments_intersect(box[0], box[1], other[0], other[1]):
+                    new_bottom = other[3]
+            if new_bottom < box[2]:
+                box[3] -= box[2] - new_bottom
+                box[2] = new_bottom
+                moved[i] = any_moved = True
+            new_left = 0.0
+            for j, other in enumerate(edges):
+                if new_left < other[1] <= box[0] and j != i and \
+                        spatial_index.if_segments_intersect(box[2], box[3], other[2], other[3]):
+                    new_left = other[1]
+            if new_left < box[0]:
+                box[1] -= box[0] - new_left
+                box[0] = new_left
+                moved[i] = any_moved = True
+        if not any_moved:
+            break
+    for i, slot in enumerate(slots):
+        if moved[i]:
+            set_box(state, slot, package_id, edges[i][0] + state.box_dimension_x[slot] / 2.0,
+                    edges[i][2] + state.box_dimension_y[slot] / 2.0)
+    return moved.count(True)
+
+
+def compact_shipping(state):
+    """
+    compact all packages of state, see compact_package
+    :param state: ShippingState
+    :return: number of moved boxes
+    """
+    return sum(compact_package(state, package_id) for package_id in get_active_package_ids(state))
+
+
+def pack_boxes_randomly(state, rng):
+    """
+    pack boxes in packages in random order,
+    if next box doesn't fit into a package anymore,
+    new packages of a random type is taken
+    :param state: ShippingState
+    :param rng: random_stream.RandomStream
+    :return: updated state
+    """
+    for box_index in rng.permutation(state.box_index):
+        if state.n_packages == 0 or not if_box_fits_to_shipping(state, box_index):
+            # if no space left in existing packages, add new random package where box would fit
+            package_id = add_package(state, pick_package_type(state, box_index, rng))
+        else:
+            # pick a random package out of existing, but so box would fit
+            package_id = pick_package_for_box(state, box_index, rng)
+        # check if box needs to be rotated before put to package_id
+        slot = get_box(state, box_index)
+        package_slot = get_package(state, package_id)
+        if state.box_dimension_x[slot] > state.package_dimension_x[package_slot] or \
+                state.box_dimension_y[slot] > state.package_dimension_y[package_slot]:
+            get_rotated_box(state, slot)
+        put_box_in_package(state, box_index, package_id, rng)
+    return state
+
+
+def if_shipping_valid(state):
+    """
+    return True if boxes in packages don't intersect with each other and
+    if all boxes are withing corresponding package dimensions
+    :param state: ShippingState
+    :return: True or False
+    """
+    for package_id in get_active_package_ids(state):
+        if not if_package_valid(state, package_id):
+            return False
+    return True
+
+
+def if_package_valid(state, package_id):
+    """
+    return True if all boxes of package are within its dimensions and don't intersect each other,
+    all pairs of boxes are checked at once with overlap.if_boxes_valid
+    :param state: ShippingState
+    :param package_id: id of an active package
+    :return: True or False
+    """
+    package_slot = get_package(state, package_id)
+    slots = np.fromiter(get_boxes_in_package(state, package_id), dtype=np.int64)
+    edges = overlap.get_edges(state.box_x_center[slots], state.box_y_center[slots],
+                              state.box_dimension_x[slots], state.box_dimension_y[slots])
+    return overlap.if_boxes_valid(edges, state.package_dimension_x[package_slot],
+                                  state.package_dimension_y[package_slot])
+
+
+def if_box_valid(state, slot):
+    """
+    return True if box in slot is within its package dimensions and doesn't intersect other boxes in its package
+    :param state: ShippingState
+    :param slot: slot of the box
+    :return: True or False
+    """
+    package_id = state.box_package_id[slot]
+    package_slot = get_package(state, package_id)
+    left, right, bottom, top = get_box_edges(state, slot)
+    if left < 0.0 or right > state.package_dimension_x[package_slot] or \
+            bottom < 0.0 or top > state.package_dimension_y[package_slot]:
+        return False
+    return not state.package_index[int(package_id)].if_overlaps(left, right, bottom, top, exclude=slot)
+
+
+def if_move_valid(state, move):
+    """
+    local version of if_shipping_valid: check only boxes modified by move against package borders and
+    against other boxes in their packages.
+    if state was valid before the move, result is the same as of if_shipping_valid(state)
+    :param state: ShippingState
+    :param move: move record of the open move
+    :return: True or False
+    """
+    slots = get_move_boxes(move)
+    if len(slots) < package_check_boxes:
+        return all(if_box_valid(state, slot) for slot in slots)
+    package_slots = {}
+    for slot in slots:
+        package_slots.setdefault(int(state.box_package_id[slot]), []).append(slot)
+    for package_id, slots in package_slots.items():
+        if len(slots) >= package_check_boxes and 2 * len(slots) >= len(state.package_members[package_id]):
+            if not if_package_valid(state, package_id):
+                return False
+        elif not all(if_box_valid(state, slot) for slot in slots):
+            return False
+    return True
+
+
+def get_enabled_operators(weights=None):
+    """
+    return indexes of operators of positive weight
+    :param weights: weights of operators, default_operator_weights if None
+    :return: list of indexes in operators
+    """
+    if weights is None:
+        weights = default_operator_weights
+    return [operator for operator, weight in enumerate(weights) if weight > 0]
+
+
+def change_shipping_randomly(state, rng, operator=None, proposal_mode='grid'):
+    """
+    randomly perform one of the modifications in shipping in place, modifications are recorded in the open move:
+    0 - move box to random coordinates in the same package
+    1 - move box to random coordinates in random package
+    in proposal_mode 'free_space' boxes are moved only to positions in free space where they fit
+    2 - rotate random non-square box
+    3 - swap coordinates of two random boxes in the same container
+    4 - swap coordinates of two random boxes from different containers
+    5 - push boxes of the package of random box to the bottom-left corner, see compact_package
+    boxes placed with the same dimensions are never swapped with each other, such swaps change nothing
+    :param state: ShippingState
+    :param rng: random_stream.RandomStream
+    :param operator: index of modification in operators,
+    picked uniformly among operators of positive default_operator_weights if None
+    :param proposal_mode: one of proposal_modes
+    :return: updated state
+    """
+    if state.n_boxes == 0:
+        return state
+    if operator is None:
+        enabled = get_enabled_operators()
+        rndn = enabled[rng.integer(len(enabled))]
+    else:
+        rndn = operator
+    random_box_slot = rng.integer(state.n_boxes)
+    if rndn == 2 and state.box_type_sides[state.box_type[random_box_slot], 0] == \
+            state.box_type_sides[state.box_type[random_box_slot], 1]:
+        # rotation of square box changes nothing, random non-square box is rotated instead
+        if len(state.non_square_slots) == 0:
+            return state
+        random_box_slot = state.non_square_slots[rng.integer(len(state.non_square_slots))]
+    random_box_index = state.box_index[random_box_slot]
+    random_box_package_id = state.box_package_id[random_box_slot]
+    if rndn == 0:
+        if proposal_mode == 'free_space':
+            move_box_to_free_space_in_same_package(state, random_box_index, rng)
+        else:
+            move_box_in_same_package(state, random_box_index, rng)
+    elif rndn == 1:
+        if proposal_mode == 'free_space':
+            move_box_to_free_space_in_random_package(state, random_box_index, rng)
+        else:
+            move_box_to_random_package(state, random_box_index, rng)
+    elif rndn == 2:
+        rotate_box(state, random_box_index)
+    elif rndn == 3:
+        # swap two boxes in the same package if there are other boxes in package,
+        # boxes placed with the same dimensions are not swapped, swap of identical boxes changes nothing
+        box_x = state.box_dimension_x[random_box_slot]
+        box_y = state.box_dimension_y[random_box_slot]
+        # members are sorted, so the pick depends only on random numbers and not on the history of the member set;
+        # unlike pick_different_box this costs O(m log m) in the number m of boxes in package
+        other_slots = [slot for slot in sorted(get_boxes_in_package(state, random_box_package_id))
+                       if state.box_dimension_x[slot] != box_x or state.box_dimension_y[slot] != box_y]
+        if len(other_slots) > 0:
+            random_box_2_index = state.box_index[rng.choice(other_slots)]
+            swap_boxes_same_container(random_box_index, random_box_2_index, state)
+    elif rndn == 4:
+        # swap two boxes from different packages
+        random_box_2_slot = pick_different_box(state, random_box_slot, rng)
+        if random_box_2_slot is not None:
+            swap_boxes(random_box_index, state.box_index[random_box_2_slot], state)
+    elif rndn == 5:
+        compact_package(state, random_box_package_id)
+    return state
+
+
+def pick_different_box(state, slot, rng):
+    """
+    pick random box placed with dimensions different from box in slot: box of another type or box of the same
+    type placed in the other orientation, both are contiguous ranges of type_slots, so the pick doesn't depend
+    on the number of boxes
+    :param state: ShippingState
+    :param slot: slot of the box
+    :param rng: random_stream.RandomStream
+    :return: slot of the picked box, None if all boxes are identical to box in slot
+    """
+    box_type = state.box_type[slot]
+    start = state.box_type_start[box_type]
+    stop = state.box_type_start[box_type + 1]
+    boundary = stop - state.type_n_flipped[box_type]
+    # boxes of the type in the other orientation
+    if state.type_position[slot] < boundary:
+        other_start, other_stop = boundary, stop
+    else:
+        other_start, other_stop = start, boundary
+    n_other_types = state.n_boxes - (stop - start)
+    n_candidates = n_other_types + other_stop - other_start
+    if n_candidates == 0:
+        return None
+    position = rng.integer(n_candidates)
+    if position >= n_other_types:
+        return int(state.type_slots[other_start + position - n_other_types])
+    # slots of other types are type_slots without the range of box_type
+    if position >= start:
+        position += stop - start
+    return int(state.type_slots[position])
@@ -0,0 +1,173 @@
+# Cache of packing solutions of orders with the same boxes
+# orders are identified by canonical signature: sorted multiset of box dimensions up to rotation,
+# package types and precision; a cached solution is reused for any order with the same signature
+import collections
+import copy
+import hashlib
+import json
+import os
+
+import numpy as np
+
+max_entries = 256  # number of solutions kept in memory
+max_disk_bytes = 100 * 2 ** 20  # maximal size of solutions stored on disk, the least recently used are removed
+
+
+def get_canonical_order(boxes):
+    """
+    return canonical order of boxes: boxes sorted by shorter and then by longer side
+    :param boxes: list of box dictionaries with keys 'dimension_x', 'dimension_y'
+    :return: array of positions of boxes in canonical order, array (n, 2) of sorted (shorter, longer) sides
+    """
+    sides = np.sort(np.array([[box['dimension_x'], box['dimension_y']] for box in boxes],
+                             dtype=np.float64).reshape(-1, 2), axis=1)
+    order = np.lexsort((sides[:, 1], sides[:, 0]))
+    return order, sides[order]
+
+
+def get_signature(boxes, package_types, precision):
+    """
+    return canonical signature of an order, it doesn't depend on order, indexes and rotation of boxes
+    :param boxes: list of box dictionaries with keys 'dimension_x', 'dimension_y'
+    :param package_types: dictionary of available package types with dimensions
+    :param precision: precision of coordinates
+    :return: hexadecimal SHA-256 hash
+    """
+    signature = hashlib.sha256(get_canonical_order(boxes)[1].tobytes())
+    signature.update(json.dumps([sorted([name, [float(dimension) for dimension in dimensions]]
+                                        for name, dimensions in package_types.items()),
+                                 float(precision)]).encode('utf-8'))
+    return signature.hexdigest()
+
+
+def get_canonical_solution(shipping_dict):
+    """
+    return copy of solution with boxes in canonical order, box indexes are not kept
+    """
+    solution = copy.deepcopy(shipping_dict)
+    order = get_canonical_order(shipping_dict['boxes'])[0]
+    solution['boxes'] = [solution['boxes'][position] for position in order]
+    for box in solution['boxes']:
+        del box['box_index']
+        del box['rotated']
+    return solution
+
+
+def remap_solution(solution, boxes):
+    """
+    apply canonical solution to boxes of an order with the same signature:
+    k-th box of the order in canonical order gets placement of k-th box of the solution
+    :param solution: solution returned by get_canonical_solution
+    :param boxes: list of box dictionaries of the order
+    :return: shipping_dict with box_index of the order, box is 'Rotated' if its placed dimensions are swapped
+    """
+    shipping_dict = copy.deepcopy(solution)
+    order = get_canonical_order(boxes)[0]
+    for placed_box, position in zip(shipping_dict['boxes'], order):
+        box = boxes[position]
+        placed_box['box_index'] = box['box_index']
+        if_same = placed_box['dimension_x'] == box['dimension_x'] and placed_box['dimension_y'] == box['dimension_y']
+        placed_box['rotated'] = 'Not rotated' if if_same else 'Rotated'
+    # boxes are returned in the order of the order, as by packing.initialize_shipping_from_boxes
+    shipping_dict['boxes'] = [placed_box for position, placed_box in sorted(zip(order.tolist(),
+                                                                                 shipping_dict['boxes']))]
+    return shipping_dict
+
+
+class SolutionCache:
+    """
+    two tiers of solutions: in-memory LRU of max_entries solutions and optional directory of JSON files
+    with total size limited by max_bytes (the least recently used files are removed).
+    the directory can be shared by processes, files are written under temporary names and renamed
+    """
+
+    def __init__(self, directory=None, entries=None, max_bytes=None):
+        """
+        :param directory: directory of the disk tier, memory only if None
+        :param entries: number of solutions kept in memory, max_entries by default
+        :param max_bytes: maximal size of the disk tier, max_disk_bytes by default
+        """
+        self.directory = directory
+        self.entries = max_entries if entries is None else entries
+        self.max_bytes = max_disk_bytes if max_bytes is None else max_bytes
+        self.memory = collections.OrderedDict()  # signature: canonical solution
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get_filename(self, signature):
+        return os.path.join(self.directory, signature + '.json')
+
+    def get(self, boxes, package_types, precision):
+        """
+        return solution of an order with the same signature remapped to boxes, None if there is no such solution
+        :param boxes: list of box dictionaries of the order
+        :param package_types: dictionary of available package types with dimensions
+        :param precision: precision of coordinates
+        :return: shipping_dict or None
+        """
+        signature = get_signature(boxes, package_types, precision)
+        solution = self.memory.get(signature)
+        if solution is not None:
+            self.memory.move_to_end(signature)
+        elif self.directory is not None:
+            try:
+                with open(self.get_filename(signature)) as solution_file:
+                    solution = json.load(solution_file)
+                os.utime(self.get_filename(signature))  # modification time is the time of the last use
+                self.add_to_memory(signature, solution)
+            except (OSError, ValueError):
+                solution = None
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return remap_solution(solution, boxes)
+
+    def put(self, shipping_dict, package_types, precision):
+        """
+        store solution of an order
+        :param shipping_dict: solution, e.g. returned by packing.packing_with_monte_carlo
+        :param package_types: dictionary of available package types with dimensions
+        :param precision: precision of coordinates
+        """
+        signature = get_signature(shipping_dict['boxes'], package_types, precision)
+        solution = get_canonical_solution(shipping_dict)
+        self.add_to_memory(signature, solution)
+        if self.directory is not None:
+            filename = self.get_filename(signature)
+            temporary_filename = '%s.%d.tmp' % (filename, os.getpid())
+            try:
+                with open(temporary_filename, 'w') as solution_file:
+                    json.dump(solution, solution_file)
+                os.replace(temporary_filename, filename)
+                self.evict()
+            except OSError as error:
+                print('solution is not cached on disk: %s' % error)
+
+    def add_to_memory(self, signature, solution):
+        self.memory[signature] = solution
+        self.memory.move_to_end(signature)
+        while len(self.memory) > self.entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """
+        remove the least recently used files of the disk tier until its size is at most max_bytes
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for modified, size, path in files)
+        for modified, size, path in sorted(files):
+            if total_size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # already removed by another process
+                pass
+            total_size -= size
@@ -0,0 +1,134 @@
+import math
+
+
+class PackageIndex:
+    """
+    spatial index of boxes in one package: package length is split into columns of equal width,
+    every column keeps the set of boxes whose x-extent overlaps it and the highest box top in it (height profile).
+    boxes are identified by their slot in ShippingState, edges of boxes are stored as (left, right, bottom, top).
+    intersection semantics are the same as in packing.if_intersect_x/if_intersect_y: touching edges don't intersect
+    """
+
+    def __init__(self, length, n_columns=64):
+        """
+        :param length: x dimension of the package
+        :param n_columns: number of columns package length is split into
+        """
+        self.length = float(length)
+        self.n_columns = max(1, int(n_columns))
+        self.column_width = self.length / self.n_columns
+        self.columns = [set() for _ in range(self.n_columns)]
+        self.column_top = [0.0] * self.n_columns
+        self.boxes = {}  # slot: (left, right, bottom, top)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def copy(self):
+        new_index = PackageIndex.__new__(PackageIndex)
+        new_index.length = self.length
+        new_index.n_columns = self.n_columns
+        new_index.column_width = self.column_width
+        new_index.columns = [set(column) for column in self.columns]
+        new_index.column_top = list(self.column_top)
+        new_index.boxes = dict(self.boxes)
+        return new_index
+
+    def get_column_range(self, left, right):
+        """
+        return first and last column overlapping (left, right), clipped to the package
+        :return: first, last
+        """
+        first = int(math.floor(left / self.column_width))
+        last = int(math.ceil(right / self.column_width)) - 1
+        first = min(max(first, 0), self.n_columns - 1)
+        last = min(max(last, first), self.n_columns - 1)
+        return first, last
+
+    def insert(self, slot, left, right, bottom, top):
+        """
+        add box in slot with given edges to the index
+        """
+        self.boxes[slot] = (left, right, bottom, top)
+        first, last = self.get_column_range(left, right)
+        for column in range(first, last + 1):
+            self.columns[column].add(slot)
+            if top > self.column_top[column]:
+                self.column_top[column] = top
+
+    def remove(self, slot):
+        """
+        remove box in slot from the index, height profile of its columns is recalculated
+        """
+        left, right, bottom, top = self.boxes.pop(slot)
+        first, last = self.get_column_range(left, right)
+        for column in range(first, last + 1):
+            members = self.columns[column]
+            members.discard(slot)
+            if top >= self.column_top[column]:
+                self.column_top[column] = max([self.boxes[s][3] for s in members], default=0.0)
+
+    def get_candidates(self, left, right):
+        """
+        return slots of boxes in columns overlapping (left, right), superset of boxes intersecting in x direction
+        """
+        first, last = self.get_column_range(left, right)
+        if first == last:
+            return self.columns[first]
+        candidates = set()
+        for column in range(first, last + 1):
+            candidates |= self.columns[column]
+        return candidates
+
+    def get_highest_top(self, left, right, exclude=None):
+        """
+        return the highest top of boxes intersecting (left, right) in x direction, 0 if there are none
+        columns fully covered by (left, right) use the height profile, border columns are checked box by box
+        :param exclude: slot of a box to be ignored
+        """
+        first, last = self.get_column_range(left, right)
+        y_top = 0.0
+        for column in range(first, last + 1):
+            members = self.columns[column]
+            if first < column < last and 0 < column < self.n_columns - 1 and exclude not in members:
+                if self.column_top[column] > y_top:
+                    y_top = self.column_top[column]
+                continue
+            for slot in members:
+                if slot == exclude:
+                    continue
+                box_left, box_right, _, box_top = self.boxes[slot]
+                if box_top > y_top and if_segments_intersect(left, right, box_left, box_right):
+                    y_top = box_top
+        return y_top
+
+    def get_max_top(self):
+        """
+        return the highest top of all boxes in the package, 0 if package is empty
+        """
+        return max(self.column_top)
+
+    def if_overlaps(self, left, right, bottom, top, exclude=None):
+        """
+        return True if rectangle with given edges intersects any box in the index
+        :param exclude: slot of a box to be ignored
+        """
+        for slot in self.get_candidates(left, right):
+            if slot == exclude:
+                continue
+            box_left, box_right, box_bottom, box_top = self.boxes[slot]
+            if if_segments_intersect(left, right, box_left, box_right) and \
+                    if_segments_intersect(bottom, top, box_bottom, box_top):
+                return True
+        return False
+
+
+def if_segments_intersect(left_edge_box_1, right_edge_box_1, left_edge_box_2, right_edge_box_2):
+    """
+    return True if segments of two boxes intersect, same semantics as packing.if_intersect_x/if_intersect_y
+    :return: True or False
+    """
+    return (right_edge_box_2 > left_edge_box_1 >= left_edge_box_2) or \
+        (left_edge_box_2 < right_edge_box_1 <= right_edge_box_2) or \
+        (left_edge_box_1 >= left_edge_box_2 and right_edge_box_1 <= right_edge_box_2) or \
+        (left_edge_box_1 <= left_edge_box_2 and right_edge_box_1 >= right_edge_box_2)
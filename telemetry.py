@@ -0,0 +1,92 @@
+# Opt-in instrumentation of Metropolis Monte Carlo simulated annealing
+import csv
+import json
+import time
+
+import operators
+
+phases = ['propose', 'validate', 'cleanup', 'copy']  # timed phases of annealing
+level_columns = (['level', 'c', 'proposals'] + operators.outcomes + ['area', 'best_area', 'time'] +
+                 ['time_' + phase for phase in phases])
+
+
+class Telemetry:
+    """
+    statistics of annealing per control parameter level: number of proposals and their outcomes
+    (unchanged - modification changed nothing, invalid - rejected by validity, rejected - rejected by Metropolis
+    criterion, accepted, improved - accepted with smaller area), area and the best area at the end of the level,
+    time since the start of annealing and time spent in every phase of the level (see phases).
+    pass Telemetry to packing.packing_with_monte_carlo to collect it, nothing is measured otherwise
+    """
+
+    def __init__(self):
+        self.levels = []  # list of dictionaries with keys level_columns
+        self.level = None  # statistics of the current level
+        self.start = None
+
+    def start_level(self, c):
+        """
+        start new control parameter level
+        :param c: control parameter of the level
+        """
+        if self.start is None:
+            self.start = time.perf_counter()
+        self.level = dict.fromkeys(level_columns, 0)
+        self.level['level'] = len(self.levels)
+        self.level['c'] = float(c)
+        for phase in phases:
+            self.level['time_' + phase] = 0.0
+
+    def update(self, outcome):
+        """
+        register outcome of a proposal, one of operators.outcomes
+        """
+        self.level['proposals'] += 1
+        self.level[outcome] += 1
+
+    def add_time(self, phase, start):
+        """
+        add time from start till now to phase of the current level
+        :param phase: one of phases
+        :param start: time.perf_counter() at the start of the phase
+        :return: time.perf_counter() now, start of the next phase
+        """
+        now = time.perf_counter()
+        self.level['time_' + phase] += now - start
+        return now
+
+    def end_level(self, area, best_area):
+        """
+        close the current level
+        :param area: area of the current state
+        :param best_area: the best area found so far
+        """
+        self.level['area'] = float(area)
+        self.level['best_area'] = float(best_area)
+        self.level['time'] = time.perf_counter() - self.start
+        self.levels.append(self.level)
+        self.level = None
+
+    def get_phase_times(self):
+        """
+        return total time of every phase over all levels
+        :return: dictionary {phase: seconds}
+        """
+        return {phase: sum(level['time_' + phase] for level in self.levels) for phase in phases}
+
+    def write(self, filename):
+        """
+        write statistics of levels to JSON lines (.jsonl) or CSV (.csv) file, one line per level
+        :param filename: name of the file, format is given by extension
+        """
+        if filename.lower().endswith('.csv'):
+            with open(filename, 'w', newline='') as csv_file:
+                writer = csv.DictWriter(csv_file, fieldnames=level_columns)
+                writer.writeheader()
+                writer.writerows(self.levels)
+        elif filename.lower().endswith('.jsonl'):
+            with open(filename, 'w') as jsonl_file:
+                for level in self.levels:
+                    jsonl_file.write(json.dumps(level) + '\n')
+        else:
+            raise ValueError('unknown format of %s, available: .jsonl, .csv' % filename)
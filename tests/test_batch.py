@@ -0,0 +1,27 @@
+# manifests of batch packing
+import pytest
+
+import batch
+
+
+def write_manifest(tmp_path, lines):
+    filename = str(tmp_path / 'manifest.csv')
+    with open(filename, 'w') as manifest_file:
+        manifest_file.write('\n'.join(lines) + '\n')
+    return filename
+
+
+def test_orders_of_manifest(tmp_path):
+    orders = batch.read_manifest(write_manifest(tmp_path, ['path,order_id', 'a.csv,first', 'b/a.csv,second']))
+    assert [order_id for order_id, source in orders] == ['first', 'second']
+    orders = batch.read_manifest(write_manifest(tmp_path, ['order_id,box_number,x,y', '1,1,100,200', '2,1,100,200',
+                                                           '1,2,300,50']))
+    assert [(order_id, len(table)) for order_id, table in orders] == [('1', 2), ('2', 1)]
+
+
+@pytest.mark.parametrize('lines', [['path,order_id', 'a.csv,first', 'b.csv,first'],
+                                   ['path', 'a.csv', 'b/a.csv']])
+def test_repeated_order_ids_are_rejected(tmp_path, lines):
+    # packing slips are named by order id, they would overwrite each other
+    with pytest.raises(ValueError, match='repeated'):
+        batch.read_manifest(write_manifest(tmp_path, lines))
@@ -0,0 +1,61 @@
+# lower bounds of the area of packages never exceed the known optimum
+import numpy as np
+import pytest
+
+import bounds
+import packing
+import random_stream
+from benchmarks import generators
+
+package_type_sets = [packing.package_types,
+                     {'package_type1': [800, 1200], 'package_type2': [300, 1500]}]
+
+
+@pytest.mark.parametrize('package_types', package_type_sets)
+@pytest.mark.parametrize('n_boxes', [1, 7, 20, 45, 120])
+@pytest.mark.parametrize('seed', range(5))
+def test_lower_bounds_of_perfect_fit(package_types, n_boxes, seed):
+    boxes, optimum = generators.generate('perfect_fit', n_boxes, seed, package_types)
+    dimensions_x = [box['dimension_x'] for box in boxes]
+    dimensions_y = [box['dimension_y'] for box in boxes]
+    lower_bounds = bounds.get_lower_bounds(dimensions_x, dimensions_y, package_types)
+    assert lower_bounds['continuous'] == bounds.continuous_lower_bound(dimensions_x, dimensions_y, package_types)
+    assert lower_bounds['large_boxes'] == bounds.large_boxes_lower_bound(dimensions_x, dimensions_y, package_types)
+    assert lower_bounds['single_type'] == bounds.single_type_lower_bound(dimensions_x, dimensions_y, package_types)
+    for name, lower_bound in lower_bounds.items():
+        assert lower_bound <= optimum + 1e-6, name
+    # boxes fill packages of the largest type exactly
+    assert lower_bounds['continuous'] == pytest.approx(optimum)
+
+
+def test_get_fitting_types():
+    package_types = package_type_sets[1]
+    assert bounds.get_fitting_types(400, 500, package_types) == ['package_type1']
+    assert bounds.get_fitting_types(1400, 200, package_types) == ['package_type2']
+    assert bounds.get_fitting_types(200, 700, package_types) == ['package_type1', 'package_type2']
+    assert bounds.get_fitting_types(900, 900, package_types) == []
+    np.testing.assert_array_equal(packing.get_fitting_mask([400, 900, 1300], [500, 900, 700]), [True, False, False])
+
+
+def test_annealing_stops_at_lower_bound(monkeypatch):
+    # two small boxes in two packages, both fit into one package of the smaller type
+    packages = [{'package_id': package_id, 'package_type': 'package_type2', 'dimension_x': 800, 'dimension_y': 600}
+                for package_id in [1, 2]]
+    boxes = [{'box_index': box_index, 'dimension_x': 100.0, 'dimension_y': 100.0, 'package_id': box_index + 1,
+              'rotated': False, 'x_center': 50.0, 'y_center': 50.0} for box_index in [0, 1]]
+    shipping_dict = {'area': 960000.0, 'n_packages': 2, 'packages': packages, 'boxes': boxes}
+    metropolis_step = packing.metropolis_step
+    n_steps = []
+
+    def count_steps(*arguments):
+        n_steps.append(1)
+        return metropolis_step(*arguments)
+
+    monkeypatch.setattr(packing, 'metropolis_step', count_steps)
+    monkeypatch.setattr(packing, 'max_number_steps', 1000)
+    result = packing.packing_with_monte_carlo(shipping_dict, cooling='geometric', rng=random_stream.RandomStream(1))
+    assert result['area'] == result['lower_bound'] == 480000.0
+    assert result['optimality_gap'] == 0.0
+    assert packing.if_shipping_valid(result)
+    # annealing stops within the first level instead of running all levels
+    assert len(n_steps) < packing.max_number_steps
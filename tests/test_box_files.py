@@ -0,0 +1,28 @@
+# reading boxes from files: box numbers must be integer
+import numpy as np
+import pytest
+
+import packing
+
+
+def test_integer_box_numbers(tmp_path):
+    filename = str(tmp_path / 'boxes.csv')
+    with open(filename, 'w') as boxes_file:
+        boxes_file.write('box_number,x,y\n7,100,200\n3,300,50\n')
+    boxes = packing.get_boxes(filename)
+    assert [box['box_index'] for box in boxes] == [7, 3]
+    assert all(isinstance(box['box_index'], int) for box in boxes)
+
+
+@pytest.mark.parametrize('box_numbers', [['A1', 'B2'], ['1.5', '2']])
+def test_other_box_numbers_are_rejected(tmp_path, box_numbers):
+    filename = str(tmp_path / 'boxes.csv')
+    with open(filename, 'w') as boxes_file:
+        boxes_file.write('box_number,x,y\n%s,100,200\n%s,300,50\n' % tuple(box_numbers))
+    with pytest.raises(ValueError):
+        packing.get_boxes(filename)
+
+
+def test_fractional_box_numbers_of_array_are_rejected():
+    with pytest.raises(ValueError):
+        packing.get_boxes_from_array(np.array([[1.5, 100.0, 200.0]]))
@@ -0,0 +1,88 @@
+# checkpoints of annealing: a resumed run continues exactly as the uninterrupted one
+import shutil
+
+import numpy as np
+import pytest
+
+import checkpoint
+import packing
+import random_stream
+from benchmarks import generators
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """
+    short annealing with several checkpoints, module settings are restored after the test
+    """
+    monkeypatch.setattr(packing, 'max_number_steps', 300)
+    monkeypatch.setattr(packing, 'checkpoint_steps', 250)
+    monkeypatch.setattr(packing, 'alpha', 0.5)
+    monkeypatch.setattr(packing, 'c_min', 2)
+    monkeypatch.setattr(packing, 'compaction', False)
+    monkeypatch.setattr(packing, 'time_budget', None)
+
+
+def run_with_copy_of_checkpoint(tmp_path, monkeypatch, shipping_dict, n_checkpoint):
+    """
+    run annealing writing checkpoints, keep a copy of the n_checkpoint-th checkpoint
+    :return: result of the uninterrupted run, name of the copy
+    """
+    save_checkpoint = checkpoint.save_checkpoint
+    checkpoint_file = str(tmp_path / 'run.npz')
+    copy_file = str(tmp_path / 'copy.npz')
+    n_saved = []
+
+    def save_and_copy(filename, *arguments):
+        save_checkpoint(filename, *arguments)
+        n_saved.append(filename)
+        if len(n_saved) == n_checkpoint:
+            shutil.copy(filename, copy_file)
+
+    monkeypatch.setattr(checkpoint, 'save_checkpoint', save_and_copy)
+    result = packing.packing_with_monte_carlo(shipping_dict, rng=random_stream.RandomStream(7),
+                                              checkpoint_file=checkpoint_file)
+    monkeypatch.setattr(checkpoint, 'save_checkpoint', save_checkpoint)
+    assert len(n_saved) > n_checkpoint
+    return result, copy_file
+
+
+@pytest.mark.parametrize('proposal_mode, cooling', [('grid', 'geometric'), ('free_space', 'adaptive')])
+def test_resume_continues_exactly(tmp_path, monkeypatch, settings, proposal_mode, cooling):
+    monkeypatch.setattr(packing, 'proposal_mode', proposal_mode)
+    monkeypatch.setattr(packing, 'cooling_schedule', cooling)
+    boxes, optimum = generators.generate('uniform', 60, 3, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=random_stream.RandomStream(7))
+    result, copy_file = run_with_copy_of_checkpoint(tmp_path, monkeypatch, shipping_dict, 2)
+    resumed = packing.resume_packing_with_monte_carlo(copy_file)
+    assert resumed == result
+
+
+def test_resume_keeps_module_settings(tmp_path, monkeypatch, settings):
+    monkeypatch.setattr(packing, 'proposal_mode', 'free_space')
+    boxes, optimum = generators.generate('uniform', 60, 3, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=random_stream.RandomStream(7))
+    result, copy_file = run_with_copy_of_checkpoint(tmp_path, monkeypatch, shipping_dict, 2)
+    # settings of the resumed run are taken from the checkpoint, not from the module
+    new_settings = {'c_min': 5, 'alpha': 0.9, 'max_number_steps': 100, 'proposal_mode': 'grid', 'compaction': True}
+    for name, value in new_settings.items():
+        monkeypatch.setattr(packing, name, value)
+    resumed = packing.resume_packing_with_monte_carlo(copy_file)
+    assert resumed == result
+    assert {name: getattr(packing, name) for name in packing.checkpoint_settings} == new_settings
+
+
+@pytest.mark.parametrize('bit_generator', ['PCG64', 'MT19937', 'Philox', 'SFC64'])
+def test_random_stream_state_of_any_bit_generator(tmp_path, bit_generator):
+    boxes, optimum = generators.generate('uniform', 10, 3, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=random_stream.RandomStream(7))
+    state = packing.shipping_state.shipping_state_from_dict(shipping_dict, packing.package_types, packing.precision)
+    rng = random_stream.RandomStream(np.random.Generator(getattr(np.random, bit_generator)(11)), size=16)
+    for draw in range(5):
+        rng.random()
+    selector = packing.operators.OperatorSelector()
+    filename = str(tmp_path / 'rng.npz')
+    checkpoint.save_checkpoint(filename, {}, state, state, rng, selector)
+    restored = random_stream.RandomStream()
+    restored.set_state(checkpoint.load_checkpoint(filename)['rng'])
+    assert [restored.random() for draw in range(40)] == [rng.random() for draw in range(40)]
@@ -0,0 +1,140 @@
+# vectorized overlap kernels against scalar packing.if_intersect_x / if_intersect_y
+import itertools
+
+import numpy as np
+import pytest
+
+import overlap
+import packing
+
+package_dimension_x = 100.0
+package_dimension_y = 80.0
+
+
+def get_box(x_center, y_center, dimension_x, dimension_y, box_index=0):
+    return {'box_index': box_index, 'dimension_x': float(dimension_x), 'dimension_y': float(dimension_y),
+            'package_id': 0, 'rotated': 'Not rotated', 'x_center': float(x_center), 'y_center': float(y_center)}
+
+
+def get_random_boxes(rng, n):
+    """
+    return boxes with centers and dimensions on a coarse grid, so touching, nested, identical and
+    zero-width boxes are frequent
+    """
+    dimensions_x = rng.integers(0, 5, n) * 10.0
+    dimensions_y = rng.integers(0, 5, n) * 10.0
+    x_centers = rng.integers(0, 21, n) * 5.0
+    y_centers = rng.integers(0, 17, n) * 5.0
+    return [get_box(*values, box_index=index)
+            for index, values in enumerate(zip(x_centers, y_centers, dimensions_x, dimensions_y))]
+
+
+def if_overlap(box_1, box_2):
+    return packing.if_intersect_x(box_1, box_2) and packing.if_intersect_y(box_1, box_2)
+
+
+def if_boxes_valid(boxes):
+    """
+    scalar check of boxes in one package: within package dimensions and no pair overlaps
+    """
+    for box in boxes:
+        if box['x_center'] - box['dimension_x'] / 2.0 < 0.0 or \
+                box['x_center'] + box['dimension_x'] / 2.0 > package_dimension_x or \
+                box['y_center'] - box['dimension_y'] / 2.0 < 0.0 or \
+                box['y_center'] + box['dimension_y'] / 2.0 > package_dimension_y:
+            return False
+    return not any(if_overlap(box_1, box_2) for box_1, box_2 in itertools.combinations(boxes, 2))
+
+
+# pairs of boxes (x_center, y_center, dimension_x, dimension_y) and whether they overlap
+hand_built_pairs = [
+    ((10, 10, 20, 20), (30, 10, 20, 20), False),  # touching in x
+    ((10, 10, 20, 20), (10, 30, 20, 20), False),  # touching in y
+    ((10, 10, 20, 20), (30, 30, 20, 20), False),  # touching corners
+    ((10, 10, 20, 20), (29, 10, 20, 20), True),  # overlapping in x
+    ((50, 50, 40, 40), (50, 50, 10, 10), True),  # nested
+    ((50, 50, 10, 10), (50, 50, 40, 40), True),  # nested, other order
+    ((40, 40, 40, 40), (35, 35, 30, 30), True),  # nested touching left and bottom edges
+    ((30, 30, 20, 20), (30, 30, 20, 20), True),  # identical
+    ((30, 30, 0, 20), (30, 30, 20, 20), True),  # zero width inside
+    ((20, 30, 0, 20), (30, 30, 20, 20), True),  # zero width on left edge
+    ((40, 30, 0, 20), (30, 30, 20, 20), True),  # zero width on right edge
+    ((30, 30, 0, 20), (30, 30, 0, 20), True),  # identical zero width
+    ((60, 30, 0, 20), (30, 30, 20, 20), False),  # zero width outside
+    ((30, 30, 0, 0), (30, 30, 20, 20), True),  # point inside
+    ((10, 10, 20, 20), (70, 70, 20, 20), False),  # far apart
+]
+
+
+@pytest.mark.parametrize('values_1, values_2, expected', hand_built_pairs)
+def test_hand_built_pairs(values_1, values_2, expected):
+    box_1 = get_box(*values_1)
+    box_2 = get_box(*values_2)
+    assert if_overlap(box_1, box_2) == expected
+    edges_1 = overlap.get_edges_of_boxes([box_1])
+    edges_2 = overlap.get_edges_of_boxes([box_2])
+    assert overlap.intersect_mask(edges_1[0][0], edges_1[1][0], edges_2[0], edges_2[1])[0] == \
+        packing.if_intersect_x(box_1, box_2)
+    assert overlap.intersect_mask(edges_1[2][0], edges_1[3][0], edges_2[2], edges_2[3])[0] == \
+        packing.if_intersect_y(box_1, box_2)
+    assert overlap.overlap_mask([edge[0] for edge in edges_1], edges_2)[0] == expected
+    assert overlap.overlap_matrix(overlap.get_edges_of_boxes([box_1, box_2]))[0, 1] == expected
+
+
+def test_get_edges_of_boxes():
+    boxes = [get_box(10, 20, 4, 6), get_box(5, 5, 0, 10)]
+    left_edges, right_edges, bottom_edges, top_edges = overlap.get_edges_of_boxes(boxes)
+    np.testing.assert_array_equal(left_edges, [8, 5])
+    np.testing.assert_array_equal(right_edges, [12, 5])
+    np.testing.assert_array_equal(bottom_edges, [17, 0])
+    np.testing.assert_array_equal(top_edges, [23, 10])
+    assert all(len(edge) == 0 for edge in overlap.get_edges_of_boxes([]))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_intersect_and_overlap_mask(seed):
+    rng = np.random.default_rng(seed)
+    boxes = get_random_boxes(rng, 60)
+    edges = overlap.get_edges_of_boxes(boxes)
+    for position, box_1 in enumerate(boxes):
+        left, right, bottom, top = [edge[position] for edge in edges]
+        np.testing.assert_array_equal(overlap.intersect_mask(left, right, edges[0], edges[1]),
+                                      [packing.if_intersect_x(box_1, box_2) for box_2 in boxes])
+        np.testing.assert_array_equal(overlap.intersect_mask(bottom, top, edges[2], edges[3]),
+                                      [packing.if_intersect_y(box_1, box_2) for box_2 in boxes])
+        np.testing.assert_array_equal(overlap.overlap_mask((left, right, bottom, top), edges),
+                                      [if_overlap(box_1, box_2) for box_2 in boxes])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_overlap_matrix(seed):
+    rng = np.random.default_rng(seed)
+    boxes = get_random_boxes(rng, 40)
+    expected = np.array([[position_1 != position_2 and if_overlap(box_1, box_2)
+                          for position_2, box_2 in enumerate(boxes)] for position_1, box_1 in enumerate(boxes)])
+    np.testing.assert_array_equal(overlap.overlap_matrix(overlap.get_edges_of_boxes(boxes)), expected)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_if_boxes_valid(seed):
+    rng = np.random.default_rng(seed)
+    # few boxes, so both valid and invalid packages occur
+    boxes = get_random_boxes(rng, int(rng.integers(1, 5)))
+    assert overlap.if_boxes_valid(overlap.get_edges_of_boxes(boxes), package_dimension_x, package_dimension_y) == \
+        if_boxes_valid(boxes)
+
+
+@pytest.mark.parametrize('values, expected', [
+    ([(10, 10, 20, 20), (30, 10, 20, 20), (90, 70, 20, 20)], True),  # touching boxes and package corner
+    ([(10, 10, 20, 20), (25, 10, 20, 20)], False),  # overlapping
+    ([(50, 40, 100, 80)], True),  # box of package size
+    ([(50, 40, 100.5, 80)], False),  # wider than package
+    ([(5, 10, 20, 20)], False),  # outside left edge
+    ([(10, 10, 20, 20), (10, 10, 20, 20)], False),  # identical
+    ([(10, 10, 0, 20), (30, 10, 0, 20)], True),  # separate zero-width boxes
+])
+def test_hand_built_if_boxes_valid(values, expected):
+    boxes = [get_box(*box_values) for box_values in values]
+    assert if_boxes_valid(boxes) == expected
+    assert overlap.if_boxes_valid(overlap.get_edges_of_boxes(boxes), package_dimension_x, package_dimension_y) == \
+        expected
@@ -0,0 +1,28 @@
+# warm start of annealing after small changes of an order
+import math
+
+import packing
+import random_stream
+from benchmarks import generators
+
+
+def test_warm_start_has_own_step_budget(monkeypatch):
+    monkeypatch.setattr(packing, 'max_number_steps', 1000)
+    monkeypatch.setattr(packing, 'warm_start_steps', 50)
+    boxes, optimum = generators.generate('perfect_fit', 40, 9, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes[:-2], strategy='maxrects')
+    metropolis_step = packing.metropolis_step
+    n_steps = []
+
+    def count_steps(*arguments):
+        n_steps.append(1)
+        return metropolis_step(*arguments)
+
+    monkeypatch.setattr(packing, 'metropolis_step', count_steps)
+    result = packing.reoptimize_shipping(shipping_dict, added_boxes=boxes[-2:],
+                                         removed_box_indexes=[boxes[0]['box_index']],
+                                         rng=random_stream.RandomStream(9))
+    assert packing.if_shipping_valid(result)
+    assert sorted(box['box_index'] for box in result['boxes']) == [box['box_index'] for box in boxes[1:]]
+    n_levels = int(math.floor(math.log(packing.c_min / packing.warm_start_c0, packing.alpha))) + 1
+    assert 0 < len(n_steps) <= n_levels * packing.warm_start_steps
@@ -0,0 +1,31 @@
+# calibration of initial control parameter of adaptive cooling
+import pytest
+
+import packing
+import random_stream
+import schedule
+import shipping_state
+from benchmarks import generators
+
+
+def get_state():
+    boxes, optimum = generators.generate('uniform', 40, 10, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=random_stream.RandomStream(10))
+    return shipping_state.shipping_state_from_dict(shipping_dict, packing.package_types, packing.precision)
+
+
+def test_calibration_without_area_increasing_operators_samples_nothing():
+    rng = random_stream.RandomStream(10)
+    rng_state = rng.get_state()
+    assert schedule.calibrate_initial_temperature(get_state(), 123.0, rng) == 123.0
+    assert rng.get_state() == rng_state
+
+
+@pytest.mark.parametrize('enabled_operators, if_sampled', [([0, 1, 2], True), ([0, 2], False)])
+def test_calibration_samples_enabled_operators(monkeypatch, enabled_operators, if_sampled):
+    monkeypatch.setattr(shipping_state, 'area_increasing_operators', ['move_to_random_package'])
+    rng = random_stream.RandomStream(10)
+    rng_state = rng.get_state()
+    # operators don't add packages, no uphill move is found
+    assert schedule.calibrate_initial_temperature(get_state(), 123.0, rng, enabled_operators=enabled_operators) == 123.0
+    assert (rng.get_state() != rng_state) == if_sampled
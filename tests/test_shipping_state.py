@@ -0,0 +1,212 @@
+# in-place modifications of shipping_state: local validity check and undo of moves
+import numpy as np
+import pytest
+
+import packing
+import random_stream
+import shipping_state
+from benchmarks import generators
+
+package_array_names = ['package_ids', 'package_type_codes', 'package_dimension_x', 'package_dimension_y',
+                       'package_active']
+
+
+def get_state(name, n_boxes, seed):
+    boxes, optimum = generators.generate(name, n_boxes, seed, packing.package_types)
+    rng = random_stream.RandomStream(seed)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=rng)
+    return shipping_state.shipping_state_from_dict(shipping_dict, packing.package_types, packing.precision), rng
+
+
+def get_snapshot(state):
+    """
+    return copies of everything undo_move has to restore: arrays, counters, lookup maps, spatial indexes and
+    free space of packages
+    """
+    snapshot = {name: value.copy() for name, value in state.__dict__.items()
+                if isinstance(value, np.ndarray) and name not in package_array_names}
+    snapshot.update({name: getattr(state, name)[:state.n_package_slots].copy() for name in package_array_names})
+    snapshot.update({'area': state.area, 'n_packages': state.n_packages, 'n_package_slots': state.n_package_slots,
+                     'box_slot': dict(state.box_slot), 'package_slot': dict(state.package_slot),
+                     'package_members': {package_id: set(members)
+                                         for package_id, members in state.package_members.items()},
+                     'type_package_boxes': dict(state.type_package_boxes)})
+    snapshot['index'] = {package_id: (dict(index.boxes), [set(column) for column in index.columns],
+                                      list(index.column_top))
+                         for package_id, index in state.package_index.items()}
+    snapshot['free_space'] = {package_id: (list(package_free_space.rectangles), package_free_space.n_removed)
+                              for package_id, package_free_space in state.free_space.items()}
+    return snapshot
+
+
+def assert_snapshots_equal(snapshot_1, snapshot_2):
+    assert snapshot_1.keys() == snapshot_2.keys()
+    for name, value in snapshot_1.items():
+        if isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(value, snapshot_2[name], err_msg=name)
+        else:
+            assert value == snapshot_2[name], name
+
+
+@pytest.mark.parametrize('proposal_mode', shipping_state.proposal_modes)
+@pytest.mark.parametrize('name', ['uniform', 'sku'])
+def test_local_validity_equals_full_validity(name, proposal_mode):
+    state, rng = get_state(name, 80, 1)
+    n_invalid = 0
+    for step in range(1000):
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, rng.integer(len(shipping_state.operators)),
+                                                proposal_mode)
+        valid = shipping_state.if_move_valid(state, move)
+        assert valid == shipping_state.if_shipping_valid(state)
+        if valid and rng.random() < 0.5:
+            shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+            shipping_state.commit_move(state)
+        else:
+            n_invalid += not valid
+            shipping_state.undo_move(state, move)
+    # both outcomes of the check were compared
+    assert 0 < n_invalid < 1000
+
+
+@pytest.mark.parametrize('proposal_mode', shipping_state.proposal_modes)
+def test_undo_restores_state(proposal_mode):
+    state, rng = get_state('sku', 80, 2)
+    for step in range(1000):
+        snapshot = get_snapshot(state)
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, rng.integer(len(shipping_state.operators)),
+                                                proposal_mode)
+        shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+        if shipping_state.if_move_valid(state, move) and rng.random() < 0.5:
+            shipping_state.commit_move(state)
+        else:
+            shipping_state.undo_move(state, move)
+            assert_snapshots_equal(snapshot, get_snapshot(state))
+        assert state.area == pytest.approx(shipping_state.calculate_area_packages(state))
+    assert shipping_state.if_shipping_valid(state)
+
+
+def test_undo_restores_added_package():
+    state, rng = get_state('uniform', 30, 3)
+    snapshot = get_snapshot(state)
+    move = shipping_state.begin_move(state)
+    package_id = shipping_state.add_package(state, list(packing.package_types)[0])
+    shipping_state.set_box(state, 0, package_id, state.box_dimension_x[0] / 2.0, state.box_dimension_y[0] / 2.0)
+    assert state.n_packages == snapshot['n_packages'] + 1
+    shipping_state.undo_move(state, move)
+    assert_snapshots_equal(snapshot, get_snapshot(state))
+
+
+def assert_box_types_consistent(state):
+    """
+    check orientation and statistics of box types updated by moves against a recount from scratch
+    """
+    flipped = state.box_dimension_x > state.box_dimension_y
+    np.testing.assert_array_equal(state.type_position[state.type_slots], np.arange(state.n_boxes))
+    for box_type in range(len(state.box_type_sides)):
+        slots = state.type_slots[state.box_type_start[box_type]:state.box_type_start[box_type + 1]]
+        assert np.all(state.box_type[slots] == box_type)
+        # flipped boxes are the last type_n_flipped boxes of the range
+        n_not_flipped = len(slots) - state.type_n_flipped[box_type]
+        assert not np.any(flipped[slots[:n_not_flipped]]) and np.all(flipped[slots[n_not_flipped:]])
+    recounted = shipping_state.group_box_types(shipping_state.copy_shipping_state(state))
+    for name in ['type_n_flipped', 'type_n_rotated', 'type_n_packages']:
+        np.testing.assert_array_equal(getattr(state, name), getattr(recounted, name), err_msg=name)
+    assert state.type_package_boxes == recounted.type_package_boxes
+    assert shipping_state.get_box_type_statistics(state) == shipping_state.get_box_type_statistics(recounted)
+
+
+@pytest.mark.parametrize('proposal_mode', shipping_state.proposal_modes)
+def test_box_types_follow_moves(proposal_mode):
+    state, rng = get_state('sku', 80, 4)
+    assert_box_types_consistent(state)
+    for step in range(1000):
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, rng.integer(len(shipping_state.operators)),
+                                                proposal_mode)
+        shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+        if shipping_state.if_move_valid(state, move) and rng.random() < 0.5:
+            shipping_state.commit_move(state)
+        else:
+            shipping_state.undo_move(state, move)
+        if step % 50 == 0:
+            assert_box_types_consistent(state)
+    assert_box_types_consistent(state)
+    statistics = shipping_state.get_box_type_statistics(state)
+    assert sum(type_statistics['n_boxes'] for type_statistics in statistics) == state.n_boxes
+    assert sum(type_statistics['n_rotated'] for type_statistics in statistics) == np.count_nonzero(state.box_rotated)
+
+
+def do_random_moves(state, rng, n_steps):
+    for step in range(n_steps):
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, rng.integer(len(shipping_state.operators)))
+        shipping_state.remove_empty_packages(state, shipping_state.get_move_source_packages(move))
+        if shipping_state.if_move_valid(state, move):
+            shipping_state.commit_move(state)
+        else:
+            shipping_state.undo_move(state, move)
+
+
+def test_box_types_of_copies():
+    state, rng = get_state('sku', 60, 5)
+    do_random_moves(state, rng, 300)
+    snapshot = get_snapshot(state)
+    copied = shipping_state.copy_shipping_state(state)
+    rebuilt = shipping_state.shipping_state_from_arrays(shipping_state.shipping_state_to_arrays(state),
+                                                        state.package_types, state.precision)
+    # order of slots of types is kept, so random picks of boxes continue the same way
+    np.testing.assert_array_equal(rebuilt.type_slots, state.type_slots)
+    assert_box_types_consistent(rebuilt)
+    # moves of the copy don't change the original
+    do_random_moves(copied, rng, 300)
+    assert_box_types_consistent(copied)
+    assert_snapshots_equal(snapshot, get_snapshot(state))
+
+
+@pytest.mark.parametrize('name', ['uniform', 'sku', 'perfect_fit'])
+def test_compaction_keeps_packages_valid(name):
+    state, rng = get_state(name, 80, 6)
+    do_random_moves(state, rng, 500)
+    area = state.area
+    box_package_id = state.box_package_id.copy()
+    box_x_center = state.box_x_center.copy()
+    box_y_center = state.box_y_center.copy()
+    assert shipping_state.compact_shipping(state) > 0
+    assert shipping_state.if_shipping_valid(state)
+    assert state.area == area == pytest.approx(shipping_state.calculate_area_packages(state))
+    # boxes stay in their packages and only move down and left
+    np.testing.assert_array_equal(state.box_package_id, box_package_id)
+    assert np.all(state.box_x_center <= box_x_center) and np.all(state.box_y_center <= box_y_center)
+
+
+def test_undo_of_compaction_operator():
+    state, rng = get_state('uniform', 60, 7)
+    compaction = shipping_state.operators.index('compact_package')
+    n_changed = 0
+    for step in range(50):
+        snapshot = get_snapshot(state)
+        move = shipping_state.begin_move(state)
+        shipping_state.change_shipping_randomly(state, rng, compaction)
+        assert shipping_state.if_move_valid(state, move)
+        assert state.area == snapshot['area']
+        n_changed += not np.array_equal(state.box_y_center, snapshot['box_y_center'])
+        shipping_state.undo_move(state, move)
+        assert_snapshots_equal(snapshot, get_snapshot(state))
+    assert n_changed > 0
+
+
+def test_annealing_with_compaction(monkeypatch):
+    monkeypatch.setattr(packing, 'compaction', True)
+    monkeypatch.setattr(packing, 'operator_weights', [1, 1, 1, 1, 1, 1])
+    monkeypatch.setattr(packing, 'max_number_steps', 200)
+    boxes, optimum = generators.generate('sku', 60, 8, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, rng=random_stream.RandomStream(8))
+    result = packing.packing_with_monte_carlo(shipping_dict, rng=random_stream.RandomStream(8))
+    assert packing.if_shipping_valid(result)
+    assert result['area'] <= shipping_dict['area']
+    compacted = packing.compact_shipping(result)
+    assert packing.if_shipping_valid(compacted)
+    assert compacted['area'] == result['area']
+    assert sorted(box['box_index'] for box in compacted['boxes']) == sorted(box['box_index'] for box in boxes)
@@ -0,0 +1,88 @@
+# signature of orders and reuse of cached solutions for orders with the same boxes
+import copy
+
+import pytest
+
+import packing
+import random_stream
+import solution_cache
+from benchmarks import generators
+
+
+def get_order(seed, n_boxes=30):
+    boxes, optimum = generators.generate('sku', n_boxes, seed, packing.package_types)
+    shipping_dict = packing.initialize_shipping_from_boxes(boxes, strategy='maxrects')
+    return boxes, shipping_dict
+
+
+def get_equivalent_order(boxes, rng):
+    """
+    return the same boxes shuffled, with new indexes and some of them rotated
+    """
+    equivalent_boxes = [copy.deepcopy(boxes[position]) for position in rng.permutation(len(boxes))]
+    for box_index, box in enumerate(equivalent_boxes):
+        box['box_index'] = 1000 + box_index
+        if rng.random() < 0.5:
+            box['dimension_x'], box['dimension_y'] = box['dimension_y'], box['dimension_x']
+    return equivalent_boxes
+
+
+def get_signature(boxes, package_types=None, precision=None):
+    return solution_cache.get_signature(boxes, packing.package_types if package_types is None else package_types,
+                                        packing.precision if precision is None else precision)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_signature_does_not_depend_on_order_indexes_and_rotation(seed):
+    boxes, shipping_dict = get_order(seed)
+    rng = random_stream.RandomStream(seed)
+    assert get_signature(get_equivalent_order(boxes, rng)) == get_signature(boxes)
+    # placed boxes of a solution have the signature of the order
+    assert get_signature(shipping_dict['boxes']) == get_signature(boxes)
+
+
+def test_signature_depends_on_boxes_and_package_types():
+    boxes, shipping_dict = get_order(0)
+    changed_boxes = copy.deepcopy(boxes)
+    changed_boxes[0]['dimension_x'] += 1
+    signatures = [get_signature(boxes), get_signature(changed_boxes), get_signature(boxes[1:]),
+                  get_signature(boxes, package_types={'package_type1': [800, 1200]}),
+                  get_signature(boxes, precision=0.5)]
+    assert len(set(signatures)) == len(signatures)
+
+
+def test_remap_of_canonical_solution_restores_solution():
+    boxes, shipping_dict = get_order(1)
+    solution = solution_cache.get_canonical_solution(shipping_dict)
+    assert all('box_index' not in box for box in solution['boxes'])
+    assert solution_cache.remap_solution(solution, boxes) == shipping_dict
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_remap_to_equivalent_order(seed):
+    boxes, shipping_dict = get_order(seed)
+    equivalent_boxes = get_equivalent_order(boxes, random_stream.RandomStream(seed))
+    remapped = solution_cache.remap_solution(solution_cache.get_canonical_solution(shipping_dict), equivalent_boxes)
+    assert remapped['area'] == shipping_dict['area']
+    assert packing.if_shipping_valid(remapped)
+    # every box of the order is placed once, in its own order, rotated if its placed dimensions are swapped
+    assert [box['box_index'] for box in remapped['boxes']] == [box['box_index'] for box in equivalent_boxes]
+    for placed_box, box in zip(remapped['boxes'], equivalent_boxes):
+        if placed_box['rotated'] == 'Rotated':
+            assert (placed_box['dimension_x'], placed_box['dimension_y']) == (box['dimension_y'], box['dimension_x'])
+        else:
+            assert (placed_box['dimension_x'], placed_box['dimension_y']) == (box['dimension_x'], box['dimension_y'])
+
+
+@pytest.mark.parametrize('on_disk', [False, True])
+def test_get_and_put(tmp_path, on_disk):
+    boxes, shipping_dict = get_order(2)
+    cache = solution_cache.SolutionCache(str(tmp_path) if on_disk else None)
+    assert cache.get(boxes, packing.package_types, packing.precision) is None
+    cache.put(shipping_dict, packing.package_types, packing.precision)
+    if on_disk:
+        # a new cache sharing the directory reads the solution from disk
+        cache = solution_cache.SolutionCache(str(tmp_path))
+    assert cache.get(boxes, packing.package_types, packing.precision) == shipping_dict
+    assert cache.get(boxes, {'package_type1': [800, 1200]}, packing.precision) is None
+    assert (cache.hits, cache.misses) == ((1, 1) if on_disk else (1, 2))